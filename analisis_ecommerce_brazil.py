@@ -63,6 +63,17 @@ from wordcloud import WordCloud
 # Kaggle
 import kagglehub
 
+# Motores de cómputo del proyecto
+from ecommerce_brasil import crosstab, OlapCube, build_order_index, filter_panel, TimeSortedFrame
+from ecommerce_brasil import attach_distances, FlowMatrix
+from ecommerce_brasil import top_k, top_k_frame, top_counts, top_k_per_group
+from ecommerce_brasil import seller_scorecard, CustomerBase, CohortMatrix, DeliveryTimes
+from ecommerce_brasil import ReviewLifecycle, REVIEW_STAGE_LABELS, term_counts, frequencies
+from ecommerce_brasil import near_duplicates, seller_duplicate_ratio, SentimentCache, attach_sentiment
+from ecommerce_brasil import grouped_box_stats, density_plot, integer_edges
+from ecommerce_brasil import build_figure_inputs, render_figures, FigureCache, KPIStore
+from ecommerce_brasil import fix_types, validate, olist_pipeline, Profiler
+
 # Configuración
 warnings.filterwarnings('ignore')
 pd.set_option('display.max_columns', None)
@@ -491,23 +502,8 @@ else:
 ### 3.3.1 Corrección de Tipos de Datos y Validación de Fechas
 
 if datasets and 'orders' in datasets:
-    orders_df = datasets['orders'].copy()
-    
     # Convertir columnas de fecha a datetime
-    date_columns = [
-        'order_purchase_timestamp',
-        'order_approved_at',
-        'order_delivered_carrier_date',
-        'order_delivered_customer_date',
-        'order_estimated_delivery_date'
-    ]
-    
-    for col in date_columns:
-        if col in orders_df.columns:
-            orders_df[col] = pd.to_datetime(orders_df[col], errors='coerce')
-    
-    # Actualizar el dataset
-    datasets['orders'] = orders_df
+    datasets = fix_types(datasets)
     
     print("✅ Fechas convertidas correctamente a datetime")
 
@@ -522,249 +518,31 @@ if datasets:
     print("VALIDACIÓN DE INTEGRIDAD REFERENCIAL Y CONSISTENCIA")
     print("=" * 80)
     
-    validation_issues = []
-    
-    # 1. Validación de integridad referencial
-    print("\n🔗 VALIDACIÓN DE INTEGRIDAD REFERENCIAL")
-    print("-" * 80)
-    
-    # Verificar order_id en order_items
-    if 'order_items' in datasets and 'orders' in datasets:
-        order_items = datasets['order_items']
-        orders = datasets['orders']
-        orphan_items = order_items[~order_items['order_id'].isin(orders['order_id'])]
-        if len(orphan_items) > 0:
-            validation_issues.append({
-                'Tipo': 'Integridad Referencial',
-                'Problema': f'order_items con order_id huérfanos',
-                'Cantidad': len(orphan_items),
-                'Porcentaje': len(orphan_items) / len(order_items) * 100
-            })
-            print(f"⚠️  {len(orphan_items):,} items con order_id que no existen en orders ({len(orphan_items)/len(order_items)*100:.2f}%)")
-        else:
-            print("✅ Todos los order_id en order_items existen en orders")
-    
-    # Verificar order_id en order_payments
-    if 'order_payments' in datasets and 'orders' in datasets:
-        order_payments = datasets['order_payments']
-        orders = datasets['orders']
-        orphan_payments = order_payments[~order_payments['order_id'].isin(orders['order_id'])]
-        if len(orphan_payments) > 0:
-            validation_issues.append({
-                'Tipo': 'Integridad Referencial',
-                'Problema': f'order_payments con order_id huérfanos',
-                'Cantidad': len(orphan_payments),
-                'Porcentaje': len(orphan_payments) / len(order_payments) * 100
-            })
-            print(f"⚠️  {len(orphan_payments):,} pagos con order_id que no existen en orders ({len(orphan_payments)/len(order_payments)*100:.2f}%)")
-        else:
-            print("✅ Todos los order_id en order_payments existen en orders")
-    
-    # Verificar order_id en order_reviews
-    if 'order_reviews' in datasets and 'orders' in datasets:
-        order_reviews = datasets['order_reviews']
-        orders = datasets['orders']
-        orphan_reviews = order_reviews[~order_reviews['order_id'].isin(orders['order_id'])]
-        if len(orphan_reviews) > 0:
-            validation_issues.append({
-                'Tipo': 'Integridad Referencial',
-                'Problema': f'order_reviews con order_id huérfanos',
-                'Cantidad': len(orphan_reviews),
-                'Porcentaje': len(orphan_reviews) / len(order_reviews) * 100
-            })
-            print(f"⚠️  {len(orphan_reviews):,} reviews con order_id que no existen en orders ({len(orphan_reviews)/len(order_reviews)*100:.2f}%)")
-        else:
-            print("✅ Todos los order_id en order_reviews existen en orders")
-    
-    # Verificar product_id en order_items
-    if 'order_items' in datasets and 'products' in datasets:
-        order_items = datasets['order_items']
-        products = datasets['products']
-        orphan_products = order_items[~order_items['product_id'].isin(products['product_id'])]
-        if len(orphan_products) > 0:
-            validation_issues.append({
-                'Tipo': 'Integridad Referencial',
-                'Problema': f'order_items con product_id huérfanos',
-                'Cantidad': len(orphan_products),
-                'Porcentaje': len(orphan_products) / len(order_items) * 100
-            })
-            print(f"⚠️  {len(orphan_products):,} items con product_id que no existen en products ({len(orphan_products)/len(order_items)*100:.2f}%)")
-        else:
-            print("✅ Todos los product_id en order_items existen en products")
-    
-    # 2. Validación de inconsistencias temporales
-    print("\n📅 VALIDACIÓN DE INCONSISTENCIAS TEMPORALES")
-    print("-" * 80)
-    
-    if 'orders' in datasets:
-        orders_df = datasets['orders'].copy()
-        
-        # Convertir fechas si no están convertidas
-        date_cols = ['order_purchase_timestamp', 'order_approved_at', 
-                     'order_delivered_carrier_date', 'order_delivered_customer_date',
-                     'order_estimated_delivery_date']
-        for col in date_cols:
-            if col in orders_df.columns:
-                orders_df[col] = pd.to_datetime(orders_df[col], errors='coerce')
-        
-        # Entregas antes de compra
-        if 'order_delivered_customer_date' in orders_df.columns and 'order_purchase_timestamp' in orders_df.columns:
-            invalid_dates = orders_df[
-                orders_df['order_delivered_customer_date'].notna() & 
-                orders_df['order_purchase_timestamp'].notna() &
-                (orders_df['order_delivered_customer_date'] < orders_df['order_purchase_timestamp'])
-            ]
-            if len(invalid_dates) > 0:
-                validation_issues.append({
-                    'Tipo': 'Inconsistencia Temporal',
-                    'Problema': 'Entregas antes de la fecha de compra',
-                    'Cantidad': len(invalid_dates),
-                    'Porcentaje': len(invalid_dates) / len(orders_df) * 100
-                })
-                print(f"⚠️  {len(invalid_dates):,} órdenes con entrega antes de compra ({len(invalid_dates)/len(orders_df)*100:.2f}%)")
-            else:
-                print("✅ No hay entregas antes de la fecha de compra")
-        
-        # Aprobación después de entrega
-        if 'order_approved_at' in orders_df.columns and 'order_delivered_customer_date' in orders_df.columns:
-            invalid_approval = orders_df[
-                orders_df['order_approved_at'].notna() & 
-                orders_df['order_delivered_customer_date'].notna() &
-                (orders_df['order_approved_at'] > orders_df['order_delivered_customer_date'])
-            ]
-            if len(invalid_approval) > 0:
-                validation_issues.append({
-                    'Tipo': 'Inconsistencia Temporal',
-                    'Problema': 'Aprobaciones después de entrega',
-                    'Cantidad': len(invalid_approval),
-                    'Porcentaje': len(invalid_approval) / len(orders_df) * 100
-                })
-                print(f"⚠️  {len(invalid_approval):,} órdenes aprobadas después de entrega ({len(invalid_approval)/len(orders_df)*100:.2f}%)")
-            else:
-                print("✅ No hay aprobaciones después de entrega")
-    
-    # 3. Validación de consistencia de valores
-    print("\n💰 VALIDACIÓN DE CONSISTENCIA DE VALORES")
-    print("-" * 80)
-    
-    # Verificar que payment_value coincida con price + freight
-    if 'order_items' in datasets and 'order_payments' in datasets:
-        order_items = datasets['order_items']
-        order_payments = datasets['order_payments']
-        
-        # Calcular total por orden
-        order_totals = order_items.groupby('order_id').agg({
-            'price': 'sum',
-            'freight_value': 'sum'
-        }).reset_index()
-        order_totals['expected_total'] = order_totals['price'] + order_totals['freight_value']
-        
-        # Total pagado por orden
-        payment_totals = order_payments.groupby('order_id')['payment_value'].sum().reset_index()
-        
-        # Merge y comparar
-        comparison = order_totals.merge(payment_totals, on='order_id', how='inner')
-        comparison['difference'] = abs(comparison['payment_value'] - comparison['expected_total'])
-        
-        # Tolerancia de 0.01 para diferencias de redondeo
-        inconsistent = comparison[comparison['difference'] > 0.01]
-        
-        if len(inconsistent) > 0:
-            validation_issues.append({
-                'Tipo': 'Consistencia de Valores',
-                'Problema': 'payment_value no coincide con price + freight_value',
-                'Cantidad': len(inconsistent),
-                'Porcentaje': len(inconsistent) / len(comparison) * 100
-            })
-            print(f"⚠️  {len(inconsistent):,} órdenes con valores inconsistentes ({len(inconsistent)/len(comparison)*100:.2f}%)")
-            print(f"   Diferencia promedio: R$ {inconsistent['difference'].mean():.2f}")
-            print(f"   Diferencia máxima: R$ {inconsistent['difference'].max():.2f}")
-        else:
-            print("✅ Todos los valores de pago coinciden con price + freight_value")
-    
-    # 4. Validación de rangos y dominios
-    print("\n📊 VALIDACIÓN DE RANGOS Y DOMINIOS")
-    print("-" * 80)
-    
-    # Validar review_score (debe estar entre 1-5)
-    if 'order_reviews' in datasets:
-        reviews = datasets['order_reviews']
-        if 'review_score' in reviews.columns:
-            invalid_scores = reviews[
-                (reviews['review_score'] < 1) | (reviews['review_score'] > 5)
-            ]
-            if len(invalid_scores) > 0:
-                validation_issues.append({
-                    'Tipo': 'Rango Inválido',
-                    'Problema': 'review_score fuera del rango 1-5',
-                    'Cantidad': len(invalid_scores),
-                    'Porcentaje': len(invalid_scores) / len(reviews) * 100
-                })
-                print(f"⚠️  {len(invalid_scores):,} reviews con score inválido ({len(invalid_scores)/len(reviews)*100:.2f}%)")
-            else:
-                print("✅ Todos los review_score están en el rango válido (1-5)")
-    
-    # Validar precios negativos o cero
-    if 'order_items' in datasets:
-        order_items = datasets['order_items']
-        if 'price' in order_items.columns:
-            invalid_prices = order_items[order_items['price'] <= 0]
-            if len(invalid_prices) > 0:
-                validation_issues.append({
-                    'Tipo': 'Valor Inválido',
-                    'Problema': 'Precios negativos o cero',
-                    'Cantidad': len(invalid_prices),
-                    'Porcentaje': len(invalid_prices) / len(order_items) * 100
-                })
-                print(f"⚠️  {len(invalid_prices):,} items con precio inválido ({len(invalid_prices)/len(order_items)*100:.2f}%)")
-            else:
-                print("✅ Todos los precios son válidos")
-    
-    # 5. Validación de completitud de transacciones
-    print("\n📦 VALIDACIÓN DE COMPLETITUD DE TRANSACCIONES")
-    print("-" * 80)
+    # Cada regla se evalúa solo si están las tablas que necesita
+    validation = validate(datasets)
+    section_icons = {
+        'Integridad Referencial': '🔗', 'Inconsistencia Temporal': '📅', 'Consistencia de Valores': '💰',
+        'Rango Inválido': '📊', 'Valor Inválido': '📊', 'Completitud': '📦'
+    }
     
-    if 'orders' in datasets:
-        orders = datasets['orders']
-        
-        # Órdenes sin items
-        if 'order_items' in datasets:
-            order_items = datasets['order_items']
-            orders_with_items = order_items['order_id'].unique()
-            orders_without_items = orders[~orders['order_id'].isin(orders_with_items)]
-            if len(orders_without_items) > 0:
-                validation_issues.append({
-                    'Tipo': 'Completitud',
-                    'Problema': 'Órdenes sin items',
-                    'Cantidad': len(orders_without_items),
-                    'Porcentaje': len(orders_without_items) / len(orders) * 100
-                })
-                print(f"⚠️  {len(orders_without_items):,} órdenes sin items ({len(orders_without_items)/len(orders)*100:.2f}%)")
-            else:
-                print("✅ Todas las órdenes tienen items")
-        
-        # Órdenes sin pagos
-        if 'order_payments' in datasets:
-            order_payments = datasets['order_payments']
-            orders_with_payments = order_payments['order_id'].unique()
-            orders_without_payments = orders[~orders['order_id'].isin(orders_with_payments)]
-            if len(orders_without_payments) > 0:
-                validation_issues.append({
-                    'Tipo': 'Completitud',
-                    'Problema': 'Órdenes sin pagos',
-                    'Cantidad': len(orders_without_payments),
-                    'Porcentaje': len(orders_without_payments) / len(orders) * 100
-                })
-                print(f"⚠️  {len(orders_without_payments):,} órdenes sin pagos ({len(orders_without_payments)/len(orders)*100:.2f}%)")
+    for kind, rules in validation.groupby('Tipo', sort=False):
+        print(f"\n{section_icons.get(kind, '•')} {kind.upper()}")
+        print("-" * 80)
+        for _, rule in rules.iterrows():
+            if rule['Cantidad'] > 0:
+                print(f"⚠️  {rule['Problema']}: {rule['Cantidad']:,} ({rule['Porcentaje']:.2f}%)")
+                if rule['Detalle']:
+                    print(f"   {rule['Detalle']}")
             else:
-                print("✅ Todas las órdenes tienen pagos")
+                print(f"✅ Sin casos: {rule['Problema']}")
     
     # Resumen de problemas encontrados
-    if validation_issues:
+    validation_issues = validation[validation['Cantidad'] > 0]
+    if len(validation_issues) > 0:
         print("\n" + "=" * 80)
         print("RESUMEN DE PROBLEMAS DE VALIDACIÓN")
         print("=" * 80)
-        issues_df = pd.DataFrame(validation_issues)
+        issues_df = validation_issues[['Tipo', 'Problema', 'Cantidad', 'Porcentaje']].reset_index(drop=True)
         display(issues_df)
     else:
         print("\n✅ No se encontraron problemas de validación")
@@ -908,7 +686,7 @@ else:
 
 # #### Métricas Agregadas del Dataset
 # 
-# Calculamos métricas generales que caracterizan todo el dataset.
+# Calculamos métricas generales que caracterizan todo el dataset. Los KPIs se guardan en un `KPIStore` junto con la versión (hash del contenido) de las tablas de las que dependen; el dashboard final los reutiliza y solo se recalculan los de tablas que cambiaron. También se exportan a `kpis.json` para dashboards externos.
 # 
 
 # In[14]:
@@ -919,54 +697,31 @@ if datasets:
     print("MÉTRICAS AGREGADAS DEL DATASET")
     print("=" * 80)
     
-    metrics = {}
+    # KPIs desde el almacén compartido (se calculan una vez por versión de los datos)
+    kpi_store = KPIStore(datasets)
     
-    # Total de órdenes
-    if 'orders' in datasets:
-        total_orders = len(datasets['orders'])
-        metrics['Total de Órdenes'] = f"{total_orders:,}"
-        
-        # Rango de fechas
-        if 'order_purchase_timestamp' in datasets['orders'].columns:
-            dates = pd.to_datetime(datasets['orders']['order_purchase_timestamp'], errors='coerce')
-            dates = dates.dropna()
-            if len(dates) > 0:
-                metrics['Fecha Más Antigua'] = dates.min().strftime('%Y-%m-%d')
-                metrics['Fecha Más Reciente'] = dates.max().strftime('%Y-%m-%d')
-                metrics['Rango Temporal'] = f"{(dates.max() - dates.min()).days} días"
-    
-    # Total de clientes únicos
-    if 'customers' in datasets:
-        metrics['Total de Clientes Únicos'] = f"{len(datasets['customers']):,}"
-    
-    # Total de vendedores únicos
-    if 'sellers' in datasets:
-        metrics['Total de Vendedores Únicos'] = f"{len(datasets['sellers']):,}"
-    
-    # Total de productos únicos
-    if 'products' in datasets:
-        metrics['Total de Productos Únicos'] = f"{len(datasets['products']):,}"
-    
-    # Total de items
-    if 'order_items' in datasets:
-        total_items = len(datasets['order_items'])
-        metrics['Total de Items Vendidos'] = f"{total_items:,}"
-        
-        # Valor total
-        if 'price' in datasets['order_items'].columns:
-            total_value = datasets['order_items']['price'].sum()
-            metrics['Valor Total de Ventas'] = f"R$ {total_value:,.2f}"
-            avg_order_value = total_value / total_orders if total_orders > 0 else 0
-            metrics['Valor Promedio por Orden'] = f"R$ {avg_order_value:,.2f}"
-    
-    # Reviews
-    if 'order_reviews' in datasets:
-        total_reviews = len(datasets['order_reviews'])
-        metrics['Total de Reviews'] = f"{total_reviews:,}"
-        
-        if 'review_score' in datasets['order_reviews'].columns:
-            avg_score = datasets['order_reviews']['review_score'].mean()
-            metrics['Review Score Promedio'] = f"{avg_score:.2f}"
+    metrics = {}
+    if kpi_store.available('total_orders'):
+        metrics['Total de Órdenes'] = f"{kpi_store['total_orders']:,}"
+        if kpi_store['first_purchase'] is not None:
+            metrics['Fecha Más Antigua'] = kpi_store['first_purchase']
+            metrics['Fecha Más Reciente'] = kpi_store['last_purchase']
+            metrics['Rango Temporal'] = f"{kpi_store['date_range_days']} días"
+    if kpi_store.available('total_customers'):
+        metrics['Total de Clientes'] = f"{kpi_store['total_customers']:,}"
+        metrics['Total de Clientes Únicos'] = f"{kpi_store['unique_customers']:,}"
+    if kpi_store.available('total_sellers'):
+        metrics['Total de Vendedores Únicos'] = f"{kpi_store['total_sellers']:,}"
+    if kpi_store.available('total_products'):
+        metrics['Total de Productos Únicos'] = f"{kpi_store['total_products']:,}"
+    if kpi_store.available('total_items'):
+        metrics['Total de Items Vendidos'] = f"{kpi_store['total_items']:,}"
+        metrics['Valor Total de Ventas'] = f"R$ {kpi_store['total_revenue']:,.2f}"
+    if kpi_store.available('avg_order_value'):
+        metrics['Valor Promedio por Orden'] = f"R$ {kpi_store['avg_order_value']:,.2f}"
+    if kpi_store.available('total_reviews'):
+        metrics['Total de Reviews'] = f"{kpi_store['total_reviews']:,}"
+        metrics['Review Score Promedio'] = f"{kpi_store['avg_review_score']:.2f}"
     
     # Mostrar métricas
     print("\n")
@@ -977,6 +732,10 @@ if datasets:
     metrics_df = pd.DataFrame(list(metrics.items()), columns=['Métrica', 'Valor'])
     print("\n")
     display(metrics_df)
+    
+    # Salida legible por dashboards externos
+    kpi_store.to_json('kpis.json')
+    print("\n💾 KPIs guardados en 'kpis.json'")
 else:
     print("⚠️ No hay datos cargados")
 
@@ -1048,6 +807,43 @@ else:
     print("⚠️ No hay datos de órdenes cargados")
 
 
+# #### Consultas por Período
+# 
+# Mantenemos `orders` ordenada por `order_purchase_timestamp`; cada ventana de tiempo (un mes, la semana de Black Friday, la comparación 2017 vs 2018) se resuelve con búsqueda binaria y se obtiene como un corte contiguo de la tabla, sin recorrerla completa.
+# 
+
+# In[ ]:
+
+
+if datasets and 'orders' in datasets:
+    orders_by_time = TimeSortedFrame(datasets['orders'])
+    
+    print("=" * 80)
+    print("CONSULTAS POR PERÍODO")
+    print("=" * 80)
+    
+    # Semana de Black Friday 2017
+    black_friday = orders_by_time.between('2017-11-20', '2017-11-27')
+    print(f"\n🛍️ Semana de Black Friday 2017: {len(black_friday):,} órdenes")
+    
+    # Comparación enero-agosto 2017 vs 2018 (mismo período en ambos años)
+    orders_2017 = orders_by_time.count('2017-01-01', '2017-09-01')
+    orders_2018 = orders_by_time.count('2018-01-01', '2018-09-01')
+    print(f"\n📅 Enero-Agosto 2017: {orders_2017:,} órdenes")
+    print(f"📅 Enero-Agosto 2018: {orders_2018:,} órdenes")
+    if orders_2017 > 0:
+        print(f"   Crecimiento: {(orders_2018 / orders_2017 - 1) * 100:.2f}%")
+    
+    # Ventanas móviles de 7 días
+    weekly_counts = orders_by_time.window_counts('7D', step='1D')
+    if len(weekly_counts) > 0:
+        print(f"\n📈 Ventana móvil de 7 días:")
+        print(f"   Máximo: {weekly_counts.max():,} órdenes (semana desde {weekly_counts.idxmax().date()})")
+        print(f"   Promedio: {weekly_counts.mean():.2f} órdenes")
+else:
+    print("⚠️ No hay datos de órdenes cargados")
+
+
 # #### 3.5.2 Análisis Geográfico
 # 
 # Analizamos la distribución geográfica de clientes, vendedores y órdenes.
@@ -1067,7 +863,7 @@ if datasets:
         if 'customer_state' in customers_df.columns:
             print(f"\n👥 DISTRIBUCIÓN DE CLIENTES POR ESTADO")
             print("-" * 80)
-            customer_by_state = customers_df['customer_state'].value_counts().head(10)
+            customer_by_state = top_counts(customers_df['customer_state'], 10)
             for state, count in customer_by_state.items():
                 pct = count / len(customers_df) * 100
                 print(f"   {state}: {count:,} clientes ({pct:.2f}%)")
@@ -1078,7 +874,7 @@ if datasets:
         if 'seller_state' in sellers_df.columns:
             print(f"\n🏪 DISTRIBUCIÓN DE VENDEDORES POR ESTADO")
             print("-" * 80)
-            seller_by_state = sellers_df['seller_state'].value_counts().head(10)
+            seller_by_state = top_counts(sellers_df['seller_state'], 10)
             for state, count in seller_by_state.items():
                 pct = count / len(sellers_df) * 100
                 print(f"   {state}: {count:,} vendedores ({pct:.2f}%)")
@@ -1098,7 +894,7 @@ if datasets:
             if 'customer_state' in orders_with_state.columns:
                 print(f"\n🛒 DISTRIBUCIÓN DE ÓRDENES POR ESTADO")
                 print("-" * 80)
-                orders_by_state = orders_with_state['customer_state'].value_counts().head(10)
+                orders_by_state = top_counts(orders_with_state['customer_state'], 10)
                 for state, count in orders_by_state.items():
                     pct = count / len(orders_with_state) * 100
                     print(f"   {state}: {count:,} órdenes ({pct:.2f}%)")
@@ -1106,6 +902,98 @@ else:
     print("⚠️ No hay datos cargados")
 
 
+# #### Distancia Cliente-Vendedor
+# 
+# Unimos `olist_geolocation_dataset.csv` (deduplicado por prefijo de CEP) con los CEP de clientes y vendedores y calculamos la distancia haversine de cada item. La columna `distance_km` queda agregada a `order_items` para relacionar distancia con flete y tiempo de entrega.
+# 
+
+# In[ ]:
+
+
+required_tables = ['order_items', 'orders', 'customers', 'sellers', 'geolocation']
+if datasets and all(key in datasets for key in required_tables):
+    print("=" * 80)
+    print("DISTANCIA CLIENTE-VENDEDOR")
+    print("=" * 80)
+    
+    datasets['order_items'] = attach_distances(datasets)
+    distances = datasets['order_items']['distance_km']
+    
+    print(f"\n📍 Items con distancia calculada: {distances.notna().sum():,} ({distances.notna().mean()*100:.2f}%)")
+    print(f"   Distancia promedio: {distances.mean():,.2f} km")
+    print(f"   Distancia mediana: {distances.median():,.2f} km")
+    print(f"   Distancia máxima: {distances.max():,.2f} km")
+    
+    # Flete y tiempo de entrega por rango de distancia
+    items_distance = datasets['order_items'].merge(
+        datasets['orders'][['order_id', 'order_purchase_timestamp', 'order_delivered_customer_date']],
+        on='order_id',
+        how='left'
+    )
+    items_distance['delivery_time_days'] = (
+        pd.to_datetime(items_distance['order_delivered_customer_date'], errors='coerce') -
+        pd.to_datetime(items_distance['order_purchase_timestamp'], errors='coerce')
+    ).dt.days
+    items_distance['distance_range'] = pd.cut(
+        items_distance['distance_km'],
+        bins=[-1, 100, 500, 1000, 2000, 5000],
+        labels=['0-100', '101-500', '501-1000', '1001-2000', '2000+']
+    )
+    distance_summary = items_distance.groupby('distance_range', observed=False).agg(
+        items=('order_id', 'count'),
+        flete_promedio=('freight_value', 'mean'),
+        entrega_promedio_dias=('delivery_time_days', 'mean')
+    )
+    print(f"\n🚚 Flete y tiempo de entrega por rango de distancia (km):")
+    display(distance_summary)
+else:
+    print("⚠️ Faltan tablas necesarias para calcular distancias")
+
+
+# #### Flujos Origen-Destino entre Estados
+# 
+# Conectamos la distribución de vendedores con la de clientes: una matriz estado del vendedor → estado del cliente con items, ingresos, flete y tiempo de entrega (media y percentiles) por par. La matriz se calcula en una sola pasada agrupada y se puede refrescar solo con las órdenes nuevas y las entregas de las órdenes que seguían pendientes (`flow_matrix.refresh(datasets)`) o guardar con `flow_matrix.save(...)`.
+# 
+
+# In[ ]:
+
+
+required_tables = ['order_items', 'orders', 'customers', 'sellers']
+if datasets and all(key in datasets for key in required_tables):
+    print("=" * 80)
+    print("FLUJOS ORIGEN-DESTINO (VENDEDOR → CLIENTE)")
+    print("=" * 80)
+    
+    flow_matrix = FlowMatrix.from_datasets(datasets)
+    flows_df = flow_matrix.to_frame()
+    
+    print(f"\n🔀 Pares origen-destino con ventas: {len(flows_df):,}")
+    print(f"\n🏆 TOP 10 FLUJOS POR ITEMS")
+    print("-" * 80)
+    for _, row in flows_df.head(10).iterrows():
+        print(f"   {row['seller_state']} → {row['customer_state']}: {row['items']:,} items, "
+              f"R$ {row['revenue']:,.2f}, entrega media {row['mean_delivery_days']:.1f} días "
+              f"(p90: {row['p90_delivery_days']:.0f})")
+    
+    # Heatmap de items entre los 10 estados con más flujo
+    items_matrix = flow_matrix.matrix('items')
+    top_states = top_k(items_matrix.sum(axis=0) + items_matrix.sum(axis=1), 10).index
+    fig, axes = plt.subplots(1, 2, figsize=(18, 7))
+    sns.heatmap(items_matrix.loc[top_states, top_states], annot=True, fmt='.0f', cmap='YlOrRd',
+                ax=axes[0], cbar_kws={'label': 'Items'})
+    axes[0].set_title('Items por Flujo Vendedor → Cliente', fontsize=12, fontweight='bold')
+    sns.heatmap(flow_matrix.matrix('mean_delivery_days').loc[top_states, top_states], annot=True, fmt='.1f',
+                cmap='RdYlGn_r', ax=axes[1], cbar_kws={'label': 'Días'})
+    axes[1].set_title('Tiempo de Entrega Promedio por Flujo (días)', fontsize=12, fontweight='bold')
+    for ax in axes:
+        ax.set_xlabel('Estado del Cliente')
+        ax.set_ylabel('Estado del Vendedor')
+    plt.tight_layout()
+    plt.show()
+else:
+    print("⚠️ Faltan tablas necesarias para el análisis de flujos")
+
+
 # #### 3.5.3 Análisis de Productos
 # 
 # Analizamos las categorías de productos, precios y productos más vendidos.
@@ -1126,7 +1014,7 @@ if datasets:
         if 'product_category_name' in products_df.columns:
             print(f"\n📦 DISTRIBUCIÓN DE CATEGORÍAS DE PRODUCTOS")
             print("-" * 80)
-            category_dist = products_df['product_category_name'].value_counts().head(15)
+            category_dist = top_counts(products_df['product_category_name'], 15)
             for category, count in category_dist.items():
                 pct = count / len(products_df) * 100
                 print(f"   {category}: {count:,} productos ({pct:.2f}%)")
@@ -1160,7 +1048,7 @@ if datasets:
                 'order_id': 'count',
                 'price': 'sum'
             }).rename(columns={'order_id': 'cantidad_items', 'price': 'revenue'})
-            category_sales = category_sales.sort_values('cantidad_items', ascending=False).head(15)
+            category_sales = top_k_frame(category_sales, 'cantidad_items', 15)
             
             for category, row in category_sales.iterrows():
                 print(f"   {category}:")
@@ -1182,7 +1070,7 @@ else:
 
 # #### 3.5.4 Análisis de Clientes
 # 
-# Analizamos patrones de comportamiento de los clientes.
+# Analizamos patrones de comportamiento de los clientes. La recurrencia se mide por `customer_unique_id` (en Olist `customer_id` es distinto en cada orden) y los clientes se segmentan por recencia, frecuencia y monto (RFM).
 # 
 
 # In[18]:
@@ -1196,13 +1084,16 @@ if datasets and 'orders' in datasets and 'customers' in datasets:
     orders_df = datasets['orders']
     customers_df = datasets['customers']
     
-    # Frecuencia de compras por cliente
-    orders_per_customer = orders_df['customer_id'].value_counts()
+    # Frecuencia de compras por cliente real: customer_id cambia en cada orden,
+    # el identificador estable del cliente es customer_unique_id
+    customer_base = CustomerBase.from_datasets(datasets)
+    orders_per_customer = customer_base.state['frequency']
     
     print(f"\n🛒 FRECUENCIA DE COMPRAS")
     print("-" * 80)
-    print(f"   Total de clientes únicos: {len(customers_df):,}")
+    print(f"   Total de clientes únicos: {customers_df['customer_unique_id'].nunique():,}")
     print(f"   Total de órdenes: {len(orders_df):,}")
+    print(f"   Órdenes válidas (sin canceladas ni no disponibles): {orders_per_customer.sum():,}")
     print(f"   Promedio de órdenes por cliente: {orders_per_customer.mean():.2f}")
     print(f"   Mediana de órdenes por cliente: {orders_per_customer.median():.2f}")
     print(f"   Máximo de órdenes por un cliente: {orders_per_customer.max()}")
@@ -1217,11 +1108,61 @@ if datasets and 'orders' in datasets and 'customers' in datasets:
     print(f"   Clientes con 2+ órdenes: {repeat_customers:,} ({repeat_customers/len(orders_per_customer)*100:.2f}%)")
     
     # Distribución de frecuencia
-    freq_dist = orders_per_customer.value_counts().sort_index().head(10)
+    freq_dist = customer_base.frequency_distribution().head(10)
     print(f"\n📊 DISTRIBUCIÓN DE FRECUENCIA DE COMPRAS")
     print("-" * 80)
     for freq, count in freq_dist.items():
         print(f"   {freq} orden(es): {count:,} clientes")
+    
+    # Segmentación RFM (recencia, frecuencia y monto)
+    segments = customer_base.segment_summary()
+    print(f"\n🎯 SEGMENTOS RFM")
+    print("-" * 80)
+    for segment, row in segments.iterrows():
+        print(f"   {segment}: {int(row['customers']):,} clientes, recencia media {row['avg_recency']:.0f} días, "
+              f"monto medio R$ {row['avg_monetary']:,.2f} ({row['revenue_share']:.1%} de los ingresos)")
+else:
+    print("⚠️ No hay datos de órdenes o clientes cargados")
+
+
+# #### Retención por Cohortes
+# 
+# Cada cliente (`customer_unique_id`) pertenece a la cohorte del mes de su primera compra. La matriz cuenta, para cada cohorte, cuántos clientes vuelven a comprar 1, 2, 3... meses después y cuánto gastan. Se calcula con un solo ordenamiento de las órdenes y puede extenderse mes a mes con `cohort_matrix.refresh(datasets)` sin recalcular las cohortes anteriores.
+# 
+
+# In[ ]:
+
+
+if datasets and 'orders' in datasets and 'customers' in datasets:
+    print("=" * 80)
+    print("RETENCIÓN POR COHORTES")
+    print("=" * 80)
+    
+    cohort_matrix = CohortMatrix.from_datasets(datasets)
+    cohort_sizes = cohort_matrix.cohort_sizes()
+    retention = cohort_matrix.retention()
+    
+    # Cohortes con volumen suficiente y primeros 12 meses
+    min_cohort_size = 100
+    valid_cohorts = cohort_sizes[cohort_sizes >= min_cohort_size].index
+    retention_view = retention.loc[valid_cohorts, 1:12] * 100
+    
+    print(f"\n👥 Cohortes mensuales: {len(cohort_sizes)} ({len(valid_cohorts)} con al menos {min_cohort_size} clientes)")
+    print(f"   Retención promedio al mes 1: {retention_view[1].mean():.2f}%")
+    if 3 in retention_view.columns:
+        print(f"   Retención promedio al mes 3: {retention_view[3].mean():.2f}%")
+    revenue_matrix = cohort_matrix.matrix('revenue')
+    repeat_revenue = revenue_matrix.loc[:, 1:].sum().sum() / revenue_matrix.sum().sum() * 100
+    print(f"   Ingresos de compras posteriores al primer mes: {repeat_revenue:.2f}%")
+    
+    fig, ax = plt.subplots(figsize=(14, max(6, len(valid_cohorts) * 0.35)))
+    sns.heatmap(retention_view, annot=True, fmt='.1f', cmap='YlGnBu', ax=ax,
+                cbar_kws={'label': '% de la cohorte que vuelve a comprar'})
+    ax.set_xlabel('Meses desde la Primera Compra', fontsize=11)
+    ax.set_ylabel('Cohorte (mes de primera compra)', fontsize=11)
+    ax.set_title('Retención Mensual por Cohorte (%)', fontsize=14, fontweight='bold')
+    plt.tight_layout()
+    plt.show()
 else:
     print("⚠️ No hay datos de órdenes o clientes cargados")
 
@@ -1247,7 +1188,6 @@ if datasets and 'order_items' in datasets and 'sellers' in datasets:
         'order_id': 'count',
         'price': 'sum'
     }).rename(columns={'order_id': 'total_items', 'price': 'total_revenue'})
-    seller_performance = seller_performance.sort_values('total_revenue', ascending=False)
     
     print(f"\n🏪 ESTADÍSTICAS GENERALES")
     print("-" * 80)
@@ -1259,7 +1199,7 @@ if datasets and 'order_items' in datasets and 'sellers' in datasets:
     # Top vendedores
     print(f"\n🏆 TOP 10 VENDEDORES POR INGRESOS")
     print("-" * 80)
-    top_sellers = seller_performance.head(10)
+    top_sellers = top_k_frame(seller_performance, 'total_revenue', 10)
     for idx, (seller_id, row) in enumerate(top_sellers.iterrows(), 1):
         print(f"   {idx}. {seller_id}:")
         print(f"      • Items vendidos: {row['total_items']:,}")
@@ -1272,10 +1212,75 @@ if datasets and 'order_items' in datasets and 'sellers' in datasets:
     print(f"   Mediana de ingresos por vendedor: R$ {seller_performance['total_revenue'].median():,.2f}")
     print(f"   Vendedor con más items: {seller_performance['total_items'].max():,} items")
     print(f"   Vendedor con más ingresos: R$ {seller_performance['total_revenue'].max():,.2f}")
+    
+    # Top 3 vendedores por ingresos dentro de cada uno de los 5 estados con más vendedores
+    if 'seller_state' in sellers_df.columns:
+        seller_performance_state = seller_performance.join(sellers_df.set_index('seller_id')['seller_state'])
+        top_seller_states = top_counts(sellers_df['seller_state'], 5).index
+        top_per_state = top_k_per_group(
+            seller_performance_state[seller_performance_state['seller_state'].isin(top_seller_states)],
+            'seller_state', 'total_revenue', 3
+        )
+        print(f"\n🏆 TOP 3 VENDEDORES POR ESTADO (5 estados con más vendedores)")
+        print("-" * 80)
+        for state, group in top_per_state.groupby('seller_state', sort=False):
+            print(f"   {state}:")
+            for seller_id, row in group.iterrows():
+                print(f"      • {seller_id}: R$ {row['total_revenue']:,.2f} ({row['total_items']:,} items)")
 else:
     print("⚠️ No hay datos de items o vendedores cargados")
 
 
+# #### Scorecard de Vendedores
+# 
+# Unimos ventas, entregas y reviews en una sola tabla por vendedor: items, ingresos, órdenes, tasa de cancelación, retraso promedio, porcentaje de entregas tardías y calificación promedio. Los vendedores se reparten por hash de `seller_id` y cada partición se agrega en paralelo (`workers`); los resultados parciales se suman al final.
+# 
+
+# In[ ]:
+
+
+required_tables = ['order_items', 'orders', 'order_reviews', 'sellers']
+if datasets and all(key in datasets for key in required_tables):
+    print("=" * 80)
+    print("SCORECARD DE VENDEDORES")
+    print("=" * 80)
+    
+    seller_scores = seller_scorecard(datasets)
+    # Solo vendedores con volumen suficiente para que las tasas sean estables
+    active_sellers = seller_scores[seller_scores['orders'] >= 30]
+    
+    print(f"\n🏪 Vendedores con al menos 30 órdenes: {len(active_sellers):,} de {len(seller_scores):,}")
+    print(f"   Tasa de cancelación mediana: {active_sellers['cancellation_rate'].median():.2%}")
+    print(f"   Entregas tardías (mediana): {active_sellers['late_rate'].median():.2%}")
+    print(f"   Calificación promedio (mediana): {active_sellers['avg_review_score'].median():.2f}")
+    
+    scorecard_columns = ['seller_state', 'orders', 'revenue', 'cancellation_rate',
+                         'late_rate', 'avg_delay_days', 'avg_review_score']
+    print(f"\n🏆 TOP 10 VENDEDORES POR INGRESOS")
+    print("-" * 80)
+    print(top_k_frame(seller_scores, 'revenue', 10)[scorecard_columns].to_string(float_format='{:,.2f}'.format))
+    
+    print(f"\n⚠️ 10 VENDEDORES CON PEOR CALIFICACIÓN (≥ 30 órdenes)")
+    print("-" * 80)
+    print(top_k_frame(active_sellers, 'avg_review_score', 10, largest=False)[scorecard_columns]
+          .to_string(float_format='{:,.2f}'.format))
+    
+    # Relación entre entregas tardías y calificación por vendedor
+    fig, ax = plt.subplots(figsize=(10, 6))
+    scatter = ax.scatter(active_sellers['late_rate'] * 100, active_sellers['avg_review_score'],
+                         s=np.sqrt(active_sellers['orders']) * 3, c=active_sellers['cancellation_rate'] * 100,
+                         cmap='RdYlGn_r', alpha=0.6, edgecolors='black', linewidth=0.3)
+    ax.set_xlabel('Entregas Tardías (%)', fontsize=11)
+    ax.set_ylabel('Calificación Promedio', fontsize=11)
+    ax.set_title('Vendedores: Entregas Tardías vs Calificación (tamaño = órdenes)', fontsize=12, fontweight='bold')
+    plt.colorbar(scatter, ax=ax, label='Cancelación (%)')
+    ax.grid(alpha=0.3)
+    plt.tight_layout()
+    plt.show()
+else:
+    print("⚠️ Faltan tablas necesarias para el scorecard de vendedores")
+
+
 # #### 3.5.6 Análisis de Pagos
 # 
 # Analizamos métodos de pago, valores y patrones de pago.
@@ -1402,9 +1407,193 @@ else:
     print("⚠️ No hay datos de reviews cargados")
 
 
+# #### Términos Frecuentes en los Comentarios
+# 
+# Procesamos títulos y comentarios de las reviews (en portugués): pasamos a minúsculas, quitamos acentos, separamos en palabras, descartamos stopwords y contamos palabras y bigramas por calificación. El conteo se hace por lotes en varios procesos y produce una tabla compacta (calificación, término, conteo) que alimenta directamente las nubes de palabras.
+# 
+
+# In[ ]:
+
+
+if datasets and 'order_reviews' in datasets:
+    print("=" * 80)
+    print("TÉRMINOS FRECUENTES EN LOS COMENTARIOS")
+    print("=" * 80)
+    
+    review_terms = term_counts(datasets['order_reviews'], by='review_score', ngram_range=(1, 2))
+    print(f"\n📝 Términos distintos (palabras y bigramas): {review_terms['term'].nunique():,}")
+    
+    for score in [1, 5]:
+        score_terms = review_terms[(review_terms['review_score'] == score) & (review_terms['n'] == 2)]
+        print(f"\n⭐ BIGRAMAS MÁS FRECUENTES EN REVIEWS DE {score} ESTRELLA(S)")
+        print("-" * 80)
+        for _, row in score_terms.head(10).iterrows():
+            print(f"   {row['term']}: {row['count']:,} reviews")
+    
+    fig, axes = plt.subplots(1, 2, figsize=(18, 7))
+    for ax, (score, colormap) in zip(axes, [(1, 'Reds'), (5, 'Greens')]):
+        score_frequencies = frequencies(review_terms, group=score)
+        if score_frequencies:
+            cloud = WordCloud(width=800, height=500, background_color='white', colormap=colormap)
+            ax.imshow(cloud.generate_from_frequencies(score_frequencies), interpolation='bilinear')
+        ax.set_title(f'Términos en Reviews de {score} Estrella(s)', fontsize=14, fontweight='bold')
+        ax.axis('off')
+    plt.tight_layout()
+    plt.show()
+else:
+    print("⚠️ No hay datos de reviews cargados")
+
+
+# #### Reviews Casi Duplicadas
+# 
+# `duplicated()` solo detecta filas idénticas. Aquí buscamos comentarios casi iguales (mismo texto con pequeños cambios), típicos de reviews copiadas o automatizadas: cada comentario se resume en una firma MinHash y las firmas se agrupan por bandas (LSH), lo que evita comparar todos los pares. Ignoramos comentarios cortos como "ótimo", que se repiten de forma natural.
+# 
+
+# In[ ]:
+
+
+if datasets and 'order_reviews' in datasets and 'order_items' in datasets:
+    print("=" * 80)
+    print("REVIEWS CASI DUPLICADAS")
+    print("=" * 80)
+    
+    duplicate_reviews = near_duplicates(datasets['order_reviews'])
+    n_clusters = duplicate_reviews['cluster'].nunique()
+    print(f"\n🔁 Reviews en grupos de casi duplicados: {len(duplicate_reviews):,} ({n_clusters:,} grupos)")
+    
+    if n_clusters > 0:
+        print(f"\n📋 GRUPOS MÁS GRANDES")
+        print("-" * 80)
+        largest = duplicate_reviews.drop_duplicates('cluster').head(5)
+        for _, row in largest.iterrows():
+            print(f"   {row['cluster_size']:,} reviews: \"{row['text'][:80]}\"")
+        
+        seller_duplicates = seller_duplicate_ratio(datasets, duplicate_reviews)
+        seller_duplicates = seller_duplicates[seller_duplicates['commented_reviews'] >= 20]
+        print(f"\n🏪 VENDEDORES CON MAYOR PROPORCIÓN DE REVIEWS DUPLICADAS (≥ 20 comentarios)")
+        print("-" * 80)
+        for seller_id, row in top_k_frame(seller_duplicates, 'duplicate_ratio', 10).iterrows():
+            print(f"   {seller_id}: {row['duplicate_ratio']:.1%} "
+                  f"({int(row['duplicated_reviews']):,} de {int(row['commented_reviews']):,})")
+else:
+    print("⚠️ No hay datos de reviews o items cargados")
+
+
+# #### Ciclo de Vida de las Reviews
+# 
+# Usamos las fechas de creación y respuesta de cada review, que hasta ahora no se analizaban: cuánto tarda el cliente en dejar la review desde la entrega, cuánto tarda en responderse, y qué proporción de reviews se crea antes de recibir el pedido. Los tiempos se resumen por calificación y por estado.
+# 
+
+# In[ ]:
+
+
+if datasets and 'order_reviews' in datasets and 'orders' in datasets:
+    print("=" * 80)
+    print("CICLO DE VIDA DE LAS REVIEWS")
+    print("=" * 80)
+    
+    review_lifecycle = ReviewLifecycle.from_datasets(datasets)
+    overall = review_lifecycle.summary().iloc[0]
+    
+    print(f"\n⏱️ TIEMPOS (días)")
+    print("-" * 80)
+    for stage, label in REVIEW_STAGE_LABELS.items():
+        print(f"   {label}: media {overall[f'{stage}_mean']:.2f}, p50 {overall[f'{stage}_p50']:.2f}, "
+              f"p90 {overall[f'{stage}_p90']:.2f} ({int(overall[f'{stage}_n']):,} reviews)")
+    print(f"   Reviews respondidas: {overall['answered_rate']:.2%}")
+    print(f"   Reviews de órdenes sin entrega: {overall['undelivered_rate']:.2%}")
+    print(f"   Reviews creadas antes de la entrega (órdenes entregadas): {overall['before_delivery_rate']:.2%}")
+    
+    by_score = review_lifecycle.summary('review_score')
+    print(f"\n⭐ POR CALIFICACIÓN")
+    print("-" * 80)
+    for score, row in by_score.iterrows():
+        print(f"   {score} estrellas: entrega → review p50 {row['delivery_to_review_p50']:.1f} días, "
+              f"respuesta p50 {row['review_to_answer_p50']:.1f} días, "
+              f"antes de la entrega {row['before_delivery_rate']:.1%}, sin entrega {row['undelivered_rate']:.1%}")
+    
+    if 'customer_state' in review_lifecycle.reviews.columns:
+        by_state = review_lifecycle.summary('customer_state', min_count=100)
+        print(f"\n🗺️ ESTADOS CON RESPUESTA MÁS LENTA (p90, ≥ 100 reviews)")
+        print("-" * 80)
+        for state, row in top_k_frame(by_state, 'review_to_answer_p90', 5).iterrows():
+            print(f"   {state}: p90 {row['review_to_answer_p90']:.1f} días ({int(row['reviews']):,} reviews)")
+    
+    fig, axes = plt.subplots(1, 2, figsize=(16, 6))
+    scores = by_score.index.astype(str)
+    axes[0].bar(scores, by_score['delivery_to_review_p50'], color='steelblue', alpha=0.7, label='p50')
+    axes[0].plot(scores, by_score['delivery_to_review_p90'], 'o--', color='darkred', label='p90')
+    axes[0].set_xlabel('Review Score')
+    axes[0].set_ylabel('Días')
+    axes[0].set_title('Entrega → Creación de la Review', fontsize=12, fontweight='bold')
+    axes[0].legend()
+    axes[0].grid(axis='y', alpha=0.3)
+    positions = np.arange(len(scores))
+    axes[1].bar(positions - 0.2, by_score['before_delivery_rate'] * 100, width=0.4, color='coral', alpha=0.7,
+                label='Antes de la entrega (entregadas)')
+    axes[1].bar(positions + 0.2, by_score['undelivered_rate'] * 100, width=0.4, color='gray', alpha=0.7,
+                label='Orden sin entrega')
+    axes[1].set_xticks(positions)
+    axes[1].set_xticklabels(scores)
+    axes[1].set_xlabel('Review Score')
+    axes[1].set_ylabel('% de Reviews')
+    axes[1].set_title('Reviews Antes de la Entrega y Sin Entrega', fontsize=12, fontweight='bold')
+    axes[1].legend()
+    axes[1].grid(axis='y', alpha=0.3)
+    plt.tight_layout()
+    plt.show()
+else:
+    print("⚠️ No hay datos de reviews u órdenes cargados")
+
+
+# #### Sentimiento de los Comentarios
+# 
+# Asignamos a cada review con texto un puntaje de sentimiento entre -1 y 1 usando un léxico de palabras en portugués (con manejo de negaciones como "não recebi"). Comparándolo con `review_score` encontramos inconsistencias, por ejemplo 5 estrellas con un comentario negativo. Los puntajes se guardan en una caché por hash del comentario, así los comentarios que no cambian no se vuelven a puntuar. El resultado queda como columnas `sentiment` y `sentiment_label` de `order_reviews`.
+# 
+
+# In[ ]:
+
+
+if datasets and 'order_reviews' in datasets:
+    print("=" * 80)
+    print("SENTIMIENTO DE LOS COMENTARIOS")
+    print("=" * 80)
+    
+    sentiment_cache = SentimentCache()
+    datasets['order_reviews'] = attach_sentiment(datasets['order_reviews'], cache=sentiment_cache)
+    reviews_df = datasets['order_reviews']
+    scored = reviews_df.dropna(subset=['sentiment'])
+    
+    print(f"\n💬 Reviews con texto puntuadas: {len(scored):,} ({len(sentiment_cache):,} comentarios distintos)")
+    print(f"   Correlación sentimiento vs review_score: {scored['sentiment'].corr(scored['review_score']):.3f}")
+    
+    print(f"\n📊 ETIQUETA DE SENTIMIENTO POR CALIFICACIÓN (%)")
+    print("-" * 80)
+    label_share = crosstab(scored['review_score'], scored['sentiment_label'])
+    print((label_share.div(label_share.sum(axis=1), axis=0) * 100).round(1).to_string())
+    
+    mismatches = scored[(scored['review_score'] == 5) & (scored['sentiment_label'] == 'negativo')]
+    print(f"\n⚠️ Reviews de 5 estrellas con comentario negativo: {len(mismatches):,}")
+    for text in mismatches['review_comment_message'].dropna().head(3):
+        print(f"   • {text[:100]}")
+    
+    # Relación con el cumplimiento de la fecha estimada de entrega
+    if 'orders' in datasets:
+        order_dates = datasets['orders'].set_index('order_id')
+        delivered = pd.to_datetime(scored['order_id'].map(order_dates['order_delivered_customer_date']), errors='coerce')
+        estimated = pd.to_datetime(scored['order_id'].map(order_dates['order_estimated_delivery_date']), errors='coerce')
+        delivery_status = np.where(delivered.isna(), 'sin entrega', np.where(delivered > estimated, 'con retraso', 'a tiempo'))
+        print(f"\n🚚 SENTIMIENTO PROMEDIO SEGÚN LA ENTREGA")
+        print("-" * 80)
+        for status, mean_sentiment in scored['sentiment'].groupby(delivery_status).mean().items():
+            print(f"   {status}: {mean_sentiment:+.3f}")
+else:
+    print("⚠️ No hay datos de reviews cargados")
+
+
 # #### 3.5.8 Análisis de Entregas
 # 
-# Analizamos tiempos de entrega, estados de entrega y retrasos.
+# Analizamos tiempos de entrega, estados de entrega y retrasos. El tiempo de entrega se descompone en etapas (aprobación, preparación del vendedor y transporte) y se resume con percentiles p50/p90/p99, que también pueden obtenerse por vendedor, categoría o mes con `delivery_times.percentiles(...)`.
 # 
 
 # In[ ]:
@@ -1439,22 +1628,29 @@ if datasets and 'orders' in datasets:
             pct = count / len(orders_df) * 100
             print(f"   {status}: {count:,} órdenes ({pct:.2f}%)")
 
-    # Cálculo de tiempos de entrega (desde compra hasta entrega al cliente)
-    if 'order_delivered_customer_date' in orders_df.columns and 'order_purchase_timestamp' in orders_df.columns:
-        orders_df['delivery_time'] = (
-            orders_df['order_delivered_customer_date'] -
-            orders_df['order_purchase_timestamp']
-        ).dt.days
+    # Tiempos por etapa (compra → aprobación → transportista → cliente), calculados una vez
+    delivery_times = DeliveryTimes.from_datasets(datasets)
+    valid_delivery = delivery_times.stage_days('total').dropna()
 
-        valid_delivery = orders_df['delivery_time'].dropna()
+    if len(valid_delivery) > 0:
+        print(f"\n⏱️ TIEMPO DE ENTREGA (Compra → Cliente)")
+        print("-" * 80)
+        print(f"   Tiempo promedio: {valid_delivery.mean():.2f} días")
+        print(f"   Tiempo mediano: {valid_delivery.median():.2f} días")
+        print(f"   Tiempo mínimo: {valid_delivery.min():.2f} días")
+        print(f"   Tiempo máximo: {valid_delivery.max():.2f} días")
 
-        if len(valid_delivery) > 0:
-            print(f"\n⏱️ TIEMPO DE ENTREGA (Compra → Cliente)")
+        print(f"\n🚚 TIEMPOS POR ETAPA (días)")
+        print("-" * 80)
+        print(delivery_times.stage_summary().to_string(float_format='{:.2f}'.format))
+
+        if 'customer_state' in delivery_times.orders.columns:
+            state_sla = delivery_times.percentiles('customer_state', stages=('total',), min_count=100)
+            print(f"\n🗺️ PERCENTILES DE ENTREGA POR ESTADO (Compra → Cliente, ≥ 100 órdenes)")
             print("-" * 80)
-            print(f"   Tiempo promedio: {valid_delivery.mean():.2f} días")      
-            print(f"   Tiempo mediano: {valid_delivery.median():.2f} días")     
-            print(f"   Tiempo mínimo: {valid_delivery.min():.0f} días")
-            print(f"   Tiempo máximo: {valid_delivery.max():.0f} días")
+            for state, row in top_k_frame(state_sla, 'total_p90', 10).iterrows():
+                print(f"   {state}: p50 {row['total_p50']:.1f}, p90 {row['total_p90']:.1f}, "
+                      f"p99 {row['total_p99']:.1f} días ({int(row['total_n']):,} órdenes)")
 
     # Tiempo estimado vs real
     if 'order_estimated_delivery_date' in orders_df.columns and 'order_delivered_customer_date' in orders_df.columns:
@@ -1527,14 +1723,14 @@ if datasets and 'orders' in datasets:
             axes[0, 1].text(yearly_orders.index[i], v, str(v), ha='center', va='bottom')
         
         # Gráfica 3: Heatmap de órdenes por mes y día de semana
-        heatmap_data = orders_df.pivot_table(
-            values='order_id', 
-            index='day_of_week', 
-            columns='month', 
-            aggfunc='count'
-        )
         day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        heatmap_data = heatmap_data.reindex(day_order)
+        heatmap_data = crosstab(
+            orders_df['day_of_week_num'],
+            orders_df['month'],
+            row_labels=range(7),
+            col_labels=range(1, 13)
+        )
+        heatmap_data.index = day_order
         sns.heatmap(heatmap_data, annot=True, fmt='.0f', cmap='YlOrRd', ax=axes[1, 0], cbar_kws={'label': 'Órdenes'})
         axes[1, 0].set_title('Heatmap: Órdenes por Día de Semana y Mes', fontsize=14, fontweight='bold')
         axes[1, 0].set_xlabel('Mes')
@@ -1575,7 +1771,7 @@ if datasets:
             how='left'
         )
         if 'customer_state' in orders_with_state.columns:
-            top_states = orders_with_state['customer_state'].value_counts().head(10)
+            top_states = top_counts(orders_with_state['customer_state'], 10)
             axes[0].barh(range(len(top_states)), top_states.values, color='steelblue', alpha=0.7)
             axes[0].set_yticks(range(len(top_states)))
             axes[0].set_yticklabels(top_states.index)
@@ -1590,8 +1786,8 @@ if datasets:
         sellers_df = datasets['sellers']
         
         if 'customer_state' in customers_df.columns and 'seller_state' in sellers_df.columns:
-            customer_by_state = customers_df['customer_state'].value_counts().head(10)
-            seller_by_state = sellers_df['seller_state'].value_counts().head(10)
+            customer_by_state = top_counts(customers_df['customer_state'], 10)
+            seller_by_state = top_counts(sellers_df['seller_state'], 10)
             
             states = sorted(set(list(customer_by_state.index) + list(seller_by_state.index)))[:10]
             customer_counts = [customer_by_state.get(s, 0) for s in states]
@@ -1621,12 +1817,12 @@ if datasets:
         if 'customer_state' in orders_with_state.columns:
             state_orders = orders_with_state['customer_state'].value_counts()
             # Normalizar para el mapa de calor
-            normalized = (state_orders / state_orders.max() * 100).sort_values(ascending=False)
+            normalized = top_k(state_orders / state_orders.max() * 100, 15)
             
-            im = axes[2].barh(range(len(normalized.head(15))), normalized.head(15).values, 
-                             cmap='YlOrRd', alpha=0.7)
-            axes[2].set_yticks(range(len(normalized.head(15))))
-            axes[2].set_yticklabels(normalized.head(15).index)
+            im = axes[2].barh(range(len(normalized)), normalized.values, 
+                             color=plt.cm.YlOrRd(normalized.values / 100), alpha=0.7)
+            axes[2].set_yticks(range(len(normalized)))
+            axes[2].set_yticklabels(normalized.index)
             axes[2].set_xlabel('Intensidad Relativa (%)')
             axes[2].set_title('Mapa de Calor: Órdenes por Estado', fontsize=12, fontweight='bold')
             axes[2].grid(axis='x', alpha=0.3)
@@ -1660,7 +1856,7 @@ if datasets and 'order_items' in datasets and 'products' in datasets:
     
     # Gráfica 8: Top 15 categorías de productos
     if 'product_category_name' in items_with_products.columns:
-        top_categories = items_with_products['product_category_name'].value_counts().head(15)
+        top_categories = top_counts(items_with_products['product_category_name'], 15)
         axes[0, 0].barh(range(len(top_categories)), top_categories.values, color='teal', alpha=0.7)
         axes[0, 0].set_yticks(range(len(top_categories)))
         axes[0, 0].set_yticklabels([cat[:30] + '...' if len(cat) > 30 else cat for cat in top_categories.index])
@@ -1722,7 +1918,7 @@ if datasets and 'orders' in datasets and 'customers' in datasets:
     
     # Gráfica 12: Distribución de clientes por estado
     if 'customer_state' in customers_df.columns:
-        top_states = customers_df['customer_state'].value_counts().head(10)
+        top_states = top_counts(customers_df['customer_state'], 10)
         axes[0].bar(range(len(top_states)), top_states.values, color='mediumseagreen', alpha=0.7)
         axes[0].set_xticks(range(len(top_states)))
         axes[0].set_xticklabels(top_states.index, rotation=45, ha='right')
@@ -1730,8 +1926,9 @@ if datasets and 'orders' in datasets and 'customers' in datasets:
         axes[0].set_title('Top 10 Estados por Número de Clientes', fontsize=12, fontweight='bold')
         axes[0].grid(axis='y', alpha=0.3)
     
-    # Gráfica 13: Frecuencia de compras
-    orders_per_customer = orders_df['customer_id'].value_counts()
+    # Gráfica 13: Frecuencia de compras (por customer_unique_id)
+    customer_base = CustomerBase.from_datasets(datasets)
+    orders_per_customer = customer_base.state['frequency']
     axes[1].hist(orders_per_customer.values, bins=20, color='orange', alpha=0.7, edgecolor='black')
     axes[1].set_xlabel('Número de Órdenes por Cliente')
     axes[1].set_ylabel('Número de Clientes')
@@ -1778,7 +1975,7 @@ if datasets and 'order_items' in datasets and 'sellers' in datasets:
     fig, axes = plt.subplots(1, 3, figsize=(18, 6))
     
     # Gráfica 15: Top 20 vendedores por volumen
-    top_sellers = seller_performance.sort_values('total_items', ascending=False).head(20)
+    top_sellers = top_k_frame(seller_performance, 'total_items', 20)
     axes[0].barh(range(len(top_sellers)), top_sellers['total_items'].values, color='gold', alpha=0.7)
     axes[0].set_yticks(range(len(top_sellers)))
     axes[0].set_yticklabels([f'Seller {i+1}' for i in range(len(top_sellers))])
@@ -1789,7 +1986,7 @@ if datasets and 'order_items' in datasets and 'sellers' in datasets:
     
     # Gráfica 16: Distribución de vendedores por estado
     if 'seller_state' in sellers_df.columns:
-        seller_by_state = sellers_df['seller_state'].value_counts().head(10)
+        seller_by_state = top_counts(sellers_df['seller_state'], 10)
         axes[1].bar(range(len(seller_by_state)), seller_by_state.values, color='mediumpurple', alpha=0.7)
         axes[1].set_xticks(range(len(seller_by_state)))
         axes[1].set_xticklabels(seller_by_state.index, rotation=45, ha='right')
@@ -1833,10 +2030,9 @@ if datasets and 'order_payments' in datasets:
     
     # Gráfica 19: Boxplot valor por método de pago
     if 'payment_type' in payments_df.columns and 'payment_value' in payments_df.columns:
-        payment_types = payments_df['payment_type'].unique()
-        data_to_plot = [payments_df[payments_df['payment_type'] == pt]['payment_value'].values 
-                        for pt in payment_types]
-        bp = axes[0, 1].boxplot(data_to_plot, labels=payment_types, patch_artist=True)
+        # Estadísticas de todos los métodos en una sola pasada ordenada
+        payment_box_stats = grouped_box_stats(payments_df['payment_value'], payments_df['payment_type'])
+        bp = axes[0, 1].bxp(payment_box_stats, patch_artist=True)
         for patch in bp['boxes']:
             patch.set_facecolor('lightblue')
         axes[0, 1].set_ylabel('Valor de Pago (R$)')
@@ -1856,14 +2052,18 @@ if datasets and 'order_payments' in datasets:
     
     # Gráfica 21: Relación valor-tiempo de pago (scatter)
     if 'payment_value' in payments_df.columns and 'payment_installments' in payments_df.columns:
-        sample = payments_df.sample(min(5000, len(payments_df)))
-        axes[1, 1].scatter(sample['payment_installments'], sample['payment_value'], 
-                          alpha=0.3, s=10, color='purple')
+        # Densidad con todos los pagos (bins por cuota entera, valor hasta el percentil 95)
+        value_limit = payments_df['payment_value'].quantile(0.95)
+        installment_edges = integer_edges(payments_df['payment_installments'])
+        mesh = density_plot(axes[1, 1], payments_df['payment_installments'], payments_df['payment_value'],
+                            bins=[installment_edges, 50],
+                            range=[[installment_edges[0], installment_edges[-1]], [0, value_limit]],
+                            cmap='Purples')
+        plt.colorbar(mesh, ax=axes[1, 1], label='Pagos (escala log)')
         axes[1, 1].set_xlabel('Número de Cuotas')
         axes[1, 1].set_ylabel('Valor de Pago (R$)')
         axes[1, 1].set_title('Relación: Valor vs Número de Cuotas', fontsize=12, fontweight='bold')
         axes[1, 1].grid(True, alpha=0.3)
-        axes[1, 1].set_ylim(0, payments_df['payment_value'].quantile(0.95))
     
     plt.tight_layout()
     plt.suptitle('Análisis de Pagos', y=1.02, fontsize=16, fontweight='bold')
@@ -1927,14 +2127,17 @@ if datasets and 'order_reviews' in datasets:
         if 'delivery_time_days' in reviews_with_delivery.columns and 'review_score' in reviews_with_delivery.columns:
             valid_data = reviews_with_delivery.dropna(subset=['delivery_time_days', 'review_score'])
             if len(valid_data) > 0:
-                sample = valid_data.sample(min(5000, len(valid_data)))
-                axes[1, 0].scatter(sample['delivery_time_days'], sample['review_score'], 
-                                  alpha=0.3, s=10, color='steelblue')
+                score_edges = integer_edges(valid_data['review_score'])
+                days_limit = valid_data['delivery_time_days'].quantile(0.95)
+                mesh = density_plot(axes[1, 0], valid_data['delivery_time_days'], valid_data['review_score'],
+                                    bins=[40, score_edges],
+                                    range=[[0, days_limit], [score_edges[0], score_edges[-1]]],
+                                    cmap='Blues')
+                plt.colorbar(mesh, ax=axes[1, 0], label='Reviews (escala log)')
                 axes[1, 0].set_xlabel('Tiempo de Entrega (días)')
                 axes[1, 0].set_ylabel('Review Score')
                 axes[1, 0].set_title('Review Score vs Tiempo de Entrega', fontsize=12, fontweight='bold')
                 axes[1, 0].grid(True, alpha=0.3)
-                axes[1, 0].set_xlim(0, valid_data['delivery_time_days'].quantile(0.95))
     
     # Gráfica 25: Boxplot review score por estado de entrega
     if 'order_id' in reviews_df.columns and 'orders' in datasets:
@@ -1946,13 +2149,11 @@ if datasets and 'order_reviews' in datasets:
         )
         
         if 'order_status' in reviews_with_status.columns and 'review_score' in reviews_with_status.columns:
-            statuses = reviews_with_status['order_status'].unique()
-            data_to_plot = [reviews_with_status[reviews_with_status['order_status'] == s]['review_score'].values 
-                          for s in statuses if len(reviews_with_status[reviews_with_status['order_status'] == s]) > 0]
-            statuses = [s for s in statuses if len(reviews_with_status[reviews_with_status['order_status'] == s]) > 0]
+            status_box_stats = grouped_box_stats(reviews_with_status['review_score'],
+                                                 reviews_with_status['order_status'])
             
-            if len(data_to_plot) > 0:
-                bp = axes[1, 1].boxplot(data_to_plot, labels=statuses, patch_artist=True)
+            if len(status_box_stats) > 0:
+                bp = axes[1, 1].bxp(status_box_stats, patch_artist=True)
                 for patch in bp['boxes']:
                     patch.set_facecolor('lightcoral')
                 axes[1, 1].set_ylabel('Review Score')
@@ -1982,13 +2183,9 @@ if datasets and 'orders' in datasets:
     
     fig, axes = plt.subplots(2, 2, figsize=(16, 12))
     
-    # Gráfica 26: Distribución de tiempos de entrega
-    if 'order_delivered_customer_date' in orders_df.columns and 'order_delivered_carrier_date' in orders_df.columns:
-        orders_df['delivery_time'] = (
-            orders_df['order_delivered_customer_date'] - 
-            orders_df['order_delivered_carrier_date']
-        ).dt.days
-        valid_delivery = orders_df['delivery_time'].dropna()
+    # Gráfica 26: Distribución de tiempos de entrega (Compra → Cliente, igual que en 3.5.8)
+    if 'order_delivered_customer_date' in orders_df.columns:
+        valid_delivery = delivery_times.stage_days('total').dropna()
         
         if len(valid_delivery) > 0:
             axes[0, 0].hist(valid_delivery, bins=30, color='lightblue', alpha=0.7, edgecolor='black')
@@ -1996,7 +2193,7 @@ if datasets and 'orders' in datasets:
             axes[0, 0].axvline(valid_delivery.median(), color='green', linestyle='--', linewidth=2, label=f'Mediana: {valid_delivery.median():.1f} días')
             axes[0, 0].set_xlabel('Tiempo de Entrega (días)')
             axes[0, 0].set_ylabel('Frecuencia')
-            axes[0, 0].set_title('Distribución de Tiempos de Entrega', fontsize=12, fontweight='bold')
+            axes[0, 0].set_title('Distribución de Tiempos de Entrega (Compra → Cliente)', fontsize=12, fontweight='bold')
             axes[0, 0].legend()
             axes[0, 0].grid(axis='y', alpha=0.3)
             axes[0, 0].set_xlim(0, valid_delivery.quantile(0.95))
@@ -2118,14 +2315,17 @@ if datasets:
         if 'review_score' in main_df.columns and 'order_value' in main_df.columns:
             valid_data = main_df.dropna(subset=['review_score', 'order_value'])
             if len(valid_data) > 0:
-                sample = valid_data.sample(min(5000, len(valid_data)))
-                axes[1].scatter(sample['order_value'], sample['review_score'], 
-                              alpha=0.3, s=10, color='steelblue')
+                score_edges = integer_edges(valid_data['review_score'])
+                value_limit = valid_data['order_value'].quantile(0.95)
+                mesh = density_plot(axes[1], valid_data['order_value'], valid_data['review_score'],
+                                    bins=[50, score_edges],
+                                    range=[[0, value_limit], [score_edges[0], score_edges[-1]]],
+                                    cmap='Blues')
+                plt.colorbar(mesh, ax=axes[1], label='Órdenes (escala log)')
                 axes[1].set_xlabel('Valor de Orden (R$)')
                 axes[1].set_ylabel('Review Score')
                 axes[1].set_title('Review Score vs Valor de Orden', fontsize=12, fontweight='bold')
                 axes[1].grid(True, alpha=0.3)
-                axes[1].set_xlim(0, sample['order_value'].quantile(0.95))
         
         # Gráfica 32: Relación tiempo de entrega vs satisfacción
         if 'delivery_time_days' in main_df.columns and 'review_score' in main_df.columns:
@@ -2158,6 +2358,40 @@ else:
     print("⚠️ No hay datos cargados")
 
 
+# #### Cubo OLAP de Métricas
+# 
+# Pre-agregamos las medidas principales (órdenes, items, ingresos, flete y entregas) sobre las dimensiones del negocio: mes, estado del cliente, estado del vendedor, categoría, método de pago, estado de la orden y review score. El dashboard y cualquier consulta por estado, mes o categoría se responden desde estos agregados sin volver a recorrer las tablas crudas.
+# 
+
+# In[ ]:
+
+
+if datasets and 'orders' in datasets:
+    print("=" * 80)
+    print("CUBO OLAP DE MÉTRICAS")
+    print("=" * 80)
+    
+    cube = OlapCube.from_datasets(datasets, rollups=[
+        ('year_month',),
+        ('product_category_name',),
+        ('payment_type',),
+        ('customer_state', 'year_month')
+    ])
+    
+    print(f"\n🧊 Agregados materializados:")
+    for dims, (codes, _) in cube.cuboids.items():
+        print(f"   • {' × '.join(dims)}: {len(codes):,} celdas")
+    
+    # Ejemplo de slice: evolución mensual de las órdenes de SP
+    sp_monthly = cube.query(by='year_month', where={'customer_state': 'SP'},
+                            measures=['orders', 'revenue'], dropna=True)
+    print(f"\n📍 Órdenes e ingresos mensuales en SP (últimos 6 meses):")
+    display(sp_monthly.tail(6))
+else:
+    cube = None
+    print("⚠️ No hay datos de órdenes cargados")
+
+
 # #### Visualización 33: Dashboard Resumen con KPIs
 # 
 # Creamos un dashboard resumen con los KPIs principales del negocio.
@@ -2166,22 +2400,18 @@ else:
 # In[ ]:
 
 
-if datasets:
+if datasets and cube is not None:
     fig = plt.figure(figsize=(16, 10))
     gs = fig.add_gridspec(3, 4, hspace=0.3, wspace=0.3)
     
-    # Calcular KPIs
-    total_orders = len(datasets['orders']) if 'orders' in datasets else 0
-    total_customers = len(datasets['customers']) if 'customers' in datasets else 0
-    total_reviews = len(datasets['order_reviews']) if 'order_reviews' in datasets else 0
-    avg_review_score = datasets['order_reviews']['review_score'].mean() if 'order_reviews' in datasets and 'review_score' in datasets['order_reviews'].columns else 0
-    
-    if 'order_items' in datasets and 'price' in datasets['order_items'].columns:
-        total_revenue = datasets['order_items']['price'].sum()
-        avg_order_value = total_revenue / total_orders if total_orders > 0 else 0
-    else:
-        total_revenue = 0
-        avg_order_value = 0
+    # KPIs desde el almacén compartido: solo se recalculan los de tablas modificadas
+    kpi_store.refresh(datasets)
+    total_orders = kpi_store['total_orders']
+    total_customers = kpi_store.get('total_customers', 0)
+    total_reviews = kpi_store.get('total_reviews', 0)
+    avg_review_score = kpi_store.get('avg_review_score', 0)
+    total_revenue = kpi_store.get('total_revenue', 0)
+    avg_order_value = kpi_store.get('avg_order_value', 0)
     
     # KPI 1: Total de Órdenes
     ax1 = fig.add_subplot(gs[0, 0])
@@ -2228,15 +2458,9 @@ if datasets:
     
     # Gráfica: Evolución temporal
     ax6 = fig.add_subplot(gs[1, 2:])
-    if 'orders' in datasets and 'order_purchase_timestamp' in datasets['orders'].columns:
-        orders_df = datasets['orders'].copy()
-        orders_df['order_purchase_timestamp'] = pd.to_datetime(
-            orders_df['order_purchase_timestamp'], errors='coerce'
-        )
-        orders_df = orders_df.dropna(subset=['order_purchase_timestamp'])
-        orders_df['year_month'] = orders_df['order_purchase_timestamp'].dt.to_period('M')
-        monthly_orders = orders_df.groupby('year_month').size()
-        ax6.plot(monthly_orders.index.astype(str), monthly_orders.values, marker='o', linewidth=2)
+    monthly_orders = cube.query(by='year_month', measures=['orders'], dropna=True)['orders']
+    if len(monthly_orders) > 0:
+        ax6.plot(monthly_orders.index, monthly_orders.values, marker='o', linewidth=2)
         ax6.set_xlabel('Mes')
         ax6.set_ylabel('Número de Órdenes')
         ax6.set_title('Evolución de Órdenes en el Tiempo', fontsize=12, fontweight='bold')
@@ -2245,16 +2469,10 @@ if datasets:
     
     # Gráfica: Top categorías
     ax7 = fig.add_subplot(gs[2, :2])
-    if 'order_items' in datasets and 'products' in datasets:
-        items_df = datasets['order_items']
-        products_df = datasets['products']
-        items_with_products = items_df.merge(
-            products_df[['product_id', 'product_category_name']], 
-            on='product_id', 
-            how='left'
-        )
-        if 'product_category_name' in items_with_products.columns:
-            top_categories = items_with_products['product_category_name'].value_counts().head(10)
+    if 'products' in datasets:
+        category_items = cube.query(by='product_category_name', measures=['items'], dropna=True)['items']
+        if len(category_items) > 0:
+            top_categories = top_k(category_items, 10)
             ax7.barh(range(len(top_categories)), top_categories.values, color='teal', alpha=0.7)
             ax7.set_yticks(range(len(top_categories)))
             ax7.set_yticklabels([cat[:25] + '...' if len(cat) > 25 else cat for cat in top_categories.index])
@@ -2265,12 +2483,13 @@ if datasets:
     
     # Gráfica: Métodos de pago
     ax8 = fig.add_subplot(gs[2, 2:])
-    if 'order_payments' in datasets and 'payment_type' in datasets['order_payments'].columns:
-        payment_methods = datasets['order_payments']['payment_type'].value_counts()
+    if 'order_payments' in datasets:
+        payment_methods = cube.query(by='payment_type', measures=['orders'], dropna=True)['orders']
+        payment_methods = payment_methods.sort_values(ascending=False)
         colors = plt.cm.Set3(np.linspace(0, 1, len(payment_methods)))
         ax8.pie(payment_methods.values, labels=payment_methods.index, autopct='%1.1f%%',
                colors=colors, startangle=90, textprops={'fontsize': 9})
-        ax8.set_title('Distribución de Métodos de Pago', fontsize=12, fontweight='bold')
+        ax8.set_title('Método de Pago Principal por Orden', fontsize=12, fontweight='bold')
     
     plt.suptitle('Dashboard Resumen - KPIs Principales', y=0.98, fontsize=16, fontweight='bold')
     plt.show()
@@ -2278,6 +2497,92 @@ else:
     print("⚠️ No hay datos cargados")
 
 
+# #### Exploración Interactiva (Drill-down)
+# 
+# Construimos una tabla a nivel orden (orders + customers + order_items + order_reviews) con un bitmap por cada valor de estado, categoría, estado de la orden, mes y review score, más un flag de entregas con retraso. Los filtros del panel se resuelven con operaciones AND/OR sobre los bitmaps y recalculan los KPIs y gráficas de la sección sobre el subconjunto seleccionado.
+# 
+
+# In[ ]:
+
+
+if datasets and 'orders' in datasets:
+    drill_facts, drill_index = build_order_index(datasets)
+    
+    print(f"🔎 Índice de bitmaps sobre {len(drill_facts):,} órdenes:")
+    for dim, bitmaps in drill_index.bitmaps.items():
+        print(f"   • {dim}: {len(bitmaps):,} bitmaps")
+    
+    # Ejemplo: órdenes de SP con entrega tardía
+    sp_late = drill_index.select({'customer_state': ['SP'], 'late': [True]})
+    print(f"\n📍 Órdenes de SP con retraso: {drill_index.count(sp_late):,}")
+    
+    try:
+        panel = filter_panel(drill_facts, drill_index)
+    except ImportError as e:
+        print(f"⚠️ {e}")
+else:
+    print("⚠️ No hay datos de órdenes cargados")
+
+
+# #### Exportación de Figuras
+# 
+# Las figuras principales del reporte (temporal, geográfico, productos, clientes, vendedores, pagos, reviews, entregas, relacional y dashboard) se registran en `ecommerce_brasil.figures`. Los agregados de cada figura se calculan una sola vez y el dibujo se reparte entre procesos con el backend Agg, sin abrir ventanas; los archivos quedan en la carpeta `figuras/`.
+# 
+# Cada figura se identifica con un hash de sus agregados y de su configuración de dibujo (código, formato, dpi y estilo). Las figuras cuyo hash ya está en la caché (`figuras/.cache/`) se copian desde disco en lugar de volver a dibujarse, así una actualización diaria solo redibuja las gráficas afectadas por los datos nuevos.
+# 
+
+# In[ ]:
+
+
+if datasets and 'orders' in datasets:
+    figure_inputs = build_figure_inputs(datasets)
+    figure_cache = FigureCache('figuras/.cache')
+    rendered = render_figures(figure_inputs, 'figuras', formats=('png',), dpi=100, cache=figure_cache)
+    
+    print(f"🖼️ {len(rendered)} figuras exportadas a 'figuras/':")
+    for name, row in rendered.iterrows():
+        origin = 'caché' if row['cached'] else f"{row['seconds']:.2f} s"
+        print(f"   • {name}: {origin}")
+    print(f"\n♻️ Servidas desde caché: {int(rendered['cached'].sum())} de {len(rendered)}")
+    print(f"⏱️ Tiempo total de dibujo: {rendered['seconds'].sum():.2f} s")
+else:
+    print("⚠️ No hay datos de órdenes cargados")
+
+
+# #### Ejecución por Etapas con Checkpoints
+# 
+# El mismo análisis se puede ejecutar como un flujo de etapas con entradas y salidas declaradas: `load` → `type_fix` → (`validate`, `profile`, `facts`, `kpis`, `customers`, `cohorts`, `deliveries`) → (`sellers`, `figure_inputs`) → `figures`. Cada etapa guarda sus salidas en `.checkpoints/` con una clave que combina su código, sus parámetros y las claves de sus dependencias; en la siguiente ejecución solo se recalculan las etapas cuya clave cambió (por ejemplo, si cambian los CSV, el código de una etapa o el de cualquier módulo del paquete que esa etapa usa), y las etapas independientes se ejecutan en paralelo.
+# 
+# La ejecución se mide con un `Profiler`: cada etapa, la carga de cada tabla, la conversión de fechas, cada regla de validación, cada KPI y cada figura registran tiempo de reloj, tiempo de CPU y memoria (RSS del proceso y pico de RSS durante la sección). El perfil se guarda en `run_profile.json` / `run_profile.csv` para comparar ejecuciones.
+# 
+
+# In[ ]:
+
+
+if DATA_PATH:
+    pipeline = olist_pipeline(checkpoint_dir='.checkpoints')
+    pipeline_params = {'data_path': DATA_PATH, 'output_dir': 'figuras', 'figure_cache_dir': 'figuras/.cache'}
+    with Profiler() as run_profiler:
+        pipeline_outputs = pipeline.run(
+            targets=['validation', 'profile', 'kpis', 'seller_scorecard', 'customer_segments', 'delivery_stages'],
+            params=pipeline_params
+        )
+    run_profiler.to_json('run_profile.json')
+    run_profiler.to_csv('run_profile.csv')
+    
+    print("🧩 Etapas del flujo:")
+    for stage, row in pipeline.last_run.iterrows():
+        print(f"   • {stage}: {row['status']} ({row['seconds']:.2f} s)")
+    
+    print(f"\n📋 Reglas de validación con casos: {(pipeline_outputs['validation']['Cantidad'] > 0).sum()}")
+    print(f"🏪 Vendedores en el scorecard: {len(pipeline_outputs['seller_scorecard']):,}")
+    
+    print("\n⏱️ Perfil de la ejecución por categoría (guardado en 'run_profile.json'):")
+    display(run_profiler.summary().round(3))
+else:
+    print("⚠️ Configura DATA_PATH para ejecutar el flujo por etapas")
+
+
 # ## 4. Conclusiones Iniciales
 # 
 # ### 4.1 Resumen de Hallazgos Principales
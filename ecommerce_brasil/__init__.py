@@ -0,0 +1,100 @@
+"""Motores de cómputo reutilizables para el análisis del dataset Olist"""
+from .crosstab import encode, bincount_grid, crosstab
+from .facts import parse_order_dates, build_order_facts, build_item_facts
+from .cube import OlapCube
+from .bitmap import BitmapIndex, build_order_index
+from .drilldown import filter_panel, filtered_kpis
+from .timeindex import TimeSortedFrame
+from .geo import zip_coordinates, haversine_km, attach_distances
+from .flows import FlowMatrix
+from .ranking import top_k, top_k_frame, top_counts, top_k_per_group, StreamingTopK
+from .sellers import seller_scorecard
+from .customers import CustomerBase
+from .cohorts import CohortMatrix
+from .delivery import DeliveryTimes
+from .reviews import ReviewLifecycle, REVIEW_STAGE_LABELS
+from .text import fold_text, tokenize, term_counts, frequencies
+from .dedup import minhash_signatures, near_duplicates, seller_duplicate_ratio
+from .sentiment import lexicon_scores, SentimentCache, attach_sentiment
+from .boxstats import grouped_box_stats
+from .density import integer_edges, density_grid, density_plot, draw_density
+from .kpis import KPIS, register_kpi, KPIStore, kpi_dict, write_kpis, read_kpis
+from .quality import OLIST_FILES, VALIDATION_RULES, load_tables, fix_types, validate, profile
+from .figures import FIGURES, register_figure, build_figure_inputs, render_figures, FigureCache
+from .profiling import Profiler, section
+from .pipeline import Stage, Pipeline, CheckpointStore
+from .stages import OLIST_STAGES, SECTIONS, section_plan, olist_pipeline
+from .synthetic import generate_olist, write_olist
+
+__all__ = [
+    'encode',
+    'bincount_grid',
+    'crosstab',
+    'parse_order_dates',
+    'build_order_facts',
+    'build_item_facts',
+    'OlapCube',
+    'BitmapIndex',
+    'build_order_index',
+    'filter_panel',
+    'filtered_kpis',
+    'TimeSortedFrame',
+    'zip_coordinates',
+    'haversine_km',
+    'attach_distances',
+    'FlowMatrix',
+    'top_k',
+    'top_k_frame',
+    'top_counts',
+    'top_k_per_group',
+    'StreamingTopK',
+    'seller_scorecard',
+    'CustomerBase',
+    'CohortMatrix',
+    'DeliveryTimes',
+    'ReviewLifecycle',
+    'REVIEW_STAGE_LABELS',
+    'fold_text',
+    'tokenize',
+    'term_counts',
+    'frequencies',
+    'minhash_signatures',
+    'near_duplicates',
+    'seller_duplicate_ratio',
+    'lexicon_scores',
+    'SentimentCache',
+    'attach_sentiment',
+    'grouped_box_stats',
+    'integer_edges',
+    'density_grid',
+    'density_plot',
+    'draw_density',
+    'KPIS',
+    'register_kpi',
+    'KPIStore',
+    'kpi_dict',
+    'write_kpis',
+    'read_kpis',
+    'FIGURES',
+    'register_figure',
+    'build_figure_inputs',
+    'render_figures',
+    'FigureCache',
+    'OLIST_FILES',
+    'VALIDATION_RULES',
+    'load_tables',
+    'fix_types',
+    'validate',
+    'profile',
+    'Profiler',
+    'section',
+    'Stage',
+    'Pipeline',
+    'CheckpointStore',
+    'OLIST_STAGES',
+    'SECTIONS',
+    'section_plan',
+    'olist_pipeline',
+    'generate_olist',
+    'write_olist',
+]
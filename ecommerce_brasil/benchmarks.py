@@ -0,0 +1,250 @@
+"""Benchmarks del análisis sobre datos sintéticos a distintas escalas
+
+`python -m ecommerce_brasil.benchmarks --scales 1,10` genera (o reutiliza) los
+CSV sintéticos de cada escala y mide carga, corrección de tipos, validación,
+hechos, agregados por sección y figuras con las mismas funciones de etapa que
+usa el flujo. Con `--baseline` compara contra una ejecución guardada y termina
+con código 1 si algún benchmark es más lento que el umbral.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from . import stages
+from .quality import OLIST_FILES
+from .synthetic import generate_olist, write_olist
+
+BENCHMARKS = {}
+
+RESULT_COLUMNS = ['benchmark', 'group', 'scale', 'rows', 'best_s', 'median_s', 'repeat']
+
+
+def register_benchmark(name, group):
+    """Registra `func(context)` como benchmark; solo se mide la llamada, no la preparación"""
+    def decorator(func):
+        BENCHMARKS[name] = {'group': group, 'func': func}
+        return func
+    return decorator
+
+
+class BenchmarkContext:
+    """Datos de una escala, preparados una sola vez y fuera de la medición"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def raw(self):
+        return self._get('raw', lambda: stages.load_stage(self.data_dir, None)['raw'])
+
+    @property
+    def datasets(self):
+        return self._get('datasets', lambda: stages.type_fix_stage(self.raw)['datasets'])
+
+    @property
+    def order_facts(self):
+        return self._get('order_facts', lambda: stages.facts_stage(self.datasets)['order_facts'])
+
+    @property
+    def figure_inputs(self):
+        return self._get('figure_inputs',
+                         lambda: stages.figure_inputs_stage(self.datasets, self.order_facts)['figure_inputs'])
+
+    @property
+    def rows(self):
+        return sum(len(df) for df in self.raw.values())
+
+
+@register_benchmark('load', 'carga')
+def _load(context):
+    return stages.load_stage(context.data_dir, None)
+
+
+@register_benchmark('type_fix', 'carga')
+def _type_fix(context):
+    return stages.type_fix_stage(context.raw)
+
+
+@register_benchmark('validation', 'validación')
+def _validation(context):
+    return stages.validate_stage(context.datasets)
+
+
+@register_benchmark('facts', 'hechos')
+def _facts(context):
+    return stages.facts_stage(context.datasets)
+
+
+@register_benchmark('kpis', 'agregados')
+def _kpis(context):
+    return stages.kpis_stage(context.datasets)
+
+
+@register_benchmark('sellers', 'agregados')
+def _sellers(context):
+    return stages.sellers_stage(context.datasets, context.order_facts, workers=1)
+
+
+@register_benchmark('customers', 'agregados')
+def _customers(context):
+    return stages.customers_stage(context.datasets)
+
+
+@register_benchmark('cohorts', 'agregados')
+def _cohorts(context):
+    return stages.cohorts_stage(context.datasets)
+
+
+@register_benchmark('deliveries', 'agregados')
+def _deliveries(context):
+    return stages.deliveries_stage(context.datasets)
+
+
+@register_benchmark('figure_inputs', 'figuras')
+def _figure_inputs(context):
+    return stages.figure_inputs_stage(context.datasets, context.order_facts)
+
+
+@register_benchmark('figures', 'figuras')
+def _figures(context):
+    with tempfile.TemporaryDirectory() as output_dir:
+        return stages.figures_stage(context.figure_inputs, output_dir, workers=1, figure_cache_dir=None)
+
+
+def synthetic_data_dir(workdir, scale, seed=42):
+    """Directorio con los CSV sintéticos de la escala; se generan solo si faltan"""
+    data_dir = Path(workdir) / f'olist-x{scale:g}-seed{seed}'
+    if not all((data_dir / f).exists() for f in OLIST_FILES.values()):
+        write_olist(generate_olist(scale=scale, seed=seed), data_dir)
+    return data_dir
+
+
+def time_call(func, context, repeat):
+    """Tiempos de `repeat` llamadas (con el recolector de basura limpio antes de cada una)"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(context)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_benchmarks(scales=(1,), repeat=3, names=None, workdir='.benchmarks', seed=42):
+    """Una fila por benchmark y escala con el mejor tiempo y la mediana"""
+    names = list(names or BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        raise KeyError(f"Benchmarks desconocidos: {unknown}; disponibles: {list(BENCHMARKS)}")
+    rows = []
+    for scale in scales:
+        context = BenchmarkContext(synthetic_data_dir(workdir, scale, seed))
+        for name in names:
+            times = time_call(BENCHMARKS[name]['func'], context, repeat)
+            rows.append({
+                'benchmark': name, 'group': BENCHMARKS[name]['group'], 'scale': scale, 'rows': context.rows,
+                'best_s': min(times), 'median_s': statistics.median(times), 'repeat': repeat
+            })
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def save_results(results, path):
+    """Guarda los resultados como línea base, con datos del entorno donde se midieron"""
+    payload = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'results': json.loads(results.to_json(orient='records'))
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return pd.DataFrame(json.load(f)['results'], columns=RESULT_COLUMNS)
+
+
+def compare(results, baseline, threshold=0.2, min_seconds=0.05):
+    """Compara el mejor tiempo con la línea base por benchmark y escala
+
+    Un benchmark es regresión si tarda más de `1 + threshold` veces la línea
+    base y además al menos `min_seconds` más, para no reportar el ruido de
+    los benchmarks muy cortos.
+    """
+    merged = results.merge(baseline[['benchmark', 'scale', 'best_s']], on=['benchmark', 'scale'],
+                           how='left', suffixes=('', '_baseline'))
+    merged['ratio'] = merged['best_s'] / merged['best_s_baseline']
+    slower = merged['best_s'] - merged['best_s_baseline']
+    merged['status'] = 'ok'
+    merged.loc[merged['best_s_baseline'].isna(), 'status'] = 'nuevo'
+    merged.loc[(merged['ratio'] < 1 - threshold) & (-slower >= min_seconds), 'status'] = 'mejora'
+    merged.loc[(merged['ratio'] > 1 + threshold) & (slower >= min_seconds), 'status'] = 'regresión'
+    return merged[['benchmark', 'scale', 'best_s', 'best_s_baseline', 'ratio', 'status']]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ecommerce_brasil.benchmarks',
+        description='Benchmarks del análisis sobre datos sintéticos de Olist'
+    )
+    parser.add_argument('--scales', default='1', help='Escalas separadas por comas, p. ej. 1,10,100 (por defecto: 1)')
+    parser.add_argument('--only', default=','.join(BENCHMARKS),
+                        help=f"Benchmarks separados por comas: {','.join(BENCHMARKS)} (por defecto todos)")
+    parser.add_argument('--repeat', type=int, default=3, help='Repeticiones por benchmark (por defecto: 3)')
+    parser.add_argument('--workdir', default='.benchmarks',
+                        help='Directorio de los datos sintéticos generados (por defecto: .benchmarks)')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla del generador (por defecto: 42)')
+    parser.add_argument('--baseline', help='JSON con una ejecución anterior contra la cual comparar')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Aumento relativo tolerado antes de marcar regresión (por defecto: 0.2)')
+    parser.add_argument('--save', help='Guarda los resultados en este JSON (p. ej. como nueva línea base)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    scales = [float(s) for s in args.scales.split(',') if s.strip()]
+    try:
+        results = run_benchmarks(scales=scales, repeat=args.repeat, workdir=args.workdir, seed=args.seed,
+                                 names=[n.strip() for n in args.only.split(',') if n.strip()])
+    except KeyError as e:
+        print(f"error: {e.args[0]}", file=sys.stderr)
+        return 2
+    print(results.round(3).to_string(index=False))
+    if args.save:
+        save_results(results, args.save)
+        print(f"-> {args.save}")
+    if not args.baseline:
+        return 0
+
+    comparison = compare(results, load_results(args.baseline), threshold=args.threshold)
+    print()
+    print(comparison.round(3).to_string(index=False))
+    regressions = comparison[comparison['status'] == 'regresión']
+    if len(regressions):
+        print(f"\n⚠️ {len(regressions)} benchmark(s) más lentos que la línea base (umbral {args.threshold:.0%})",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
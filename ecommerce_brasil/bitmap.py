@@ -0,0 +1,121 @@
+"""Índice de bitmaps empaquetados para filtrar la tabla de órdenes"""
+import numpy as np
+import pandas as pd
+
+from .crosstab import encode
+from .facts import build_order_facts
+
+# Número de bits en 1 para cada byte posible
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+
+class BitmapIndex:
+    """Un bitmap empaquetado (np.packbits) por valor de cada dimensión
+
+    Cada bitmap ocupa n/8 bytes. Los filtros combinan valores de una misma
+    dimensión con OR y dimensiones distintas con AND, operando byte a byte sin
+    tocar la tabla original.
+    """
+
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self.n_bytes = (n_rows + 7) // 8
+        self.bitmaps = {}
+
+    def add_dimension(self, name, values, na_label=None):
+        """Indexa una dimensión con un valor por fila"""
+        codes, labels = encode(values, na_label=na_label)
+        self.bitmaps[name] = {
+            label: np.packbits(codes == code) for code, label in enumerate(labels)
+        }
+
+    def add_multi_dimension(self, name, rows, values):
+        """Indexa una dimensión multivaluada a partir de pares (fila, valor)
+
+        Útil para atributos de los items de una orden: una orden queda en el
+        bitmap de cada categoría que contiene.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        codes, labels = encode(values)
+        valid = codes >= 0
+        rows, codes = rows[valid], codes[valid]
+        order = np.argsort(codes, kind='stable')
+        rows, codes = rows[order], codes[order]
+        bounds = np.searchsorted(codes, np.arange(len(labels) + 1))
+        self.bitmaps[name] = {}
+        for code, label in enumerate(labels):
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[rows[bounds[code]:bounds[code + 1]]] = True
+            self.bitmaps[name][label] = np.packbits(mask)
+
+    def add_flag(self, name, mask):
+        """Indexa una condición booleana precomputada (p. ej. entrega tardía)"""
+        self.bitmaps[name] = {True: np.packbits(np.asarray(mask, dtype=bool))}
+
+    def values(self, name):
+        """Valores indexados de una dimensión"""
+        return list(self.bitmaps[name])
+
+    def any_of(self, name, values):
+        """OR de los bitmaps de `values` dentro de la dimensión `name`"""
+        result = np.zeros(self.n_bytes, dtype=np.uint8)
+        for value in values:
+            bitmap = self.bitmaps[name].get(value)
+            if bitmap is not None:
+                np.bitwise_or(result, bitmap, out=result)
+        return result
+
+    def select(self, filters):
+        """AND entre dimensiones de `filters` {dimensión: valores}
+
+        Una dimensión con lista vacía (o None) no filtra. Devuelve el bitmap
+        resultante.
+        """
+        result = np.packbits(np.ones(self.n_rows, dtype=bool))
+        for name, values in filters.items():
+            if values is None:
+                continue
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+            if len(values) == 0:
+                continue
+            np.bitwise_and(result, self.any_of(name, values), out=result)
+        return result
+
+    @staticmethod
+    def count(bitmap):
+        """Número de filas seleccionadas por un bitmap"""
+        return int(_POPCOUNT[bitmap].sum())
+
+    def rows(self, bitmap):
+        """Posiciones de las filas seleccionadas por un bitmap"""
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.n_rows))
+
+
+def build_order_index(datasets, order_facts=None):
+    """Tabla a nivel orden y su índice de bitmaps para drill-down
+
+    Dimensiones: customer_state, order_status, year_month, review_score,
+    product_category_name (multivaluada, vía order_items) y el flag `late`.
+    """
+    if order_facts is None:
+        order_facts = build_order_facts(datasets)
+    index = BitmapIndex(len(order_facts))
+    for dim in ['customer_state', 'order_status', 'year_month', 'review_score']:
+        index.add_dimension(dim, order_facts[dim])
+
+    items = datasets.get('order_items')
+    products = datasets.get('products')
+    if items is not None and products is not None:
+        positions = pd.Series(np.arange(len(order_facts)), index=order_facts['order_id'])
+        categories = items[['order_id', 'product_id']].merge(
+            products[['product_id', 'product_category_name']], on='product_id', how='left'
+        )
+        rows = categories['order_id'].map(positions)
+        valid = rows.notna()
+        index.add_multi_dimension('product_category_name',
+                                  rows[valid].to_numpy(dtype=np.int64),
+                                  categories.loc[valid, 'product_category_name'])
+
+    index.add_flag('late', (order_facts['delay_days'] > 0).to_numpy())
+    return order_facts, index
@@ -0,0 +1,69 @@
+"""Estadísticas de boxplot por grupo en una sola pasada (formato de `Axes.bxp`)"""
+import numpy as np
+import pandas as pd
+
+
+def _linear_quantile(sorted_values, starts, counts, q):
+    """Cuantil con interpolación lineal (como `np.percentile`) de cada bloque ordenado"""
+    position = q * (counts - 1)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, counts - 1)
+    low_value = sorted_values[starts + lower]
+    high_value = sorted_values[starts + upper]
+    return low_value + (high_value - low_value) * (position - lower)
+
+
+def grouped_box_stats(values, groups, whis=1.5, sort_groups=False):
+    """Una entrada de estadísticas de boxplot por grupo, lista para `ax.bxp`
+
+    Ordena una sola vez por (grupo, valor) y calcula cuartiles, bigotes
+    (el dato más extremo dentro de `whis`·IQR), media, intervalo de la mediana
+    y fliers de todos los grupos a la vez; mismo criterio que
+    `matplotlib.cbook.boxplot_stats`. Los grupos mantienen el orden de
+    aparición (o alfabético con `sort_groups=True`) y los valores nulos se
+    descartan.
+    """
+    values = pd.Series(values).to_numpy(dtype=np.float64)
+    codes, labels = pd.factorize(pd.Series(groups), sort=sort_groups)
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes = codes[valid]
+    values = values[valid]
+    order = np.lexsort((values, codes))
+    codes = codes[order]
+    values = values[order]
+
+    n_groups = len(labels)
+    counts = np.bincount(codes, minlength=n_groups)
+    present = np.flatnonzero(counts)
+    starts = (np.cumsum(counts) - counts)[present]
+    counts = counts[present]
+
+    q1 = _linear_quantile(values, starts, counts, 0.25)
+    med = _linear_quantile(values, starts, counts, 0.5)
+    q3 = _linear_quantile(values, starts, counts, 0.75)
+    iqr = q3 - q1
+    mean = np.bincount(codes, weights=values, minlength=n_groups)[present] / counts
+
+    # Bigotes: extremos de los datos dentro de las vallas de cada grupo
+    slot = np.full(n_groups, -1)
+    slot[present] = np.arange(len(present))
+    group = slot[codes]
+    inside_low = values >= (q1 - whis * iqr)[group]
+    inside_high = values <= (q3 + whis * iqr)[group]
+    whislo = np.minimum.reduceat(np.where(inside_low, values, np.inf), starts)
+    whishi = np.maximum.reduceat(np.where(inside_high, values, -np.inf), starts)
+    whislo = np.where(np.isinf(whislo) | (whislo > q1), q1, whislo)
+    whishi = np.where(np.isinf(whishi) | (whishi < q3), q3, whishi)
+
+    is_flier = (values < whislo[group]) | (values > whishi[group])
+    flier_groups = np.split(values[is_flier], np.cumsum(np.bincount(group[is_flier], minlength=len(present)))[:-1])
+
+    notch = 1.57 * iqr / np.sqrt(counts)
+    return [
+        {
+            'label': labels[g], 'mean': mean[i], 'iqr': iqr[i], 'q1': q1[i], 'med': med[i], 'q3': q3[i],
+            'cilo': med[i] - notch[i], 'cihi': med[i] + notch[i],
+            'whislo': whislo[i], 'whishi': whishi[i], 'fliers': flier_groups[i]
+        }
+        for i, g in enumerate(present)
+    ]
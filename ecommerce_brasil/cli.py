@@ -0,0 +1,111 @@
+"""Línea de comandos: `python -m ecommerce_brasil --data-path ... --only sellers`
+
+Ejecuta solo las etapas que necesitan las secciones pedidas (leyendo solo sus
+tablas) y escribe cada resultado en el directorio de salida: tablas en CSV,
+KPIs también en JSON y figuras en `<salida>/figuras`. Con `--profile` se
+escribe además el perfil de tiempo y memoria por sección (`run_profile.json` y
+`run_profile.csv`). Si al terminar falta alguno de los archivos de figuras,
+no se escribe `figures.csv` y el código de salida es 1.
+"""
+import argparse
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+import pandas as pd
+
+from .kpis import kpi_dict, write_kpis
+from .profiling import Profiler
+from .stages import SECTIONS, missing_figure_files, olist_pipeline, section_plan
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ecommerce_brasil',
+        description='Análisis del dataset Olist por etapas con checkpoints'
+    )
+    parser.add_argument('--data-path', default=os.environ.get('OLIST_DATA_PATH'),
+                        help='Directorio con los CSV de Olist (por defecto $OLIST_DATA_PATH)')
+    parser.add_argument('--only', default=','.join(SECTIONS),
+                        help=f"Secciones separadas por comas: {','.join(SECTIONS)} (por defecto todas)")
+    parser.add_argument('--output-dir', default='salida', help='Directorio de resultados (por defecto: salida)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Procesos/hilos en paralelo (por defecto: núcleos disponibles)')
+    parser.add_argument('--cache-dir', default='.checkpoints',
+                        help="Directorio de checkpoints de las etapas (por defecto: .checkpoints)")
+    parser.add_argument('--no-cache', action='store_true', help='No leer ni escribir checkpoints')
+    parser.add_argument('--force', default='', help='Etapas a recalcular aunque tengan checkpoint, separadas por comas')
+    parser.add_argument('--profile', action='store_true',
+                        help='Mide tiempo y RSS por sección y escribe run_profile.json/.csv')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Con --profile, mide también el pico de memoria de Python (tracemalloc; más lento)')
+    parser.add_argument('--list', action='store_true', help='Muestra las secciones y sus salidas y termina')
+    return parser.parse_args(argv)
+
+
+def write_output(name, value, output_dir):
+    """Guarda una salida del flujo; devuelve la ruta escrita o None si no aplica"""
+    if isinstance(value, pd.DataFrame):
+        path = os.path.join(output_dir, f'{name}.csv')
+        value.to_csv(path, index=not isinstance(value.index, pd.RangeIndex))
+        return path
+    return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list:
+        for section, (targets, tables) in SECTIONS.items():
+            print(f"{section}: {', '.join(targets)} (tablas: {', '.join(tables)})")
+        return 0
+    if not args.data_path or not os.path.isdir(args.data_path):
+        print(f"error: no existe el directorio de datos: {args.data_path!r} (usa --data-path)", file=sys.stderr)
+        return 2
+
+    sections = [s.strip() for s in args.only.split(',') if s.strip()]
+    try:
+        targets, tables = section_plan(sections)
+    except KeyError as e:
+        print(f"error: {e.args[0]}", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    pipeline = olist_pipeline(checkpoint_dir=None if args.no_cache else args.cache_dir, workers=args.workers)
+    params = {
+        'data_path': args.data_path,
+        'tables': tables,
+        'workers': args.workers,
+        'output_dir': os.path.join(args.output_dir, 'figuras'),
+        'figure_cache_dir': None if args.no_cache else os.path.join(args.cache_dir, 'figuras')
+    }
+    profiler = Profiler(trace_memory=args.trace_memory) if args.profile else None
+    start = time.perf_counter()
+    with profiler or nullcontext():
+        outputs = pipeline.run(targets=targets, params=params,
+                               force=[s.strip() for s in args.force.split(',') if s.strip()])
+
+    for stage, row in pipeline.last_run.iterrows():
+        print(f"{stage:<14} {row['status']:<11} {row['seconds']:8.2f} s")
+    status = 0
+    if outputs.get('figures') is not None:
+        missing = missing_figure_files(outputs['figures'])
+        if missing:
+            # No se escribe figures.csv apuntando a archivos que no existen
+            print(f"error: faltan {len(missing)} archivos de figuras, p. ej. {missing[0]}", file=sys.stderr)
+            outputs.pop('figures')
+            status = 1
+    if outputs.get('kpis') is not None:
+        write_kpis(kpi_dict(outputs['kpis'], outputs.get('kpi_versions')), os.path.join(args.output_dir, 'kpis.json'))
+    for name, value in outputs.items():
+        path = write_output(name, value, args.output_dir)
+        if path:
+            print(f"-> {path}")
+    if profiler is not None:
+        profiler.to_json(os.path.join(args.output_dir, 'run_profile.json'))
+        profiler.to_csv(os.path.join(args.output_dir, 'run_profile.csv'))
+        print(f"-> {os.path.join(args.output_dir, 'run_profile.json')}")
+        print()
+        print(profiler.summary().round(3).to_string())
+    print(f"Total: {time.perf_counter() - start:.2f} s")
+    return status
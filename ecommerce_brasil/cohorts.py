@@ -0,0 +1,134 @@
+"""Matriz de retención por cohortes de primera compra (customer_unique_id)"""
+import numpy as np
+import pandas as pd
+
+from .customers import EXCLUDED_STATUSES, customer_inputs
+
+COHORT_MEASURES = ['customers', 'revenue']
+
+
+def to_months(timestamps):
+    """Fechas como meses enteros desde 1970-01 (int64)"""
+    values = pd.to_datetime(timestamps, errors='coerce').to_numpy(dtype='datetime64[ns]')
+    return values.astype('datetime64[M]').astype(np.int64)
+
+
+def month_label(month):
+    """Etiqueta 'AAAA-MM' de un mes entero"""
+    return str(np.datetime64(int(month), 'M'))
+
+
+class CohortMatrix:
+    """Clientes activos e ingresos por (mes de cohorte, meses desde la primera compra)
+
+    Cada lote se ordena una sola vez por (cliente, mes) y las celdas se
+    acumulan con un `bincount` sobre el código combinado cohorte × desfase.
+    El último mes cargado queda "abierto": al refrescar se descuenta su aporte
+    y se recalcula junto con los meses nuevos, sin tocar las cohortes
+    anteriores.
+    """
+
+    def __init__(self, exclude_statuses=EXCLUDED_STATUSES):
+        self.exclude_statuses = tuple(exclude_statuses)
+        self.base_month = None
+        self.last_month = None
+        self.first_month = pd.Series(dtype=np.int64)
+        self.totals = {m: np.zeros((0, 0), dtype=np.float64) for m in COHORT_MEASURES}
+        self._open = None
+
+    @classmethod
+    def from_datasets(cls, datasets, **kwargs):
+        """Construye la matriz con todas las órdenes disponibles"""
+        matrix = cls(**kwargs)
+        matrix.refresh(datasets)
+        return matrix
+
+    def _grow(self, last_month):
+        """Amplía las matrices para cubrir cohortes y desfases hasta `last_month`"""
+        size = last_month - self.base_month + 1
+        current = self.totals['customers'].shape[0]
+        if size > current:
+            pad = ((0, size - current), (0, size - current))
+            self.totals = {m: np.pad(v, pad) for m, v in self.totals.items()}
+
+    def _cells(self, cohort, offset, active, value, n):
+        """Aportes por celda (cohorte, desfase) de un conjunto de órdenes"""
+        combined = (cohort - self.base_month) * n + offset
+        return {
+            'customers': np.bincount(combined[active], minlength=n * n).reshape(n, n).astype(np.float64),
+            'revenue': np.bincount(combined, weights=value, minlength=n * n).reshape(n, n)
+        }
+
+    def update(self, inputs):
+        """Acumula órdenes del mes abierto en adelante (salida de `customer_inputs`)"""
+        if len(inputs) == 0:
+            return self
+        # Reabrir el último mes: descontar su aporte y olvidar sus clientes nuevos
+        if self._open is not None:
+            n_open = self._open['customers'].shape[0]
+            for m in COHORT_MEASURES:
+                self.totals[m][:n_open, :n_open] -= self._open[m]
+            self.first_month = self.first_month.drop(self._open['new_customers'])
+
+        month = to_months(inputs['purchase'])
+        codes, customers = pd.factorize(inputs['customer_unique_id'])
+        order = np.lexsort((month, codes))
+        codes = codes[order]
+        month = month[order]
+        value = inputs['value'].to_numpy(dtype=np.float64)[order]
+
+        starts = np.r_[True, codes[1:] != codes[:-1]]
+        batch_first = month[starts]
+        known = self.first_month.reindex(customers).to_numpy(dtype=np.float64)
+        first = np.where(np.isnan(known), batch_first, known).astype(np.int64)
+        cohort = first[codes]
+
+        if self.base_month is None:
+            self.base_month = int(month.min())
+        last_month = int(month.max())
+        self._grow(last_month)
+        n = last_month - self.base_month + 1
+
+        # Un cliente cuenta una vez por mes: primera fila de cada par (cliente, mes)
+        active = starts | np.r_[True, month[1:] != month[:-1]]
+        cells = self._cells(cohort, month - cohort, active, value, n)
+        for m in COHORT_MEASURES:
+            self.totals[m] += cells[m]
+
+        in_last = month == last_month
+        self._open = self._cells(cohort[in_last], (month - cohort)[in_last], active[in_last], value[in_last], n)
+        new = np.isnan(known)
+        self._open['new_customers'] = customers[new & (batch_first == last_month)]
+        self.first_month = pd.concat([
+            self.first_month,
+            pd.Series(batch_first[new], index=customers[new], dtype=np.int64)
+        ])
+        self.last_month = last_month
+        return self
+
+    def refresh(self, datasets):
+        """Incorpora el mes abierto y los posteriores; las cohortes previas no se recalculan"""
+        since = None
+        if self.last_month is not None:
+            since = pd.Timestamp(month_label(self.last_month))
+        return self.update(customer_inputs(datasets, since=since, exclude_statuses=self.exclude_statuses))
+
+    def matrix(self, measure='customers'):
+        """Matriz etiquetada cohorte × meses desde la primera compra (NaN fuera de rango)"""
+        values = self.totals[measure].copy()
+        n = values.shape[0]
+        cohorts = np.arange(n)
+        values[cohorts[:, None] + cohorts[None, :] >= n] = np.nan
+        labels = [month_label(self.base_month + c) for c in cohorts]
+        return pd.DataFrame(values, index=pd.Index(labels, name='cohort'),
+                            columns=pd.Index(cohorts, name='months_since_first'))
+
+    def cohort_sizes(self):
+        """Clientes nuevos por cohorte"""
+        return self.matrix('customers')[0].astype(np.int64)
+
+    def retention(self):
+        """Proporción de cada cohorte que vuelve a comprar en cada mes posterior"""
+        counts = self.matrix('customers')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return counts.div(counts[0], axis=0)
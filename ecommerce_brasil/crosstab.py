@@ -0,0 +1,81 @@
+"""Tablas cruzadas densas sobre dimensiones codificadas como enteros pequeños"""
+import numpy as np
+import pandas as pd
+
+
+def encode(values, categories=None, na_label=None):
+    """Codifica una columna como enteros densos 0..n-1 y devuelve (codes, labels)
+
+    Si se pasan `categories`, el orden de las etiquetas es el dado y los valores
+    fuera de ellas reciben código -1. Los nulos reciben -1, salvo que se indique
+    `na_label`, en cuyo caso se agregan como una categoría más al final.
+    """
+    values = pd.Series(values)
+    if categories is None:
+        cat = pd.Categorical(values)
+    else:
+        cat = pd.Categorical(values, categories=list(categories))
+    codes = np.asarray(cat.codes, dtype=np.int64)
+    labels = list(cat.categories)
+    if na_label is not None:
+        missing = codes < 0
+        if missing.any():
+            codes = codes.copy()
+            codes[missing] = len(labels)
+            labels.append(na_label)
+    return codes, labels
+
+
+def bincount_grid(row_codes, col_codes, n_rows, n_cols, weights=None):
+    """Conteo (o suma de `weights`) por celda con un único bincount
+
+    Las filas con código negativo en cualquiera de las dos dimensiones se
+    descartan. Devuelve un arreglo de forma (n_rows, n_cols).
+    """
+    row_codes = np.asarray(row_codes, dtype=np.int64)
+    col_codes = np.asarray(col_codes, dtype=np.int64)
+    valid = (row_codes >= 0) & (col_codes >= 0)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        valid &= ~np.isnan(weights)
+        weights = weights[valid]
+    combined = row_codes[valid] * n_cols + col_codes[valid]
+    grid = np.bincount(combined, weights=weights, minlength=n_rows * n_cols)
+    return grid.reshape(n_rows, n_cols)
+
+
+def crosstab(rows, cols, values=None, aggfunc='count',
+             row_labels=None, col_labels=None):
+    """Tabla cruzada etiquetada equivalente a pivot_table para dimensiones pequeñas
+
+    `rows` y `cols` son columnas categóricas o enteras; `row_labels` y
+    `col_labels` fijan el orden (y el universo) de las categorías. `aggfunc`
+    puede ser 'count', 'sum' o 'mean'; las celdas sin observaciones quedan en 0
+    para 'count' y 'sum' y en NaN para 'mean'.
+    """
+    if aggfunc not in ('count', 'sum', 'mean'):
+        raise ValueError(f"aggfunc no soportado: {aggfunc}")
+    if aggfunc != 'count' and values is None:
+        raise ValueError(f"aggfunc='{aggfunc}' requiere values")
+
+    row_codes, row_index = encode(rows, row_labels)
+    col_codes, col_index = encode(cols, col_labels)
+    shape = (len(row_index), len(col_index))
+
+    if aggfunc == 'count':
+        if values is not None:
+            # Igual que pivot_table: solo se cuentan valores no nulos
+            present = pd.Series(values).notna().to_numpy()
+            row_codes = np.where(present, row_codes, -1)
+        grid = bincount_grid(row_codes, col_codes, *shape)
+        grid = grid.astype(np.int64)
+    else:
+        grid = bincount_grid(row_codes, col_codes, *shape, weights=values)
+        if aggfunc == 'mean':
+            present = ~np.isnan(np.asarray(values, dtype=np.float64))
+            counts = bincount_grid(np.where(present, row_codes, -1), col_codes, *shape)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                grid = np.where(counts > 0, grid / counts, np.nan)
+
+    return pd.DataFrame(grid, index=pd.Index(row_index, name=getattr(rows, 'name', None)),
+                        columns=pd.Index(col_index, name=getattr(cols, 'name', None)))
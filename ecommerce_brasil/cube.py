@@ -0,0 +1,152 @@
+"""Cubo OLAP con roll-ups pre-agregados para el dashboard"""
+import numpy as np
+import pandas as pd
+
+from .crosstab import encode
+from .facts import build_item_facts
+
+CUBE_DIMENSIONS = [
+    'year_month',
+    'customer_state',
+    'seller_state',
+    'product_category_name',
+    'payment_type',
+    'order_status',
+    'review_score'
+]
+
+CUBE_MEASURES = [
+    'orders',
+    'items',
+    'revenue',
+    'freight',
+    'delivered',
+    'delivery_days',
+    'delay_days',
+    'late'
+]
+
+NA_LABEL = 'sin_dato'
+
+
+def _group(codes, cards, measures):
+    """Agrupa filas por su combinación de códigos y suma cada medida
+
+    `codes` es una matriz (filas, dimensiones). Devuelve los códigos únicos y
+    un diccionario con las medidas sumadas por grupo.
+    """
+    if codes.shape[1] == 0:
+        return codes[:1], {m: np.array([v.sum()]) for m, v in measures.items()}
+    if np.prod([float(c) for c in cards]) < 2 ** 62:
+        key = np.ravel_multi_index(codes.T, cards)
+        uniques, inverse = np.unique(key, return_inverse=True)
+        group_codes = np.column_stack(np.unravel_index(uniques, cards))
+    else:
+        group_codes, inverse = np.unique(codes, axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    sums = {m: np.bincount(inverse, weights=v, minlength=len(group_codes))
+            for m, v in measures.items()}
+    return group_codes.astype(np.int64), sums
+
+
+class OlapCube:
+    """Cubo sobre los hechos a nivel item con medidas aditivas
+
+    El cuboide base agrupa por todas las dimensiones; los roll-ups
+    materializados se derivan del cuboide más pequeño que los contiene y las
+    consultas se resuelven siempre desde el agregado más pequeño disponible.
+    """
+
+    def __init__(self, facts, dimensions=CUBE_DIMENSIONS, rollups=None):
+        self.dimensions = list(dimensions)
+        self.labels = {}
+        codes = []
+        for dim in self.dimensions:
+            dim_codes, dim_labels = encode(facts[dim], na_label=NA_LABEL)
+            codes.append(dim_codes)
+            self.labels[dim] = dim_labels
+        self.cards = [max(len(self.labels[d]), 1) for d in self.dimensions]
+
+        weight = facts['order_weight'].to_numpy(dtype=np.float64)
+        delivered = facts['delivery_days'].notna().to_numpy()
+        delay = facts['delay_days'].to_numpy(dtype=np.float64)
+        measures = {
+            'orders': weight,
+            'items': facts['item'].to_numpy(dtype=np.float64),
+            'revenue': facts['price'].fillna(0).to_numpy(dtype=np.float64),
+            'freight': facts['freight_value'].fillna(0).to_numpy(dtype=np.float64),
+            'delivered': np.where(delivered, weight, 0.0),
+            'delivery_days': np.where(delivered, weight * facts['delivery_days'].fillna(0).to_numpy(), 0.0),
+            'delay_days': np.where(np.isnan(delay), 0.0, weight * np.nan_to_num(delay)),
+            'late': np.where(delay > 0, weight, 0.0)
+        }
+        base = tuple(self.dimensions)
+        self.cuboids = {base: _group(np.column_stack(codes), self.cards, measures)}
+        for rollup in rollups or []:
+            self.materialize(rollup)
+
+    @classmethod
+    def from_datasets(cls, datasets, dimensions=CUBE_DIMENSIONS, rollups=None):
+        """Construye el cubo directamente desde el diccionario de tablas"""
+        return cls(build_item_facts(datasets), dimensions=dimensions, rollups=rollups)
+
+    def _source(self, dims):
+        """Cuboide materializado más pequeño que contiene todas las `dims`"""
+        candidates = [key for key in self.cuboids if set(dims) <= set(key)]
+        return min(candidates, key=lambda key: len(self.cuboids[key][0]))
+
+    def materialize(self, dims):
+        """Pre-agrega el roll-up sobre `dims` a partir del cuboide más pequeño"""
+        dims = tuple(d for d in self.dimensions if d in dims)
+        if dims in self.cuboids:
+            return self.cuboids[dims]
+        source = self._source(dims)
+        codes, sums = self.cuboids[source]
+        positions = [source.index(d) for d in dims]
+        cards = [self.cards[self.dimensions.index(d)] for d in dims]
+        self.cuboids[dims] = _group(codes[:, positions], cards, sums)
+        return self.cuboids[dims]
+
+    def _codes_for(self, dim, value):
+        """Traduce uno o varios valores de una dimensión a sus códigos"""
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        lookup = {label: code for code, label in enumerate(self.labels[dim])}
+        return [lookup[v] for v in values if v in lookup]
+
+    def query(self, by=(), where=None, measures=None, dropna=False):
+        """Slice-and-dice: agrupa por `by` filtrando con `where` {dim: valor(es)}
+
+        Con `dropna=True` se omiten los grupos sin dato en alguna dimensión.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        where = where or {}
+        measures = measures or CUBE_MEASURES
+        unknown = [d for d in list(by) + list(where) if d not in self.dimensions]
+        if unknown:
+            raise KeyError(f"Dimensiones desconocidas: {unknown}")
+
+        source = self._source(set(by) | set(where))
+        codes, sums = self.cuboids[source]
+        mask = np.ones(len(codes), dtype=bool)
+        for dim, value in where.items():
+            mask &= np.isin(codes[:, source.index(dim)], self._codes_for(dim, value))
+
+        positions = [source.index(d) for d in by]
+        if dropna:
+            for dim, pos in zip(by, positions):
+                if self.labels[dim] and self.labels[dim][-1] == NA_LABEL:
+                    mask &= codes[:, pos] != len(self.labels[dim]) - 1
+        cards = [self.cards[self.dimensions.index(d)] for d in by]
+        group_codes, group_sums = _group(codes[mask][:, positions], cards,
+                                         {m: sums[m][mask] for m in measures})
+        result = pd.DataFrame({
+            dim: np.asarray(self.labels[dim], dtype=object)[group_codes[:, i]]
+            for i, dim in enumerate(by)
+        })
+        for m in measures:
+            result[m] = group_sums[m]
+        return result.set_index(by) if by else result
+
+    def total(self, measure, where=None):
+        """Valor total de una medida (opcionalmente filtrado)"""
+        return float(self.query(where=where, measures=[measure])[measure].iloc[0])
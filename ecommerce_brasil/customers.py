@@ -0,0 +1,198 @@
+"""Recurrencia y segmentación RFM por cliente real (customer_unique_id)
+
+En Olist `customer_id` cambia en cada orden; el cliente real es
+`customer_unique_id`, que se obtiene de la tabla de clientes.
+"""
+import numpy as np
+import pandas as pd
+
+# Órdenes que no cuentan como compra
+EXCLUDED_STATUSES = ('canceled', 'unavailable')
+
+STATE_COLUMNS = ['first_day', 'last_day', 'frequency', 'monetary']
+
+SEGMENTS = [
+    'campeones',
+    'leales',
+    'nuevos_alto_valor',
+    'nuevos',
+    'en_riesgo_alto_valor',
+    'perdidos',
+    'ocasionales'
+]
+
+
+def to_days(timestamps):
+    """Fechas como días enteros desde 1970-01-01 (int64)"""
+    values = pd.to_datetime(timestamps, errors='coerce').to_numpy(dtype='datetime64[ns]')
+    return values.astype('datetime64[D]').astype(np.int64)
+
+
+def customer_inputs(datasets, since=None, exclude=(), exclude_statuses=EXCLUDED_STATUSES):
+    """Una fila por orden con customer_unique_id, día de compra y valor
+
+    Con `since` solo se incluyen las órdenes compradas en esa fecha o después,
+    salvo las de `exclude` (ya procesadas).
+    El valor es precio + flete de los items de la orden (0 si no tiene items).
+    """
+    orders = datasets['orders'][['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp']]
+    purchase = pd.to_datetime(orders['order_purchase_timestamp'], errors='coerce')
+    keep = purchase.notna() & ~orders['order_status'].isin(exclude_statuses)
+    if since is not None:
+        keep &= (purchase >= pd.Timestamp(since)) & ~orders['order_id'].isin(exclude)
+    orders = orders[keep]
+    purchase = purchase[keep]
+
+    unique_id = datasets['customers'].set_index('customer_id')['customer_unique_id']
+    inputs = pd.DataFrame({
+        'order_id': orders['order_id'].to_numpy(),
+        'customer_unique_id': orders['customer_id'].map(unique_id).to_numpy(),
+        'purchase': purchase.to_numpy(),
+        'day': to_days(purchase)
+    })
+
+    items = datasets.get('order_items')
+    if items is not None:
+        items = items[items['order_id'].isin(inputs['order_id'])]
+        value = (items['price'] + items['freight_value']).groupby(items['order_id']).sum()
+        inputs['value'] = inputs['order_id'].map(value).fillna(0.0).to_numpy()
+    else:
+        inputs['value'] = 0.0
+    return inputs[inputs['customer_unique_id'].notna()]
+
+
+class CustomerBase:
+    """Estado acumulado por cliente: primera y última compra, frecuencia y monto
+
+    Las fechas se guardan como días enteros, así recencia y antigüedad son
+    restas de int64. `update` solo toca los clientes presentes en el lote y
+    `refresh` procesa únicamente las órdenes nuevas desde la última carga.
+    """
+
+    def __init__(self, exclude_statuses=EXCLUDED_STATUSES):
+        self.exclude_statuses = tuple(exclude_statuses)
+        self.state = pd.DataFrame({
+            'first_day': pd.Series(dtype=np.int64),
+            'last_day': pd.Series(dtype=np.int64),
+            'frequency': pd.Series(dtype=np.int64),
+            'monetary': pd.Series(dtype=np.float64)
+        }, index=pd.Index([], name='customer_unique_id', dtype=object))
+        self.watermark = None
+        # Órdenes con la compra exactamente en `watermark`, ya procesadas
+        self.boundary = set()
+
+    @classmethod
+    def from_datasets(cls, datasets, **kwargs):
+        """Construye el estado con todas las órdenes disponibles"""
+        base = cls(**kwargs)
+        base.refresh(datasets)
+        return base
+
+    def update(self, inputs):
+        """Acumula un lote de órdenes (salida de `customer_inputs`)"""
+        if len(inputs) == 0:
+            return self
+        batch = inputs.groupby('customer_unique_id').agg(
+            first_day=('day', 'min'),
+            last_day=('day', 'max'),
+            frequency=('day', 'size'),
+            monetary=('value', 'sum')
+        )
+        known = batch.index.isin(self.state.index)
+        if known.any():
+            affected = batch.index[known]
+            old = self.state.loc[affected]
+            new = batch.loc[affected]
+            self.state.loc[affected, 'first_day'] = np.minimum(old['first_day'], new['first_day'])
+            self.state.loc[affected, 'last_day'] = np.maximum(old['last_day'], new['last_day'])
+            self.state.loc[affected, 'frequency'] = old['frequency'] + new['frequency']
+            self.state.loc[affected, 'monetary'] = old['monetary'] + new['monetary']
+        added = batch[~known][STATE_COLUMNS]
+        self.state = pd.concat([self.state, added]) if len(self.state) else added
+
+        latest = inputs['purchase'].max()
+        at_latest = set(inputs.loc[inputs['purchase'] == latest, 'order_id'])
+        if self.watermark is None or latest > self.watermark:
+            self.watermark, self.boundary = latest, at_latest
+        elif latest == self.watermark:
+            self.boundary |= at_latest
+        return self
+
+    def refresh(self, datasets):
+        """Incorpora solo las órdenes compradas desde la última actualización
+
+        Incluye las de la misma marca de tiempo que la última carga, sin repetir
+        las que ya se procesaron.
+        """
+        return self.update(customer_inputs(datasets, since=self.watermark, exclude=self.boundary,
+                                           exclude_statuses=self.exclude_statuses))
+
+    def frequency_distribution(self):
+        """Número de clientes por cantidad de órdenes"""
+        counts = np.bincount(self.state['frequency'].to_numpy(dtype=np.int64))
+        present = np.flatnonzero(counts)
+        return pd.Series(counts[present], index=pd.Index(present, name='frequency'), name='customers')
+
+    def repeat_rate(self):
+        """Proporción de clientes con dos o más órdenes"""
+        return float((self.state['frequency'] > 1).mean()) if len(self.state) else np.nan
+
+    def rfm(self, reference_date=None):
+        """Recencia, frecuencia, monto, puntajes 1-5 y segmento por cliente
+
+        La recencia se mide en días hasta `reference_date` (por defecto, el día
+        siguiente a la última compra cargada). Recencia y monto se puntúan por
+        quintiles; la frecuencia, muy concentrada en 1 en Olist, usa el número
+        de órdenes acotado a 5.
+        """
+        if reference_date is None:
+            reference_day = int(to_days(pd.Series([self.watermark]))[0]) + 1
+        else:
+            reference_day = int(to_days(pd.Series([reference_date]))[0])
+        rfm = pd.DataFrame(index=self.state.index)
+        rfm['recency'] = reference_day - self.state['last_day'].to_numpy(dtype=np.int64)
+        rfm['frequency'] = self.state['frequency'].to_numpy(dtype=np.int64)
+        rfm['monetary'] = self.state['monetary'].to_numpy(dtype=np.float64)
+        rfm['tenure'] = reference_day - self.state['first_day'].to_numpy(dtype=np.int64)
+
+        # Menor recencia = mejor puntaje
+        rfm['r_score'] = _quintile_score(-rfm['recency'])
+        rfm['f_score'] = np.clip(rfm['frequency'], 1, 5)
+        rfm['m_score'] = _quintile_score(rfm['monetary'])
+        rfm['segment'] = assign_segments(rfm['r_score'], rfm['f_score'], rfm['m_score'])
+        return rfm
+
+    def segment_summary(self, reference_date=None):
+        """Clientes, recencia y monto promedio, y participación en ingresos por segmento"""
+        rfm = self.rfm(reference_date)
+        summary = rfm.groupby('segment').agg(
+            customers=('recency', 'size'),
+            avg_recency=('recency', 'mean'),
+            avg_frequency=('frequency', 'mean'),
+            avg_monetary=('monetary', 'mean'),
+            revenue=('monetary', 'sum')
+        )
+        summary['revenue_share'] = summary['revenue'] / summary['revenue'].sum()
+        return summary.reindex([s for s in SEGMENTS if s in summary.index])
+
+
+def _quintile_score(values):
+    """Puntaje 1-5 según el percentil (empates con el rango promedio)"""
+    pct = pd.Series(values).rank(pct=True, method='average').to_numpy()
+    return np.clip(np.ceil(pct * 5), 1, 5).astype(np.int64)
+
+
+def assign_segments(r_score, f_score, m_score):
+    """Segmento RFM por reglas evaluadas en orden (la primera que se cumple)"""
+    r = np.asarray(r_score)
+    f = np.asarray(f_score)
+    m = np.asarray(m_score)
+    conditions = [
+        (r >= 4) & (f >= 2),
+        f >= 2,
+        (r >= 4) & (m >= 4),
+        r >= 4,
+        (r <= 2) & (m >= 4),
+        r <= 2
+    ]
+    return np.select(conditions, SEGMENTS[:-1], default=SEGMENTS[-1])
@@ -0,0 +1,150 @@
+"""Detección de reviews casi duplicadas con MinHash y LSH por bandas"""
+import numpy as np
+import pandas as pd
+
+from .text import fold_text
+
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT = np.uint64(32)
+
+
+def normalize_comments(texts):
+    """Texto plegado (sin acentos ni mayúsculas) con solo letras, dígitos y espacios simples"""
+    folded = fold_text(pd.Series(texts, dtype=object).fillna(''))
+    return folded.str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+
+
+def shingle_hashes(texts, k=5):
+    """Hashes de los k-shingles de caracteres de cada texto
+
+    Concatena el lote en un solo arreglo de bytes y calcula todas las ventanas
+    de k bytes a la vez; devuelve los hashes (uint64 < 2**32) y el inicio del
+    bloque de cada texto. Los textos más cortos que k se rellenan con espacios.
+    """
+    encoded = [t.ljust(k).encode('ascii') for t in texts]
+    lengths = np.fromiter((len(t) for t in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    starts = np.cumsum(lengths) - lengths
+
+    counts = lengths - k + 1
+    offsets = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+
+    windows = np.lib.stride_tricks.sliding_window_view(data, k)[positions].astype(np.uint64)
+    packed = np.zeros(len(positions), dtype=np.uint64)
+    for j in range(k):
+        packed |= windows[:, j] << np.uint64(8 * j)
+    return (packed * _MIX) >> _SHIFT, offsets
+
+
+def minhash_signatures(texts, num_perm=64, k=5, seed=42, batch_size=100_000):
+    """Firmas MinHash (n_textos × num_perm) calculadas por lotes
+
+    Cada permutación es un hash multiply-shift h(x) = ((a·x + b) mod 2**64) >> 32
+    con `a` impar, que evita las divisiones de (a·x + b) mod p; el mínimo por
+    texto se obtiene con `np.minimum.reduceat` sobre los shingles del lote.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint64)
+    for start in range(0, len(texts), batch_size):
+        hashes, offsets = shingle_hashes(texts[start:start + batch_size], k=k)
+        block = signatures[start:start + len(offsets)]
+        for j in range(num_perm):
+            values = (a[j] * hashes + b[j]) >> _SHIFT
+            block[:, j] = np.minimum.reduceat(values, offsets)
+    return signatures
+
+
+def lsh_candidate_pairs(signatures, bands=8):
+    """Pares candidatos (i, j) que coinciden en al menos una banda de la firma
+
+    Dentro de cada cubeta se une cada elemento con el primero, lo que basta
+    para formar los grupos por componentes conexas sin generar todos los pares.
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    pairs = []
+    for band in range(bands):
+        key = np.zeros(n, dtype=np.uint64)
+        for j in range(band * rows, (band + 1) * rows):
+            key = key * _MIX + signatures[:, j]
+        order = np.argsort(key, kind='stable')
+        sorted_key = key[order]
+        new_bucket = np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+        leader = order[np.maximum.accumulate(np.where(new_bucket, np.arange(n), 0))]
+        same = ~new_bucket
+        pairs.append(np.column_stack([leader[same], order[same]]))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def connected_components(n, pairs):
+    """Etiqueta de componente (el menor índice) de cada nodo, por propagación de mínimos"""
+    labels = np.arange(n)
+    if len(pairs) == 0:
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        previous = labels.copy()
+        low = np.minimum(labels[left], labels[right])
+        np.minimum.at(labels, left, low)
+        np.minimum.at(labels, right, low)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def near_duplicates(reviews, column='review_comment_message', threshold=0.8, num_perm=64,
+                    bands=8, k=5, min_length=30, batch_size=100_000):
+    """Grupos de reviews con comentarios casi idénticos
+
+    Solo se consideran comentarios de al menos `min_length` caracteres (los
+    comentarios cortos como "otimo" se repiten de forma legítima). Los pares
+    candidatos de LSH se confirman si la similitud de Jaccard estimada por las
+    firmas alcanza `threshold`. Devuelve una fila por review duplicada con
+    `cluster` (id del grupo), `cluster_size` y el texto normalizado.
+    """
+    texts = normalize_comments(reviews[column])
+    keep = (texts.str.len() >= min_length).to_numpy()
+    texts = texts[keep].to_numpy(dtype=object)
+    review_ids = reviews['review_id'].to_numpy()[keep]
+    order_ids = reviews['order_id'].to_numpy()[keep]
+
+    signatures = minhash_signatures(texts, num_perm=num_perm, k=k, batch_size=batch_size)
+    pairs = lsh_candidate_pairs(signatures, bands=bands)
+    if len(pairs):
+        similarity = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+        pairs = pairs[similarity >= threshold]
+
+    labels = connected_components(len(texts), pairs)
+    sizes = np.bincount(labels, minlength=len(texts))[labels]
+    duplicated = sizes > 1
+    clusters = pd.DataFrame({
+        'review_id': review_ids[duplicated],
+        'order_id': order_ids[duplicated],
+        'cluster': pd.factorize(labels[duplicated])[0],
+        'cluster_size': sizes[duplicated],
+        'text': texts[duplicated]
+    })
+    return clusters.sort_values(['cluster_size', 'cluster'], ascending=[False, True], ignore_index=True)
+
+
+def seller_duplicate_ratio(datasets, duplicates, column='review_comment_message', min_length=30):
+    """Por vendedor: reviews con comentario, reviews en grupos duplicados y proporción
+
+    Una review se atribuye a cada vendedor con items en su orden.
+    """
+    reviews = datasets['order_reviews']
+    commented = reviews[normalize_comments(reviews[column]).str.len().to_numpy() >= min_length]
+    pairs = datasets['order_items'][['order_id', 'seller_id']].drop_duplicates()
+    seller_reviews = commented[['review_id', 'order_id']].merge(pairs, on='order_id')
+    seller_reviews['duplicated'] = seller_reviews['review_id'].isin(duplicates['review_id'])
+    ratio = seller_reviews.groupby('seller_id').agg(
+        commented_reviews=('review_id', 'size'),
+        duplicated_reviews=('duplicated', 'sum')
+    )
+    ratio['duplicate_ratio'] = ratio['duplicated_reviews'] / ratio['commented_reviews']
+    return ratio
@@ -0,0 +1,162 @@
+"""Tiempos de entrega por etapa y percentiles agrupados"""
+import numpy as np
+import pandas as pd
+
+from .facts import parse_order_dates
+
+# Etapa -> (fecha de inicio, fecha de fin)
+STAGES = {
+    'approval': ('order_purchase_timestamp', 'order_approved_at'),
+    'handling': ('order_approved_at', 'order_delivered_carrier_date'),
+    'transit': ('order_delivered_carrier_date', 'order_delivered_customer_date'),
+    'total': ('order_purchase_timestamp', 'order_delivered_customer_date'),
+    # Positivo = entregado antes de la fecha estimada
+    'slack': ('order_delivered_customer_date', 'order_estimated_delivery_date')
+}
+
+STAGE_LABELS = {
+    'approval': 'Compra → Aprobación',
+    'handling': 'Aprobación → Transportista',
+    'transit': 'Transportista → Cliente',
+    'total': 'Compra → Cliente',
+    'slack': 'Holgura vs Estimado'
+}
+
+MISSING = np.iinfo(np.int64).min
+
+_NS_PER_HOUR = 3_600_000_000_000
+
+
+def duration_hours(start, end):
+    """Duración en horas enteras (int64) entre dos columnas datetime; MISSING si falta alguna"""
+    start = start.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    end = end.to_numpy(dtype='datetime64[ns]').view(np.int64)
+    missing = (start == MISSING) | (end == MISSING)
+    hours = (end - np.where(missing, 0, start)) // _NS_PER_HOUR
+    hours[missing] = MISSING
+    return hours
+
+
+def group_percentiles(codes, values, n_groups, quantiles):
+    """Conteo y percentiles exactos por grupo con un solo ordenamiento
+
+    Ordena por (grupo, valor) y toma en cada bloque la posición
+    ceil(n·q/100) (mismo criterio que `np.percentile(method='inverted_cdf')`).
+    Los códigos negativos y los valores MISSING se ignoran.
+    """
+    valid = (codes >= 0) & (values != MISSING)
+    codes = codes[valid]
+    values = values[valid]
+    values = values[np.lexsort((values, codes))]
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    result = np.full((n_groups, len(quantiles)), np.nan)
+    present = counts > 0
+    for j, q in enumerate(quantiles):
+        rank = np.maximum(np.ceil(counts * q / 100.0).astype(np.int64), 1)
+        result[present, j] = values[(starts + rank - 1)[present]]
+    return counts, result
+
+
+def stage_table(codes, labels, hours, quantiles, name=None):
+    """Tabla por grupo con `<etapa>_n`, `<etapa>_mean` y `<etapa>_p<q>` en días
+
+    `hours` mapea cada etapa a su arreglo int64 de horas alineado con `codes`.
+    """
+    n_groups = len(labels)
+    table = pd.DataFrame(index=pd.Index(labels, name=name))
+    for stage, values in hours.items():
+        counts, result = group_percentiles(codes, values, n_groups, quantiles)
+        valid = (codes >= 0) & (values != MISSING)
+        sums = np.bincount(codes[valid], weights=values[valid].astype(np.float64), minlength=n_groups)
+        table[f'{stage}_n'] = counts
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table[f'{stage}_mean'] = sums / counts / 24.0
+        for j, q in enumerate(quantiles):
+            table[f'{stage}_p{q}'] = result[:, j] / 24.0
+    return table
+
+
+class DeliveryTimes:
+    """Duraciones de cada etapa de entrega por orden, calculadas una sola vez
+
+    Las duraciones se guardan como arreglos int64 en horas (`hours[etapa]`) y
+    se reportan en días. `percentiles` agrupa por cualquier columna a nivel
+    orden (estado, mes) o a nivel item (vendedor, categoría); en este último
+    caso cada orden cuenta una vez por grupo.
+    """
+
+    def __init__(self, orders, items=None):
+        orders = parse_order_dates(orders)
+        self.orders = orders.reset_index(drop=True)
+        self.hours = {stage: duration_hours(orders[start], orders[end]) for stage, (start, end) in STAGES.items()}
+        self.items = items
+
+    @classmethod
+    def from_datasets(cls, datasets):
+        """Órdenes con estado del cliente y mes de compra; items con vendedor y categoría"""
+        orders = parse_order_dates(datasets['orders'])
+        orders['year_month'] = orders['order_purchase_timestamp'].dt.to_period('M').astype(str)
+        orders.loc[orders['order_purchase_timestamp'].isna(), 'year_month'] = np.nan
+        customers = datasets.get('customers')
+        if customers is not None:
+            orders['customer_state'] = orders['customer_id'].map(
+                customers.set_index('customer_id')['customer_state'])
+
+        items = datasets.get('order_items')
+        if items is not None:
+            items = items[['order_id', 'seller_id', 'product_id']]
+            products = datasets.get('products')
+            if products is not None:
+                items = items.assign(product_category_name=items['product_id'].map(
+                    products.set_index('product_id')['product_category_name']))
+        return cls(orders, items)
+
+    def stage_days(self, stage):
+        """Duración de una etapa en días (float, NaN si falta alguna fecha)"""
+        hours = self.hours[stage]
+        days = np.where(hours == MISSING, np.nan, hours / 24.0)
+        return pd.Series(days, index=self.orders['order_id'], name=stage)
+
+    def _group_rows(self, by):
+        """Códigos de grupo y posición de la orden correspondiente a cada fila"""
+        if by in self.orders.columns:
+            codes, labels = pd.factorize(self.orders[by], sort=True)
+            return codes, np.arange(len(self.orders)), labels
+        if self.items is None or by not in self.items.columns:
+            raise KeyError(f"Columna de agrupación no disponible: {by}")
+        pairs = self.items[['order_id', by]].drop_duplicates()
+        position = pd.Series(np.arange(len(self.orders)), index=self.orders['order_id'])
+        rows = pairs['order_id'].map(position).to_numpy(dtype=np.float64)
+        pairs = pairs[~np.isnan(rows)]
+        codes, labels = pd.factorize(pairs[by], sort=True)
+        return codes, rows[~np.isnan(rows)].astype(np.int64), labels
+
+    def percentiles(self, by=None, stages=('approval', 'handling', 'transit', 'total'),
+                    quantiles=(50, 90, 99), min_count=1):
+        """Conteo, media y percentiles (en días) de cada etapa por grupo
+
+        Devuelve una fila por grupo y columnas `<etapa>_n`, `<etapa>_mean` y
+        `<etapa>_p<q>`. Con `by=None` se resume el total de órdenes.
+        """
+        if by is None:
+            codes = np.zeros(len(self.orders), dtype=np.int64)
+            rows = np.arange(len(self.orders))
+            labels = pd.Index(['total'])
+        else:
+            codes, rows, labels = self._group_rows(by)
+        table = stage_table(codes, labels, {stage: self.hours[stage][rows] for stage in stages}, quantiles, by)
+        if min_count > 1:
+            table = table[table[f'{stages[-1]}_n'] >= min_count]
+        return table
+
+    def stage_summary(self, quantiles=(50, 90, 99)):
+        """Una fila por etapa con órdenes, media y percentiles en días"""
+        overall = self.percentiles(stages=tuple(STAGES), quantiles=quantiles).iloc[0]
+        rows = []
+        for stage in STAGES:
+            row = {'stage': STAGE_LABELS[stage], 'orders': int(overall[f'{stage}_n']),
+                   'mean': overall[f'{stage}_mean']}
+            row.update({f'p{q}': overall[f'{stage}_p{q}'] for q in quantiles})
+            rows.append(row)
+        return pd.DataFrame(rows).set_index('stage')
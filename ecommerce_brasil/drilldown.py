@@ -0,0 +1,98 @@
+"""Panel interactivo de filtros (ipywidgets) sobre el índice de bitmaps"""
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+
+PANEL_DIMENSIONS = ['customer_state', 'product_category_name', 'order_status', 'year_month', 'review_score']
+
+
+def filtered_kpis(facts):
+    """KPIs principales de un subconjunto de la tabla a nivel orden"""
+    delivered = facts['delay_days'].notna()
+    return {
+        'Órdenes': len(facts),
+        'Ingresos (R$)': float(facts['order_value'].sum()),
+        'Review Score Promedio': float(facts['review_score'].mean()) if facts['review_score'].notna().any() else np.nan,
+        'Tiempo de Entrega Promedio (días)': float(facts['delivery_days'].mean()) if delivered.any() else np.nan,
+        'Entregas con Retraso (%)': float((facts.loc[delivered, 'delay_days'] > 0).mean() * 100) if delivered.any() else np.nan
+    }
+
+
+def plot_filtered(facts):
+    """Gráficas de la sección sobre el subconjunto filtrado"""
+    fig, axes = plt.subplots(1, 2, figsize=(16, 5))
+
+    monthly_orders = facts.groupby('year_month').size()
+    axes[0].plot(monthly_orders.index, monthly_orders.values, marker='o', linewidth=2)
+    axes[0].set_title('Órdenes por Mes (filtrado)', fontsize=12, fontweight='bold')
+    axes[0].set_xlabel('Mes')
+    axes[0].set_ylabel('Número de Órdenes')
+    axes[0].tick_params(axis='x', rotation=45)
+    axes[0].grid(True, alpha=0.3)
+
+    score_dist = facts['review_score'].value_counts().sort_index()
+    axes[1].bar(score_dist.index.astype(int), score_dist.values, color='gold', alpha=0.7, edgecolor='black')
+    axes[1].set_title('Distribución de Review Scores (filtrado)', fontsize=12, fontweight='bold')
+    axes[1].set_xlabel('Review Score')
+    axes[1].set_ylabel('Frecuencia')
+    axes[1].grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    plt.show()
+
+
+def filter_panel(facts, index, dimensions=PANEL_DIMENSIONS, render=None):
+    """Construye el panel de filtros; cada cambio recalcula KPIs y gráficas
+
+    `render(subset)` dibuja la sección sobre las filas filtradas; por defecto
+    muestra los KPIs de `filtered_kpis` y las gráficas de `plot_filtered`.
+    """
+    try:
+        import ipywidgets as widgets
+        from IPython.display import display
+    except ImportError as e:
+        raise ImportError("El panel interactivo requiere ipywidgets (pip install ipywidgets)") from e
+
+    def default_render(subset):
+        for name, value in filtered_kpis(subset).items():
+            print(f"📊 {name}: {value:,.2f}" if isinstance(value, float) else f"📊 {name}: {value:,}")
+        if len(subset) > 0:
+            plot_filtered(subset)
+
+    render = render or default_render
+    selectors = {
+        dim: widgets.SelectMultiple(
+            options=sorted(index.values(dim), key=str),
+            description=dim.replace('_', ' ').title()[:20],
+            rows=6
+        )
+        for dim in dimensions if dim in index.bitmaps
+    }
+    late_only = widgets.Checkbox(value=False, description='Solo entregas con retraso')
+    output = widgets.Output()
+
+    def update(_=None):
+        start = time.perf_counter()
+        filters = {dim: list(selector.value) for dim, selector in selectors.items()}
+        if late_only.value:
+            filters['late'] = [True]
+        bitmap = index.select(filters)
+        subset = facts.iloc[index.rows(bitmap)]
+        elapsed = time.perf_counter() - start
+        output.clear_output(wait=True)
+        with output:
+            print(f"🔎 {len(subset):,} órdenes seleccionadas ({elapsed * 1000:.1f} ms)")
+            render(subset)
+
+    for widget in list(selectors.values()) + [late_only]:
+        widget.observe(update, names='value')
+
+    panel = widgets.VBox([
+        widgets.HBox(list(selectors.values())),
+        late_only,
+        output
+    ])
+    update()
+    display(panel)
+    return panel
@@ -0,0 +1,122 @@
+"""Construcción de tablas de hechos a partir de las tablas crudas de Olist"""
+import numpy as np
+import pandas as pd
+
+from .profiling import section
+
+ORDER_DATE_COLUMNS = [
+    'order_purchase_timestamp',
+    'order_approved_at',
+    'order_delivered_carrier_date',
+    'order_delivered_customer_date',
+    'order_estimated_delivery_date'
+]
+
+
+def parse_order_dates(orders):
+    """Devuelve una copia de orders con las columnas de fecha como datetime"""
+    orders = orders.copy()
+    with section('parse_order_dates', 'dates'):
+        for col in ORDER_DATE_COLUMNS:
+            if col in orders.columns and not pd.api.types.is_datetime64_any_dtype(orders[col]):
+                orders[col] = pd.to_datetime(orders[col], errors='coerce')
+    return orders
+
+
+def primary_payment_type(order_payments):
+    """Método de pago principal (el de mayor valor) por orden"""
+    payments = order_payments[['order_id', 'payment_type', 'payment_value']]
+    payments = payments.sort_values(['order_id', 'payment_value'], kind='stable')
+    primary = payments.drop_duplicates('order_id', keep='last')
+    return primary.set_index('order_id')['payment_type']
+
+
+def latest_review(order_reviews):
+    """Una review por orden: la más reciente según review_creation_date"""
+    reviews = order_reviews
+    if 'review_creation_date' in reviews.columns:
+        created = pd.to_datetime(reviews['review_creation_date'], errors='coerce')
+        reviews = reviews.assign(_created=created).sort_values(['order_id', '_created'], kind='stable')
+    reviews = reviews.drop_duplicates('order_id', keep='last')
+    return reviews.set_index('order_id')['review_score'].astype('Int64')
+
+
+def build_order_facts(datasets):
+    """Tabla de hechos a nivel orden con cliente, montos, pago, review y entrega
+
+    Requiere `orders`; el resto de tablas es opcional y, si falta, sus columnas
+    quedan como nulas.
+    """
+    orders = parse_order_dates(datasets['orders'])
+    facts = orders[['order_id', 'customer_id', 'order_status'] + ORDER_DATE_COLUMNS].copy()
+    facts['year_month'] = facts['order_purchase_timestamp'].dt.to_period('M').astype(str)
+    facts.loc[facts['order_purchase_timestamp'].isna(), 'year_month'] = np.nan
+
+    customers = datasets.get('customers')
+    if customers is not None:
+        lookup = customers.set_index('customer_id')
+        facts['customer_unique_id'] = facts['customer_id'].map(lookup['customer_unique_id'])
+        facts['customer_state'] = facts['customer_id'].map(lookup['customer_state'])
+    else:
+        facts['customer_unique_id'] = np.nan
+        facts['customer_state'] = np.nan
+
+    items = datasets.get('order_items')
+    if items is not None:
+        totals = items.groupby('order_id').agg(
+            num_items=('order_item_id', 'count'),
+            order_value=('price', 'sum'),
+            freight_value=('freight_value', 'sum')
+        )
+        facts = facts.join(totals, on='order_id')
+        facts['num_items'] = facts['num_items'].fillna(0).astype(np.int64)
+    else:
+        facts['num_items'] = 0
+        facts['order_value'] = np.nan
+        facts['freight_value'] = np.nan
+
+    payments = datasets.get('order_payments')
+    facts['payment_type'] = (facts['order_id'].map(primary_payment_type(payments))
+                             if payments is not None else np.nan)
+    reviews = datasets.get('order_reviews')
+    facts['review_score'] = (facts['order_id'].map(latest_review(reviews)).astype('Int64')
+                             if reviews is not None else pd.array([pd.NA] * len(facts), dtype='Int64'))
+
+    facts['delivery_days'] = (facts['order_delivered_customer_date']
+                              - facts['order_purchase_timestamp']).dt.days
+    facts['delay_days'] = (facts['order_delivered_customer_date']
+                           - facts['order_estimated_delivery_date']).dt.days
+    return facts.reset_index(drop=True)
+
+
+def build_item_facts(datasets, order_facts=None):
+    """Tabla de hechos a nivel item (orders LEFT JOIN order_items)
+
+    Las órdenes sin items aparecen una vez con `item=0`. La columna
+    `order_weight` reparte cada orden entre sus filas (suma 1 por orden) para
+    que los conteos de órdenes sean aditivos en cualquier roll-up.
+    """
+    if order_facts is None:
+        order_facts = build_order_facts(datasets)
+    items = datasets.get('order_items')
+    if items is None:
+        items = pd.DataFrame(columns=['order_id', 'seller_id', 'product_id', 'price', 'freight_value'])
+    item_cols = ['order_id', 'seller_id', 'product_id', 'price', 'freight_value']
+    facts = order_facts.drop(columns=['order_value', 'freight_value']).merge(
+        items[item_cols], on='order_id', how='left'
+    )
+    facts['item'] = facts['product_id'].notna().astype(np.int64)
+    rows_per_order = facts.groupby('order_id')['order_id'].transform('size')
+    facts['order_weight'] = 1.0 / rows_per_order.to_numpy()
+
+    products = datasets.get('products')
+    facts['product_category_name'] = (
+        facts['product_id'].map(products.set_index('product_id')['product_category_name'])
+        if products is not None else np.nan
+    )
+    sellers = datasets.get('sellers')
+    facts['seller_state'] = (
+        facts['seller_id'].map(sellers.set_index('seller_id')['seller_state'])
+        if sellers is not None else np.nan
+    )
+    return facts
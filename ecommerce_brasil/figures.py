@@ -0,0 +1,699 @@
+"""Registro de figuras del reporte y renderizado por lotes a archivos (sin pantalla)
+
+Cada figura se registra con dos funciones: `prepare`, que reduce los datos a
+agregados pequeños (conteos, histogramas, estadísticas de boxplot), y `draw`,
+que dibuja la figura solo a partir de esos agregados. Así los agregados se
+calculan una vez en el proceso principal y el dibujo se reparte entre varios
+procesos con el backend Agg.
+"""
+import hashlib
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import matplotlib
+from matplotlib import cm
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+from .boxstats import grouped_box_stats
+from .crosstab import crosstab
+from .customers import CustomerBase
+from .delivery import DeliveryTimes
+from .density import density_grid, draw_density, integer_edges
+from .facts import build_order_facts
+from .kpis import KPIStore
+from .pipeline import code_fingerprint
+from .profiling import record, section
+from .ranking import top_counts, top_k
+
+FIGURES = {}
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def register_figure(name, prepare):
+    """Registra `draw` como la figura `name`, con `prepare(context)` para sus agregados"""
+    def decorator(draw):
+        FIGURES[name] = (prepare, draw)
+        return draw
+    return decorator
+
+
+class FigureContext:
+    """Datos de entrada y tablas derivadas compartidas entre los `prepare`
+
+    Las tablas derivadas (hechos por orden, clientes, tiempos de entrega) se
+    construyen la primera vez que se piden y se reutilizan.
+    """
+
+    def __init__(self, datasets):
+        self.datasets = datasets
+        self._cache = {}
+
+    def has(self, *tables):
+        return all(t in self.datasets for t in tables)
+
+    def shared(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def order_facts(self):
+        return self.shared('order_facts', lambda: build_order_facts(self.datasets))
+
+    @property
+    def customer_base(self):
+        return self.shared('customer_base', lambda: CustomerBase.from_datasets(self.datasets))
+
+    @property
+    def kpis(self):
+        return self.shared('kpis', lambda: KPIStore(self.datasets))
+
+    @property
+    def delivery_times(self):
+        return self.shared('delivery_times', lambda: DeliveryTimes.from_datasets(self.datasets))
+
+
+def build_figure_inputs(datasets, names=None, order_facts=None):
+    """Agregados de entrada de cada figura registrada (None si faltan tablas)
+
+    `order_facts` evita reconstruir la tabla de hechos si ya está calculada.
+    """
+    context = FigureContext(datasets)
+    if order_facts is not None:
+        context.shared('order_facts', lambda: order_facts)
+    inputs = {}
+    for name in names or FIGURES:
+        with section(f'prepare:{name}', 'aggregation'):
+            inputs[name] = FIGURES[name][0](context)
+    return inputs
+
+
+def _histogram(values, bins=30, upper_quantile=0.95):
+    """Conteos y bordes de un histograma recortado al percentil indicado"""
+    values = pd.Series(values).dropna()
+    upper = values.quantile(upper_quantile) if len(values) else 1.0
+    lower = min(values.min(), 0) if len(values) else 0.0
+    return np.histogram(values, bins=bins, range=(lower, upper if upper > lower else lower + 1))
+
+
+def _stairs(ax, counts, edges, **kwargs):
+    """Histograma precalculado como barras"""
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', **kwargs)
+
+
+# Temporal
+
+def _prepare_temporal(context):
+    if not context.has('orders'):
+        return None
+    purchase = pd.to_datetime(context.datasets['orders']['order_purchase_timestamp'], errors='coerce').dropna()
+    weekday = pd.Categorical(purchase.dt.day_name(), categories=WEEKDAYS)
+    return {
+        'monthly': purchase.dt.to_period('M').astype(str).value_counts(sort=False).sort_index(),
+        'yearly': purchase.dt.year.value_counts().sort_index(),
+        'weekday_month': crosstab(weekday, purchase.dt.month, row_labels=WEEKDAYS),
+        'weekday': pd.Series(weekday).value_counts().reindex(WEEKDAYS)
+    }
+
+
+@register_figure('temporal', _prepare_temporal)
+def draw_temporal(data):
+    fig = Figure(figsize=(16, 12))
+    axes = fig.subplots(2, 2)
+    axes[0, 0].plot(data['monthly'].index, data['monthly'].values, marker='o', linewidth=2, color='steelblue')
+    axes[0, 0].set_title('Evolución de Órdenes por Mes', fontsize=14, fontweight='bold')
+    axes[0, 0].set_ylabel('Número de Órdenes')
+    axes[0, 0].tick_params(axis='x', rotation=90)
+    axes[0, 0].grid(True, alpha=0.3)
+    axes[0, 1].bar(data['yearly'].index.astype(str), data['yearly'].values, color='coral', alpha=0.7)
+    axes[0, 1].set_title('Distribución de Órdenes por Año', fontsize=14, fontweight='bold')
+    axes[0, 1].grid(axis='y', alpha=0.3)
+    heatmap = data['weekday_month']
+    image = axes[1, 0].imshow(heatmap.values, aspect='auto', cmap='YlOrRd')
+    axes[1, 0].set_xticks(range(heatmap.shape[1]), heatmap.columns)
+    axes[1, 0].set_yticks(range(heatmap.shape[0]), heatmap.index)
+    axes[1, 0].set_xlabel('Mes')
+    axes[1, 0].set_title('Heatmap: Órdenes por Día de Semana y Mes', fontsize=14, fontweight='bold')
+    fig.colorbar(image, ax=axes[1, 0], label='Órdenes')
+    axes[1, 1].bar(range(7), data['weekday'].values, color='mediumseagreen', alpha=0.7)
+    axes[1, 1].set_xticks(range(7), [d[:3] for d in WEEKDAYS])
+    axes[1, 1].set_title('Distribución de Órdenes por Día de la Semana', fontsize=14, fontweight='bold')
+    axes[1, 1].grid(axis='y', alpha=0.3)
+    fig.tight_layout()
+    return fig
+
+
+# Geográfico
+
+def _prepare_geographic(context):
+    if not context.has('orders', 'customers', 'sellers'):
+        return None
+    facts = context.order_facts
+    return {
+        'customers': top_counts(context.datasets['customers']['customer_state'], 10),
+        'sellers': top_counts(context.datasets['sellers']['seller_state'], 10),
+        'revenue': top_k(facts.groupby('customer_state')['order_value'].sum(), 10)
+    }
+
+
+@register_figure('geographic', _prepare_geographic)
+def draw_geographic(data):
+    fig = Figure(figsize=(18, 6))
+    axes = fig.subplots(1, 3)
+    panels = [
+        ('customers', 'Top 10 Estados por Clientes', 'Clientes', 'steelblue'),
+        ('sellers', 'Top 10 Estados por Vendedores', 'Vendedores', 'coral'),
+        ('revenue', 'Top 10 Estados por Ingresos (R$)', 'Ingresos (R$)', 'mediumseagreen')
+    ]
+    for ax, (key, title, label, color) in zip(axes, panels):
+        series = data[key]
+        ax.bar(series.index, series.values, color=color, alpha=0.7)
+        ax.set_title(title, fontsize=12, fontweight='bold')
+        ax.set_ylabel(label)
+        ax.grid(axis='y', alpha=0.3)
+    fig.suptitle('Análisis Geográfico', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Productos
+
+def _prepare_products(context):
+    if not context.has('order_items', 'products'):
+        return None
+    items = context.datasets['order_items']
+    category = items['product_id'].map(
+        context.datasets['products'].set_index('product_id')['product_category_name'])
+    top_categories = top_counts(category, 15)
+    mean_price = items['price'].groupby(category).mean()
+    return {
+        'categories': top_categories,
+        'price_histogram': _histogram(items['price'], bins=50),
+        'category_price': mean_price.reindex(top_categories.index)
+    }
+
+
+@register_figure('products', _prepare_products)
+def draw_products(data):
+    fig = Figure(figsize=(18, 7))
+    axes = fig.subplots(1, 3)
+    categories = data['categories']
+    short = [c[:25] for c in categories.index]
+    axes[0].barh(range(len(categories)), categories.values, color='teal', alpha=0.7)
+    axes[0].set_yticks(range(len(categories)), short)
+    axes[0].invert_yaxis()
+    axes[0].set_title('Top 15 Categorías por Items Vendidos', fontsize=12, fontweight='bold')
+    counts, edges = data['price_histogram']
+    _stairs(axes[1], counts, edges, color='skyblue', edgecolor='black', alpha=0.7)
+    axes[1].set_xlabel('Precio (R$)')
+    axes[1].set_title('Distribución de Precios (hasta p95)', fontsize=12, fontweight='bold')
+    axes[2].barh(range(len(categories)), data['category_price'].values, color='orange', alpha=0.7)
+    axes[2].set_yticks(range(len(categories)), short)
+    axes[2].invert_yaxis()
+    axes[2].set_xlabel('Precio Promedio (R$)')
+    axes[2].set_title('Precio Promedio de las Top 15 Categorías', fontsize=12, fontweight='bold')
+    fig.suptitle('Análisis de Productos', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Clientes
+
+def _prepare_customers(context):
+    if not context.has('orders', 'customers'):
+        return None
+    base = context.customer_base
+    customers = context.datasets['customers'].drop_duplicates('customer_unique_id')
+    return {
+        'states': top_counts(customers['customer_state'], 10),
+        'frequency': base.frequency_distribution().head(10),
+        'repeat': [(base.state['frequency'] == 1).sum(), (base.state['frequency'] > 1).sum()],
+        'segments': base.segment_summary()['customers']
+    }
+
+
+@register_figure('customers', _prepare_customers)
+def draw_customers(data):
+    fig = Figure(figsize=(16, 12))
+    axes = fig.subplots(2, 2)
+    axes[0, 0].bar(data['states'].index, data['states'].values, color='mediumseagreen', alpha=0.7)
+    axes[0, 0].set_title('Top 10 Estados por Número de Clientes', fontsize=12, fontweight='bold')
+    axes[0, 0].grid(axis='y', alpha=0.3)
+    axes[0, 1].bar(data['frequency'].index, data['frequency'].values, color='orange', alpha=0.7, edgecolor='black')
+    axes[0, 1].set_xlabel('Número de Órdenes por Cliente')
+    axes[0, 1].set_yscale('log')
+    axes[0, 1].set_title('Distribución de Frecuencia de Compras', fontsize=12, fontweight='bold')
+    axes[1, 0].pie(data['repeat'], labels=['Clientes Únicos\n(1 orden)', 'Clientes Recurrentes\n(2+ órdenes)'],
+                   colors=['lightblue', 'lightcoral'], autopct='%1.1f%%', startangle=90)
+    axes[1, 0].set_title('Clientes Únicos vs Recurrentes', fontsize=12, fontweight='bold')
+    segments = data['segments']
+    axes[1, 1].barh(segments.index, segments.values, color='slateblue', alpha=0.7)
+    axes[1, 1].invert_yaxis()
+    axes[1, 1].set_title('Clientes por Segmento RFM', fontsize=12, fontweight='bold')
+    fig.suptitle('Análisis de Clientes', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Vendedores
+
+def _prepare_sellers(context):
+    if not context.has('order_items', 'sellers'):
+        return None
+    items = context.datasets['order_items']
+    revenue = items.groupby('seller_id')['price'].sum()
+    return {
+        'top_items': top_counts(items['seller_id'], 20).to_numpy(),
+        'states': top_counts(context.datasets['sellers']['seller_state'], 10),
+        'revenue_histogram': np.histogram(np.log10(revenue[revenue > 0]), bins=40)
+    }
+
+
+@register_figure('sellers', _prepare_sellers)
+def draw_sellers(data):
+    fig = Figure(figsize=(18, 6))
+    axes = fig.subplots(1, 3)
+    top_items = data['top_items']
+    axes[0].barh(range(len(top_items)), top_items, color='gold', alpha=0.7)
+    axes[0].set_yticks(range(len(top_items)), [f'Seller {i + 1}' for i in range(len(top_items))])
+    axes[0].invert_yaxis()
+    axes[0].set_title('Top 20 Vendedores por Volumen', fontsize=12, fontweight='bold')
+    axes[1].bar(data['states'].index, data['states'].values, color='coral', alpha=0.7)
+    axes[1].set_title('Top 10 Estados por Número de Vendedores', fontsize=12, fontweight='bold')
+    counts, edges = data['revenue_histogram']
+    _stairs(axes[2], counts, edges, color='mediumpurple', edgecolor='black', alpha=0.7)
+    axes[2].set_xlabel('log10(Ingresos por Vendedor, R$)')
+    axes[2].set_title('Distribución de Ingresos por Vendedor', fontsize=12, fontweight='bold')
+    fig.suptitle('Análisis de Vendedores', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Pagos
+
+def _prepare_payments(context):
+    if not context.has('order_payments'):
+        return None
+    payments = context.datasets['order_payments']
+    value_limit = payments['payment_value'].quantile(0.95)
+    installment_edges = integer_edges(payments['payment_installments'])
+    return {
+        'types': payments['payment_type'].value_counts(),
+        'box_stats': grouped_box_stats(payments['payment_value'], payments['payment_type']),
+        'value_limit': value_limit,
+        'installments': payments['payment_installments'].value_counts().sort_index().head(15),
+        'density': density_grid(payments['payment_installments'], payments['payment_value'],
+                                bins=[installment_edges, 50],
+                                range=[[installment_edges[0], installment_edges[-1]], [0, value_limit]])
+    }
+
+
+@register_figure('payments', _prepare_payments)
+def draw_payments(data):
+    fig = Figure(figsize=(16, 12))
+    axes = fig.subplots(2, 2)
+    types = data['types']
+    axes[0, 0].pie(types.values, labels=types.index, autopct='%1.1f%%', startangle=90,
+                   colors=cm.Set3(np.linspace(0, 1, len(types))))
+    axes[0, 0].set_title('Distribución de Métodos de Pago', fontsize=12, fontweight='bold')
+    bp = axes[0, 1].bxp(data['box_stats'], patch_artist=True)
+    for patch in bp['boxes']:
+        patch.set_facecolor('lightblue')
+    axes[0, 1].set_ylim(0, data['value_limit'])
+    axes[0, 1].tick_params(axis='x', rotation=45)
+    axes[0, 1].set_title('Distribución de Valores por Método de Pago', fontsize=12, fontweight='bold')
+    axes[1, 0].bar(data['installments'].index, data['installments'].values, color='coral', alpha=0.7)
+    axes[1, 0].set_xlabel('Número de Cuotas')
+    axes[1, 0].set_title('Distribución de Número de Cuotas', fontsize=12, fontweight='bold')
+    mesh = draw_density(axes[1, 1], *data['density'], cmap='Purples')
+    fig.colorbar(mesh, ax=axes[1, 1], label='Pagos (escala log)')
+    axes[1, 1].set_xlabel('Número de Cuotas')
+    axes[1, 1].set_ylabel('Valor de Pago (R$)')
+    axes[1, 1].set_title('Relación: Valor vs Número de Cuotas', fontsize=12, fontweight='bold')
+    fig.suptitle('Análisis de Pagos', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Reviews
+
+def _prepare_reviews(context):
+    if not context.has('orders', 'order_reviews'):
+        return None
+    facts = context.order_facts
+    scored = facts.dropna(subset=['review_score'])
+    delivered = scored.dropna(subset=['delivery_days'])
+    score_edges = integer_edges(scored['review_score'].astype(float))
+    days_limit = delivered['delivery_days'].quantile(0.95) if len(delivered) else 1
+    return {
+        'scores': context.datasets['order_reviews']['review_score'].value_counts().sort_index(),
+        'monthly_score': scored.groupby('year_month')['review_score'].mean().astype(float),
+        'density': density_grid(delivered['delivery_days'], delivered['review_score'].astype(float),
+                                bins=[40, score_edges],
+                                range=[[0, days_limit], [score_edges[0], score_edges[-1]]]),
+        'box_stats': grouped_box_stats(scored['review_score'].astype(float), scored['order_status'])
+    }
+
+
+@register_figure('reviews', _prepare_reviews)
+def draw_reviews(data):
+    fig = Figure(figsize=(16, 12))
+    axes = fig.subplots(2, 2)
+    scores = data['scores']
+    axes[0, 0].bar(scores.index, scores.values, color='gold', alpha=0.7, edgecolor='black')
+    axes[0, 0].set_xlabel('Review Score')
+    axes[0, 0].set_title('Distribución de Review Scores', fontsize=12, fontweight='bold')
+    monthly = data['monthly_score']
+    axes[0, 1].plot(monthly.index, monthly.values, marker='o', color='darkorange')
+    axes[0, 1].tick_params(axis='x', rotation=90)
+    axes[0, 1].set_title('Review Score Promedio por Mes', fontsize=12, fontweight='bold')
+    axes[0, 1].grid(True, alpha=0.3)
+    mesh = draw_density(axes[1, 0], *data['density'], cmap='Blues')
+    fig.colorbar(mesh, ax=axes[1, 0], label='Reviews (escala log)')
+    axes[1, 0].set_xlabel('Tiempo de Entrega (días)')
+    axes[1, 0].set_ylabel('Review Score')
+    axes[1, 0].set_title('Review Score vs Tiempo de Entrega', fontsize=12, fontweight='bold')
+    bp = axes[1, 1].bxp(data['box_stats'], patch_artist=True)
+    for patch in bp['boxes']:
+        patch.set_facecolor('lightcoral')
+    axes[1, 1].tick_params(axis='x', rotation=45)
+    axes[1, 1].set_title('Review Score por Estado de Orden', fontsize=12, fontweight='bold')
+    fig.suptitle('Análisis de Reviews', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Entregas
+
+def _prepare_deliveries(context):
+    if not context.has('orders'):
+        return None
+    times = context.delivery_times
+    delay = context.order_facts['delay_days'].dropna()
+    return {
+        'total_histogram': _histogram(times.stage_days('total'), bins=30),
+        'on_time': [(delay <= 0).sum(), (delay > 0).sum()],
+        'status': context.datasets['orders']['order_status'].value_counts(),
+        'stages': times.stage_summary(quantiles=(50, 90)).iloc[:4]
+    }
+
+
+@register_figure('deliveries', _prepare_deliveries)
+def draw_deliveries(data):
+    fig = Figure(figsize=(16, 12))
+    axes = fig.subplots(2, 2)
+    counts, edges = data['total_histogram']
+    _stairs(axes[0, 0], counts, edges, color='lightblue', edgecolor='black', alpha=0.7)
+    axes[0, 0].set_xlabel('Tiempo de Entrega (días)')
+    axes[0, 0].set_title('Distribución de Tiempos de Entrega (Compra → Cliente)', fontsize=12, fontweight='bold')
+    axes[0, 1].bar(['A Tiempo', 'Con Retraso'], data['on_time'], color=['green', 'red'], alpha=0.7)
+    axes[0, 1].set_title('Cumplimiento de Fechas Estimadas', fontsize=12, fontweight='bold')
+    status = data['status']
+    axes[1, 0].pie(status.values, labels=status.index, autopct='%1.1f%%', startangle=90,
+                   colors=cm.Set3(np.linspace(0, 1, len(status))), textprops={'fontsize': 9})
+    axes[1, 0].set_title('Distribución de Estados de Órdenes', fontsize=12, fontweight='bold')
+    stages = data['stages']
+    positions = np.arange(len(stages))
+    axes[1, 1].barh(positions - 0.2, stages['p50'], height=0.4, label='p50', color='steelblue')
+    axes[1, 1].barh(positions + 0.2, stages['p90'], height=0.4, label='p90', color='darkred')
+    axes[1, 1].set_yticks(positions, stages.index)
+    axes[1, 1].invert_yaxis()
+    axes[1, 1].set_xlabel('Días')
+    axes[1, 1].set_title('Tiempo por Etapa de Entrega', fontsize=12, fontweight='bold')
+    axes[1, 1].legend()
+    fig.suptitle('Análisis de Entregas', fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Relacional
+
+RELATIONAL_COLUMNS = ['order_value', 'num_items', 'freight_value', 'review_score', 'delivery_days', 'delay_days']
+
+
+def _prepare_relational(context):
+    if not context.has('orders', 'order_items', 'order_reviews'):
+        return None
+    facts = context.order_facts
+    numeric = facts[RELATIONAL_COLUMNS].astype(float)
+    valid = numeric.dropna(subset=['order_value', 'review_score'])
+    score_edges = integer_edges(valid['review_score'])
+    delivery_range = pd.cut(numeric['delivery_days'], bins=[0, 5, 10, 15, 20, 30, 100])
+    return {
+        'correlation': numeric.corr(),
+        'density': density_grid(valid['order_value'], valid['review_score'], bins=[50, score_edges],
+                                range=[[0, valid['order_value'].quantile(0.95)],
+                                       [score_edges[0], score_edges[-1]]]),
+        'score_by_delivery': numeric['review_score'].groupby(delivery_range, observed=False).mean()
+    }
+
+
+@register_figure('relational', _prepare_relational)
+def draw_relational(data):
+    fig = Figure(figsize=(20, 6))
+    axes = fig.subplots(1, 3)
+    corr = data['correlation']
+    image = axes[0].imshow(corr.values, cmap='coolwarm', vmin=-1, vmax=1)
+    axes[0].set_xticks(range(len(corr)), corr.columns, rotation=45, ha='right')
+    axes[0].set_yticks(range(len(corr)), corr.index)
+    for i in range(len(corr)):
+        for j in range(len(corr)):
+            axes[0].text(j, i, f'{corr.values[i, j]:.2f}', ha='center', va='center', fontsize=8)
+    fig.colorbar(image, ax=axes[0])
+    axes[0].set_title('Matriz de Correlación (nivel orden)', fontsize=12, fontweight='bold')
+    mesh = draw_density(axes[1], *data['density'], cmap='Blues')
+    fig.colorbar(mesh, ax=axes[1], label='Órdenes (escala log)')
+    axes[1].set_xlabel('Valor de Orden (R$)')
+    axes[1].set_ylabel('Review Score')
+    axes[1].set_title('Review Score vs Valor de Orden', fontsize=12, fontweight='bold')
+    by_delivery = data['score_by_delivery']
+    axes[2].bar(by_delivery.index.astype(str), by_delivery.values, color='teal', alpha=0.7)
+    axes[2].set_xlabel('Tiempo de Entrega (días)')
+    axes[2].set_ylabel('Review Score Promedio')
+    axes[2].set_title('Satisfacción según Tiempo de Entrega', fontsize=12, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Dashboard
+
+def _prepare_dashboard(context):
+    if not context.has('orders'):
+        return None
+    facts = context.order_facts
+    categories = None
+    if context.has('order_items', 'products'):
+        items = context.datasets['order_items']
+        categories = top_counts(items['product_id'].map(
+            context.datasets['products'].set_index('product_id')['product_category_name']), 10)
+    reviews = context.datasets.get('order_reviews')
+    kpis = context.kpis
+    return {
+        'kpis': {
+            'orders': kpis['total_orders'],
+            'customers': kpis.get('total_customers', 0),
+            'review_score': kpis.get('avg_review_score', 0),
+            'revenue': kpis.get('total_revenue', 0)
+        },
+        'scores': reviews['review_score'].value_counts().sort_index() if reviews is not None else None,
+        'monthly': facts['year_month'].value_counts().sort_index(),
+        'categories': categories,
+        'payments': facts['payment_type'].value_counts()
+    }
+
+
+@register_figure('dashboard', _prepare_dashboard)
+def draw_dashboard(data):
+    fig = Figure(figsize=(16, 10))
+    grid = fig.add_gridspec(3, 4, hspace=0.4, wspace=0.3)
+    kpis = data['kpis']
+    cards = [
+        (f"{kpis['orders']:,}", 'Total de Órdenes', 'steelblue'),
+        (f"{kpis['customers']:,}", 'Total de Clientes', 'green'),
+        (f"{kpis['review_score']:.2f}", 'Review Score Promedio', 'gold'),
+        (f"R$ {kpis['revenue']:,.0f}", 'Valor Total de Ventas', 'purple')
+    ]
+    for col, (value, label, color) in enumerate(cards):
+        ax = fig.add_subplot(grid[0, col])
+        ax.text(0.5, 0.5, value, ha='center', va='center', fontsize=20, fontweight='bold', color=color)
+        ax.text(0.5, 0.2, label, ha='center', va='center', fontsize=12)
+        ax.axis('off')
+        ax.add_patch(Rectangle((0.1, 0.1), 0.8, 0.8, fill=False, edgecolor=color, linewidth=2))
+    if data['scores'] is not None:
+        ax = fig.add_subplot(grid[1, :2])
+        ax.bar(data['scores'].index, data['scores'].values, color='gold', alpha=0.7, edgecolor='black')
+        ax.set_title('Distribución de Review Scores', fontsize=12, fontweight='bold')
+    ax = fig.add_subplot(grid[1, 2:])
+    ax.plot(data['monthly'].index, data['monthly'].values, marker='o', linewidth=2)
+    ax.tick_params(axis='x', rotation=45)
+    ax.set_title('Evolución de Órdenes en el Tiempo', fontsize=12, fontweight='bold')
+    if data['categories'] is not None:
+        ax = fig.add_subplot(grid[2, :2])
+        categories = data['categories']
+        ax.barh(range(len(categories)), categories.values, color='teal', alpha=0.7)
+        ax.set_yticks(range(len(categories)), [c[:25] for c in categories.index])
+        ax.invert_yaxis()
+        ax.set_title('Top 10 Categorías de Productos', fontsize=12, fontweight='bold')
+    ax = fig.add_subplot(grid[2, 2:])
+    payments = data['payments']
+    ax.pie(payments.values, labels=payments.index, autopct='%1.1f%%', startangle=90,
+           colors=cm.Set3(np.linspace(0, 1, len(payments))), textprops={'fontsize': 9})
+    ax.set_title('Método de Pago Principal por Orden', fontsize=12, fontweight='bold')
+    fig.suptitle('Dashboard Resumen - KPIs Principales', y=0.98, fontsize=16, fontweight='bold')
+    return fig
+
+
+def _update_digest(digest, obj):
+    """Agrega al hash el contenido de un agregado de entrada (recursivo)"""
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        columns = list(obj.columns) if isinstance(obj, pd.DataFrame) else [obj.name]
+        dtypes = obj.dtypes.astype(str).tolist() if isinstance(obj, pd.DataFrame) else [str(obj.dtype)]
+        digest.update(repr((type(obj).__name__, obj.shape, columns, dtypes, str(obj.index.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(obj, index=True).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        digest.update(repr((obj.dtype.str, obj.shape)).encode())
+        if obj.dtype == object:
+            digest.update(pd.util.hash_array(obj.ravel()).tobytes())
+        else:
+            digest.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        digest.update(b'{')
+        for key in sorted(obj, key=repr):
+            digest.update(repr(key).encode())
+            _update_digest(digest, obj[key])
+        digest.update(b'}')
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b'[')
+        for item in obj:
+            _update_digest(digest, item)
+        digest.update(b']')
+    else:
+        digest.update(repr(obj).encode())
+
+
+def figure_key(name, data, formats=('png',), dpi=100, style=None):
+    """Hash del contenido de los agregados de una figura y de su configuración de dibujo
+
+    Incluye el código de la función de dibujo y de los auxiliares que usa
+    (`code_fingerprint`), los formatos, el dpi, el estilo (parámetros rc) y la
+    versión de matplotlib, de modo que cualquier cambio en los datos o en el
+    aspecto invalida la figura guardada.
+    """
+    digest = hashlib.sha256()
+    _update_digest(digest, {
+        'name': name, 'draw': code_fingerprint(FIGURES[name][1]), 'formats': list(formats), 'dpi': dpi,
+        'style': dict(style or {}), 'matplotlib': matplotlib.__version__
+    })
+    _update_digest(digest, data)
+    return digest.hexdigest()[:20]
+
+
+class FigureCache:
+    """Figuras ya renderizadas guardadas por hash de contenido en un directorio
+
+    Cada archivo se guarda como `<figura>-<hash>.<formato>`; si los datos y la
+    configuración de una figura no cambiaron, sus archivos se copian desde la
+    caché en lugar de volver a dibujarla.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name, key, fmt):
+        return os.path.join(self.directory, f'{name}-{key}.{fmt}')
+
+    def fetch(self, name, key, output_dir, formats):
+        """Copia los archivos guardados a `output_dir`; None si falta alguno"""
+        cached = [self._path(name, key, fmt) for fmt in formats]
+        if not all(os.path.exists(path) for path in cached):
+            return None
+        paths = []
+        for fmt, path in zip(formats, cached):
+            target = os.path.join(output_dir, f'{name}.{fmt}')
+            shutil.copyfile(path, target)
+            paths.append(target)
+        return paths
+
+    def store(self, name, key, paths):
+        """Guarda en la caché los archivos recién renderizados de una figura"""
+        for path in paths:
+            fmt = os.path.splitext(path)[1][1:]
+            shutil.copyfile(path, self._path(name, key, fmt))
+
+    def prune(self, keys):
+        """Elimina las versiones anteriores de las figuras de `keys` ({figura: hash vigente})"""
+        for filename in os.listdir(self.directory):
+            name, _, key = os.path.splitext(filename)[0].rpartition('-')
+            if name in keys and key != keys[name]:
+                os.remove(os.path.join(self.directory, filename))
+
+
+def render_figure(name, data, output_dir, formats=('png',), dpi=100, style=None):
+    """Dibuja una figura registrada y la guarda en cada formato; devuelve archivos y segundos"""
+    start = time.perf_counter()
+    with section(f'figure:{name}', 'figure'), matplotlib.rc_context(style or {}):
+        fig = FIGURES[name][1](data)
+        paths = []
+        for fmt in formats:
+            path = os.path.join(output_dir, f'{name}.{fmt}')
+            fig.savefig(path, dpi=dpi, bbox_inches='tight')
+            paths.append(path)
+    return name, paths, time.perf_counter() - start
+
+
+def _init_worker():
+    matplotlib.use('Agg')
+
+
+def render_figures(inputs, output_dir, names=None, formats=('png',), dpi=100, workers=None,
+                   style=None, cache=None):
+    """Renderiza las figuras con datos disponibles en paralelo y las guarda en `output_dir`
+
+    Devuelve una tabla con los archivos escritos, el tiempo de dibujo de cada
+    figura y si se sirvió desde `cache` (un `FigureCache`); solo las figuras
+    cuyo hash no está en la caché se dibujan, y las versiones anteriores de
+    las figuras renderizadas se eliminan de la caché. Con `workers=1` todo se dibuja
+    en el proceso actual.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    names = [n for n in (names or inputs) if inputs.get(n) is not None]
+    keys = {}
+    results = []
+    if cache is not None:
+        pending = []
+        for name in names:
+            keys[name] = figure_key(name, inputs[name], formats, dpi, style)
+            paths = cache.fetch(name, keys[name], output_dir, formats)
+            if paths is None:
+                pending.append(name)
+            else:
+                results.append((name, paths, 0.0, True))
+        names = pending
+
+    workers = min(workers or os.cpu_count() or 1, max(len(names), 1))
+    args = [(n, inputs[n], output_dir, formats, dpi, style) for n in names]
+    if workers == 1:
+        rendered = [render_figure(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 mp_context=multiprocessing.get_context('spawn')) as pool:
+            rendered = list(pool.map(render_figure, *zip(*args)))
+        # Los procesos hijos no ven el perfilador; se registra el tiempo que informan
+        for name, _, seconds in rendered:
+            record(f'figure:{name}', 'figure', seconds)
+    for name, paths, seconds in rendered:
+        if cache is not None:
+            cache.store(name, keys[name], paths)
+        results.append((name, paths, seconds, False))
+    if cache is not None:
+        cache.prune(keys)
+    table = pd.DataFrame(results, columns=['figure', 'files', 'seconds', 'cached']).set_index('figure')
+    return table.reindex([n for n in inputs if n in table.index])
@@ -0,0 +1,202 @@
+"""Matriz origen-destino entre estados de vendedores y de clientes"""
+import numpy as np
+import pandas as pd
+
+from .crosstab import encode
+
+BRAZIL_STATES = [
+    'AC', 'AL', 'AM', 'AP', 'BA', 'CE', 'DF', 'ES', 'GO', 'MA', 'MG', 'MS', 'MT', 'PA',
+    'PB', 'PE', 'PI', 'PR', 'RJ', 'RN', 'RO', 'RR', 'RS', 'SC', 'SE', 'SP', 'TO'
+]
+
+FLOW_MEASURES = ['items', 'revenue', 'freight', 'delivered', 'delivery_days']
+
+# Estados sin entrega pendiente: una orden en ellos sin fecha de entrega ya no la tendrá
+FINAL_STATUSES = ('delivered', 'canceled', 'unavailable')
+
+
+def flow_inputs(datasets, since=None, exclude=(), only=None):
+    """Items con estado de origen, estado de destino, montos y días de entrega
+
+    Para refrescos incrementales: con `since` solo se incluyen los items de
+    órdenes compradas en esa fecha o después, salvo las de `exclude` (ya
+    procesadas); con `only`, solo los de esas órdenes.
+    """
+    orders = datasets['orders'][['order_id', 'customer_id', 'order_status', 'order_purchase_timestamp',
+                                 'order_delivered_customer_date']]
+    purchase = pd.to_datetime(orders['order_purchase_timestamp'], errors='coerce')
+    keep = pd.Series(True, index=orders.index)
+    if since is not None:
+        keep &= (purchase >= pd.Timestamp(since)) & ~orders['order_id'].isin(exclude)
+    if only is not None:
+        keep &= orders['order_id'].isin(only)
+    orders, purchase = orders[keep], purchase[keep]
+    delivered = pd.to_datetime(orders['order_delivered_customer_date'], errors='coerce')
+    customer_state = datasets['customers'].set_index('customer_id')['customer_state']
+    order_info = pd.DataFrame({
+        'order_id': orders['order_id'],
+        'customer_state': orders['customer_id'].map(customer_state),
+        'order_status': orders['order_status'],
+        'purchase': purchase,
+        'delivery_days': (delivered - purchase).dt.days
+    })
+    items = datasets['order_items'][['order_id', 'seller_id', 'price', 'freight_value']]
+    flows = items.merge(order_info, on='order_id', how='inner')
+    seller_state = datasets['sellers'].set_index('seller_id')['seller_state']
+    flows['seller_state'] = flows['seller_id'].map(seller_state)
+    return flows
+
+
+def awaiting_delivery(flows):
+    """Items de órdenes que aún pueden recibir su entrega (sin fecha, con compra y sin estado final)"""
+    return (flows['delivery_days'].isna() & flows['purchase'].notna()
+            & ~flows['order_status'].isin(FINAL_STATUSES))
+
+
+class FlowMatrix:
+    """Medidas acumulables por par (estado vendedor, estado cliente)
+
+    Guarda matrices densas de conteos y sumas más un histograma de días de
+    entrega por par, de modo que media y percentiles se obtienen sin volver a
+    unir tablas y los refrescos solo procesan las órdenes nuevas y las que
+    seguían sin entregar (`pending`), cuyas entregas se suman al llegar.
+    """
+
+    def __init__(self, states=BRAZIL_STATES, max_days=200):
+        self.states = list(states)
+        self.max_days = max_days
+        n = len(self.states)
+        self.totals = {m: np.zeros((n, n), dtype=np.float64) for m in FLOW_MEASURES}
+        self.histogram = np.zeros((n, n, max_days + 1), dtype=np.int64)
+        self.watermark = None
+        # Órdenes con la compra exactamente en `watermark` (ya procesadas) y órdenes aún sin entrega
+        self.boundary = set()
+        self.pending = set()
+
+    @classmethod
+    def from_datasets(cls, datasets, **kwargs):
+        """Construye la matriz con todas las órdenes disponibles"""
+        matrix = cls(**kwargs)
+        matrix.refresh(datasets)
+        return matrix
+
+    def update(self, flows, delivery_only=False):
+        """Acumula un lote de items (salida de `flow_inputs`) en una sola pasada
+
+        Con `delivery_only` solo se suman las entregas (para órdenes pendientes
+        cuyos items, ingresos y fletes ya se contaron).
+        """
+        n = len(self.states)
+        origin, _ = encode(flows['seller_state'], categories=self.states)
+        destination, _ = encode(flows['customer_state'], categories=self.states)
+        valid = (origin >= 0) & (destination >= 0)
+        pair = origin[valid] * n + destination[valid]
+        days = flows['delivery_days'].to_numpy(dtype=np.float64)[valid]
+        has_days = ~np.isnan(days)
+        weights = {
+            'delivered': has_days.astype(np.float64),
+            'delivery_days': np.where(has_days, days, 0.0)
+        }
+        if not delivery_only:
+            weights.update({
+                'items': None,
+                'revenue': flows['price'].to_numpy(dtype=np.float64)[valid],
+                'freight': flows['freight_value'].to_numpy(dtype=np.float64)[valid]
+            })
+        for measure, w in weights.items():
+            self.totals[measure] += np.bincount(pair, weights=w, minlength=n * n).reshape(n, n)
+
+        day_bins = np.clip(days[has_days], 0, self.max_days).astype(np.int64)
+        self.histogram += np.bincount(pair[has_days] * (self.max_days + 1) + day_bins,
+                                      minlength=n * n * (self.max_days + 1)).reshape(self.histogram.shape)
+
+        if delivery_only:
+            self.pending -= set(flows.loc[flows['delivery_days'].notna(), 'order_id'])
+            return
+        self.pending |= set(flows.loc[awaiting_delivery(flows), 'order_id'])
+        if 'purchase' in flows.columns and flows['purchase'].notna().any():
+            latest = flows['purchase'].max()
+            at_latest = set(flows.loc[flows['purchase'] == latest, 'order_id'])
+            if self.watermark is None or latest > self.watermark:
+                self.watermark, self.boundary = latest, at_latest
+            elif latest == self.watermark:
+                self.boundary |= at_latest
+
+    def refresh(self, datasets):
+        """Incorpora las órdenes nuevas y las entregas de órdenes pendientes
+
+        Las nuevas son las compradas desde la última actualización (incluida la
+        misma marca de tiempo, sin repetir las ya procesadas); las pendientes,
+        las que no tenían fecha de entrega en una actualización anterior. Las
+        pendientes que pasaron a un estado final sin entrega (o que ya no están
+        en los datos) dejan de esperarse.
+        """
+        if self.pending:
+            arrived = flow_inputs(datasets, only=self.pending)
+            self.update(arrived[arrived['delivery_days'].notna()], delivery_only=True)
+            self.pending &= set(arrived.loc[awaiting_delivery(arrived), 'order_id'])
+        self.update(flow_inputs(datasets, since=self.watermark, exclude=self.boundary))
+        return self
+
+    def matrix(self, measure):
+        """Matriz etiquetada (origen en filas, destino en columnas) de una medida"""
+        if measure == 'mean_delivery_days':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = self.totals['delivery_days'] / self.totals['delivered']
+        else:
+            values = self.totals[measure]
+        return pd.DataFrame(values, index=pd.Index(self.states, name='seller_state'),
+                            columns=pd.Index(self.states, name='customer_state'))
+
+    def percentile(self, q):
+        """Percentil `q` (0-100) de días de entrega por par, desde el histograma"""
+        cumulative = np.cumsum(self.histogram, axis=2)
+        total = cumulative[:, :, -1]
+        target = np.ceil(total * q / 100.0)
+        result = (cumulative < target[:, :, None]).sum(axis=2).astype(np.float64)
+        result[total == 0] = np.nan
+        return result
+
+    def to_frame(self, percentiles=(50, 90)):
+        """Tabla larga y dispersa: solo los pares con al menos un item"""
+        origin, destination = np.nonzero(self.totals['items'])
+        frame = pd.DataFrame({
+            'seller_state': np.asarray(self.states, dtype=object)[origin],
+            'customer_state': np.asarray(self.states, dtype=object)[destination]
+        })
+        for measure in ['items', 'revenue', 'freight']:
+            frame[measure] = self.totals[measure][origin, destination]
+        delivered = self.totals['delivered'][origin, destination]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame['mean_delivery_days'] = self.totals['delivery_days'][origin, destination] / delivered
+        for q in percentiles:
+            frame[f'p{q}_delivery_days'] = self.percentile(q)[origin, destination]
+        frame['items'] = frame['items'].astype(np.int64)
+        return frame.sort_values('items', ascending=False, ignore_index=True)
+
+    def save(self, path):
+        """Guarda la matriz en un archivo .npz para reutilizarla entre ejecuciones"""
+        np.savez_compressed(
+            path,
+            states=np.asarray(self.states),
+            max_days=self.max_days,
+            histogram=self.histogram,
+            watermark=np.datetime64(self.watermark) if self.watermark is not None else np.datetime64('NaT'),
+            boundary=np.asarray(sorted(self.boundary), dtype=str),
+            pending=np.asarray(sorted(self.pending), dtype=str),
+            **{f'total_{m}': v for m, v in self.totals.items()}
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Carga una matriz guardada con `save`"""
+        data = np.load(path)
+        matrix = cls(states=[str(s) for s in data['states']], max_days=int(data['max_days']))
+        matrix.histogram = data['histogram']
+        matrix.totals = {m: data[f'total_{m}'] for m in FLOW_MEASURES}
+        watermark = data['watermark'][()]
+        matrix.watermark = None if np.isnat(watermark) else pd.Timestamp(watermark)
+        for name in ['boundary', 'pending']:
+            if name in data.files:
+                setattr(matrix, name, set(data[name].tolist()))
+        return matrix
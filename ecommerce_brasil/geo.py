@@ -0,0 +1,77 @@
+"""Distancias cliente-vendedor a partir de la tabla de geolocalización"""
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Caja aproximada de Brasil; descarta coordenadas claramente erróneas
+BRAZIL_LAT = (-34.0, 5.5)
+BRAZIL_LNG = (-74.0, -34.0)
+
+
+def zip_coordinates(geolocation):
+    """Latitud/longitud promedio por prefijo de CEP, ordenadas por prefijo
+
+    Devuelve un DataFrame indexado por `zip_code_prefix` con columnas `lat` y
+    `lng`, una fila por prefijo.
+    """
+    lat = geolocation['geolocation_lat'].to_numpy(dtype=np.float64)
+    lng = geolocation['geolocation_lng'].to_numpy(dtype=np.float64)
+    prefix = geolocation['geolocation_zip_code_prefix'].to_numpy(dtype=np.int64)
+    valid = ((lat >= BRAZIL_LAT[0]) & (lat <= BRAZIL_LAT[1])
+             & (lng >= BRAZIL_LNG[0]) & (lng <= BRAZIL_LNG[1]))
+    prefixes, inverse, counts = np.unique(prefix[valid], return_inverse=True, return_counts=True)
+    return pd.DataFrame({
+        'lat': np.bincount(inverse, weights=lat[valid]) / counts,
+        'lng': np.bincount(inverse, weights=lng[valid]) / counts
+    }, index=pd.Index(prefixes, name='zip_code_prefix'))
+
+
+def lookup_coordinates(prefixes, coords):
+    """Coordenadas de cada prefijo vía búsqueda binaria (NaN si no existe)"""
+    prefixes = np.asarray(prefixes, dtype=np.float64)
+    known = coords.index.to_numpy(dtype=np.int64)
+    lat = np.full(len(prefixes), np.nan)
+    lng = np.full(len(prefixes), np.nan)
+    present = ~np.isnan(prefixes)
+    keys = prefixes[present].astype(np.int64)
+    pos = np.clip(np.searchsorted(known, keys), 0, max(len(known) - 1, 0))
+    found = known[pos] == keys if len(known) else np.zeros(len(keys), dtype=bool)
+    target = np.flatnonzero(present)[found]
+    lat[target] = coords['lat'].to_numpy()[pos[found]]
+    lng[target] = coords['lng'].to_numpy()[pos[found]]
+    return lat, lng
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distancia de gran círculo en km entre arreglos de coordenadas en grados"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def attach_distances(datasets, batch_size=1_000_000):
+    """Copia de order_items con `distance_km` entre el CEP del cliente y el del vendedor
+
+    Los prefijos se resuelven con búsqueda binaria sobre las coordenadas
+    deduplicadas y la distancia se calcula en lotes de `batch_size` items.
+    Los items sin coordenadas conocidas quedan con NaN.
+    """
+    items = datasets['order_items']
+    coords = zip_coordinates(datasets['geolocation'])
+
+    customer_zip = datasets['customers'].set_index('customer_id')['customer_zip_code_prefix']
+    order_zip = datasets['orders'].set_index('order_id')['customer_id'].map(customer_zip)
+    customer_prefix = items['order_id'].map(order_zip).to_numpy(dtype=np.float64)
+    seller_zip = datasets['sellers'].set_index('seller_id')['seller_zip_code_prefix']
+    seller_prefix = items['seller_id'].map(seller_zip).to_numpy(dtype=np.float64)
+
+    distance = np.empty(len(items), dtype=np.float64)
+    for start in range(0, len(items), batch_size):
+        stop = start + batch_size
+        c_lat, c_lng = lookup_coordinates(customer_prefix[start:stop], coords)
+        s_lat, s_lng = lookup_coordinates(seller_prefix[start:stop], coords)
+        distance[start:stop] = haversine_km(s_lat, s_lng, c_lat, c_lng)
+
+    return items.assign(distance_km=distance)
@@ -0,0 +1,215 @@
+"""Almacén de KPIs calculados una vez por versión de los datos"""
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from .profiling import section
+
+KPIS = {}
+
+
+def register_kpi(name, label, tables, requires=()):
+    """Registra `compute(datasets, store)` como el KPI `name`
+
+    `tables` son las tablas que lee directamente y `requires` otros KPIs que
+    usa a través de `store`; ambos definen cuándo hay que recalcularlo.
+    """
+    def decorator(compute):
+        KPIS[name] = {'label': label, 'tables': tuple(tables), 'requires': tuple(requires), 'compute': compute}
+        return compute
+    return decorator
+
+
+def table_version(df):
+    """Hash del contenido de una tabla (columnas, tipos y valores)"""
+    digest = hashlib.sha256(repr((list(df.columns), df.dtypes.astype(str).tolist())).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _purchase_dates(datasets):
+    return pd.to_datetime(datasets['orders']['order_purchase_timestamp'], errors='coerce').dropna()
+
+
+@register_kpi('total_orders', 'Total de Órdenes', ['orders'])
+def _total_orders(datasets, store):
+    return len(datasets['orders'])
+
+
+@register_kpi('first_purchase', 'Fecha Más Antigua', ['orders'])
+def _first_purchase(datasets, store):
+    dates = _purchase_dates(datasets)
+    return dates.min().strftime('%Y-%m-%d') if len(dates) else None
+
+
+@register_kpi('last_purchase', 'Fecha Más Reciente', ['orders'])
+def _last_purchase(datasets, store):
+    dates = _purchase_dates(datasets)
+    return dates.max().strftime('%Y-%m-%d') if len(dates) else None
+
+
+@register_kpi('date_range_days', 'Rango Temporal (días)', [], requires=['first_purchase', 'last_purchase'])
+def _date_range_days(datasets, store):
+    first, last = store['first_purchase'], store['last_purchase']
+    if first is None or last is None:
+        return None
+    return (pd.Timestamp(last) - pd.Timestamp(first)).days
+
+
+@register_kpi('total_customers', 'Total de Clientes', ['customers'])
+def _total_customers(datasets, store):
+    return len(datasets['customers'])
+
+
+@register_kpi('unique_customers', 'Total de Clientes Únicos (customer_unique_id)', ['customers'])
+def _unique_customers(datasets, store):
+    return datasets['customers']['customer_unique_id'].nunique()
+
+
+@register_kpi('total_sellers', 'Total de Vendedores Únicos', ['sellers'])
+def _total_sellers(datasets, store):
+    return len(datasets['sellers'])
+
+
+@register_kpi('total_products', 'Total de Productos Únicos', ['products'])
+def _total_products(datasets, store):
+    return len(datasets['products'])
+
+
+@register_kpi('total_items', 'Total de Items Vendidos', ['order_items'])
+def _total_items(datasets, store):
+    return len(datasets['order_items'])
+
+
+@register_kpi('total_revenue', 'Valor Total de Ventas (R$)', ['order_items'])
+def _total_revenue(datasets, store):
+    return datasets['order_items']['price'].sum()
+
+
+@register_kpi('avg_order_value', 'Valor Promedio por Orden (R$)', [], requires=['total_revenue', 'total_orders'])
+def _avg_order_value(datasets, store):
+    return store['total_revenue'] / store['total_orders'] if store['total_orders'] > 0 else 0.0
+
+
+@register_kpi('total_reviews', 'Total de Reviews', ['order_reviews'])
+def _total_reviews(datasets, store):
+    return len(datasets['order_reviews'])
+
+
+@register_kpi('avg_review_score', 'Review Score Promedio', ['order_reviews'])
+def _avg_review_score(datasets, store):
+    return datasets['order_reviews']['review_score'].mean()
+
+
+def _plain(value):
+    """Valor nativo de Python (para JSON) a partir de escalares de numpy"""
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+class KPIStore:
+    """KPIs del dataset calculados a pedido y guardados con la versión de sus tablas
+
+    Cada KPI se calcula la primera vez que se pide y se reutiliza mientras no
+    cambie el contenido de las tablas de las que depende (directamente o a
+    través de otros KPIs). `refresh(datasets)` recalcula las versiones de las
+    tablas y descarta solo los KPIs afectados.
+    """
+
+    def __init__(self, datasets):
+        self.datasets = {}
+        self.versions = {}
+        self.values = {}
+        self.refresh(datasets)
+
+    def refresh(self, datasets):
+        """Actualiza las tablas; devuelve los KPIs invalidados por el cambio"""
+        versions = {}
+        used = {t for kpi in KPIS.values() for t in kpi['tables']}
+        for name, df in datasets.items():
+            if name not in used:
+                continue
+            unchanged = self.datasets.get(name) is df and name in self.versions
+            versions[name] = self.versions[name] if unchanged else table_version(df)
+        changed = {t for t in set(versions) | set(self.versions) if versions.get(t) != self.versions.get(t)}
+        self.datasets = {t: df for t, df in datasets.items() if t in used}
+        self.versions = versions
+        stale = [k for k in self.values if changed & set(self.dependencies(k))]
+        for kpi in stale:
+            del self.values[kpi]
+        return stale
+
+    def dependencies(self, name):
+        """Tablas de las que depende un KPI, incluidas las de los KPIs que usa"""
+        kpi = KPIS[name]
+        tables = list(kpi['tables'])
+        for required in kpi['requires']:
+            tables += [t for t in self.dependencies(required) if t not in tables]
+        return tables
+
+    def available(self, name):
+        return all(t in self.datasets for t in self.dependencies(name))
+
+    def __getitem__(self, name):
+        if name not in self.values:
+            if not self.available(name):
+                raise KeyError(f"Faltan tablas para el KPI '{name}': {self.dependencies(name)}")
+            with section(f'kpi:{name}', 'aggregation'):
+                self.values[name] = _plain(KPIS[name]['compute'](self.datasets, self))
+        return self.values[name]
+
+    def get(self, name, default=None):
+        return self[name] if self.available(name) else default
+
+    def table(self):
+        """Una fila por KPI disponible: etiqueta, valor, tablas de las que depende y su versión"""
+        rows = []
+        for name in KPIS:
+            if self.available(name):
+                tables = self.dependencies(name)
+                rows.append({
+                    'kpi': name, 'label': KPIS[name]['label'], 'value': self[name],
+                    'depends_on': ','.join(tables),
+                    'version': ','.join(self.versions[t] for t in tables)
+                })
+        return pd.DataFrame(rows, columns=['kpi', 'label', 'value', 'depends_on', 'version'])
+
+    def to_dict(self):
+        """KPIs y versiones de las tablas, listo para serializar"""
+        return kpi_dict(self.table(), self.versions)
+
+    def to_json(self, path):
+        """Guarda los KPIs en un archivo JSON legible por dashboards externos"""
+        write_kpis(self.to_dict(), path)
+
+    def to_parquet(self, path):
+        """Guarda la tabla de KPIs en Parquet (requiere pyarrow o fastparquet)"""
+        table = self.table()
+        table['value'] = table['value'].astype(str)
+        table.to_parquet(path, index=False)
+
+
+def kpi_dict(table, versions=None):
+    """Diccionario serializable a partir de la tabla de `KPIStore.table`"""
+    return {
+        'kpis': dict(zip(table['kpi'], table['value'])),
+        'labels': dict(zip(table['kpi'], table['label'])),
+        'table_versions': dict(versions or {})
+    }
+
+
+def write_kpis(kpis, path):
+    """Escribe en JSON un diccionario de `kpi_dict`"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(kpis, f, ensure_ascii=False, indent=2)
+
+
+def read_kpis(path):
+    """KPIs guardados con `KPIStore.to_json` (diccionario nombre → valor)"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['kpis']
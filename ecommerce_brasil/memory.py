@@ -0,0 +1,271 @@
+"""Presupuestos de memoria por etapa del flujo, medidos sobre datos sintéticos
+
+`python -m ecommerce_brasil.memory --scale 1 --budgets memory_budgets.json`
+ejecuta primero el flujo completo una vez para dejar checkpoints de todas las
+etapas y después mide cada etapa por separado en un proceso nuevo: el proceso
+lee solo las entradas de la etapa desde los checkpoints, reinicia el máximo
+RSS y ejecuta la etapa. El consumo de la etapa es el pico de RSS por encima de
+lo que ya ocupaban sus entradas. Una segunda ejecución con `tracemalloc`
+localiza las líneas del paquete con más memoria asignada cerca del pico.
+Termina con código 1 si alguna etapa supera su presupuesto.
+"""
+import argparse
+import gc
+import json
+import linecache
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from .benchmarks import synthetic_data_dir
+from .profiling import current_rss_mb, max_rss_mb, peak_rss_mb, reset_peak_rss
+from .stages import OLIST_STAGES, olist_pipeline
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Etapas sin la pasada de tracemalloc: dibujar figuras hace millones de asignaciones
+# pequeñas dentro de matplotlib y con tracemalloc tarda ~40 veces más
+UNTRACED_STAGES = ('figures',)
+
+RESULT_COLUMNS = ['stage', 'seconds', 'inputs_rss_mb', 'peak_rss_mb', 'stage_rss_mb', 'py_peak_mb',
+                  'budget_mb', 'status']
+
+
+class AllocationTracer:
+    """tracemalloc con un hilo que guarda una instantánea cada vez que lo asignado crece
+
+    La instantánea con más memoria asignada es la más cercana al pico, así que
+    incluye también copias temporales que ya se liberaron al terminar la etapa.
+    """
+
+    def __init__(self, interval=0.05, growth=1.1, nframes=30):
+        self.interval = interval
+        self.growth = growth
+        self.nframes = nframes
+        self.snapshot = None
+        self.peak_mb = None
+        self._mark = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _take(self):
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self._mark * self.growth:
+            self.snapshot = tracemalloc.take_snapshot()
+            self._mark = current
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self._take()
+
+    def __enter__(self):
+        tracemalloc.start(self.nframes)
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._take()
+        self.peak_mb = tracemalloc.get_traced_memory()[1] / 1024**2
+        tracemalloc.stop()
+        return False
+
+    def top(self, limit=10):
+        """Líneas del paquete con más memoria asignada en la instantánea del pico
+
+        Cada asignación se atribuye a la línea más interna del paquete en su
+        traceback (p. ej. un `.copy()` o un `merge`), no a pandas o numpy.
+        """
+        if self.snapshot is None:
+            return []
+        totals = {}
+        for stat in self.snapshot.statistics('traceback'):
+            frame = next((f for f in reversed(stat.traceback)
+                          if f.filename.startswith(PACKAGE_DIR) and not f.filename.endswith('memory.py')),
+                         stat.traceback[-1])
+            key = (os.path.relpath(frame.filename, os.path.dirname(PACKAGE_DIR)), frame.lineno)
+            size, count = totals.get(key, (0, 0))
+            totals[key] = (size + stat.size, count + stat.count)
+        ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+        return [{
+            'location': f'{filename}:{lineno}',
+            'code': linecache.getline(os.path.join(os.path.dirname(PACKAGE_DIR), filename), lineno).strip(),
+            'size_mb': size / 1024**2,
+            'blocks': count
+        } for (filename, lineno), (size, count) in ranked]
+
+
+def prepare_checkpoints(workdir, scale, seed=42):
+    """Genera los datos sintéticos y deja checkpoints de todas las etapas; devuelve (directorio, params)"""
+    label = f'x{scale:g}-seed{seed}'
+    params = {
+        'data_path': str(synthetic_data_dir(workdir, scale, seed)),
+        'tables': None,
+        'workers': 1,
+        'output_dir': str(Path(workdir) / f'figuras-{label}'),
+        'figure_cache_dir': None
+    }
+    checkpoint_dir = str(Path(workdir) / f'checkpoints-{label}')
+    olist_pipeline(checkpoint_dir, workers=1).run(params=params)
+    return checkpoint_dir, params
+
+
+def measure_stage(name, checkpoint_dir, params, top=10):
+    """Mide una etapa en el proceso actual a partir de los checkpoints de sus entradas"""
+    pipeline = olist_pipeline(checkpoint_dir, workers=1)
+    keys = pipeline.keys(params)
+    stage = pipeline.stages[name]
+    values = {}
+    for dependency in pipeline.upstream(name):
+        values.update(pipeline.store.load(dependency, keys[dependency]))
+    kwargs = {i: values[i] for i in stage.inputs}
+    kwargs.update({p: params.get(p) for p in stage.params})
+    del values
+
+    gc.collect()
+    inputs_rss = current_rss_mb()
+    # Sin VmHWM el pico incluye la lectura de las entradas (cota superior)
+    resettable = reset_peak_rss()
+    start = time.perf_counter()
+    outputs = stage.func(**kwargs)
+    seconds = time.perf_counter() - start
+    peak = peak_rss_mb() if resettable else max_rss_mb()
+    del outputs
+    gc.collect()
+
+    allocations, py_peak = [], None
+    if top:
+        with AllocationTracer() as tracer:
+            stage.func(**kwargs)
+        allocations, py_peak = tracer.top(top), tracer.peak_mb
+    return {
+        'stage': name, 'seconds': seconds, 'inputs_rss_mb': inputs_rss, 'peak_rss_mb': peak,
+        'stage_rss_mb': None if peak is None or inputs_rss is None else max(peak - inputs_rss, 0.0),
+        'py_peak_mb': py_peak, 'top_allocations': allocations
+    }
+
+
+def measure_stages(checkpoint_dir, params, stages=None, top=10, untraced=UNTRACED_STAGES):
+    """Mide cada etapa en su propio proceso (nuevo, sin memoria de las etapas anteriores)"""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for name in stages or [s.name for s in OLIST_STAGES]:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            stage_top = 0 if name in untraced else top
+            results.append(pool.submit(measure_stage, name, checkpoint_dir, params, stage_top).result())
+    return results
+
+
+def read_budgets(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_budgets(results, path, scale, headroom=0.25):
+    """Presupuestos a partir de una medición: consumo de cada etapa más `headroom`, en MB enteros"""
+    budgets = {r['stage']: math.ceil(r['stage_rss_mb'] * (1 + headroom)) + 1
+               for r in results if r['stage_rss_mb'] is not None}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'scale': scale, 'headroom': headroom, 'stages': budgets}, f, indent=2)
+
+
+def check_budgets(results, budgets=None):
+    """Tabla por etapa con su consumo, su presupuesto en MB y si lo supera"""
+    budgets = budgets or {}
+    table = pd.DataFrame([{k: v for k, v in r.items() if k != 'top_allocations'} for r in results])
+    table['budget_mb'] = table['stage'].map(budgets)
+    table['status'] = 'sin presupuesto'
+    table.loc[table['budget_mb'].notna(), 'status'] = 'ok'
+    table.loc[table['stage_rss_mb'] > table['budget_mb'], 'status'] = 'excedido'
+    return table[RESULT_COLUMNS]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m ecommerce_brasil.memory',
+        description='Pico de memoria por etapa del flujo sobre datos sintéticos, con presupuestos'
+    )
+    parser.add_argument('--scale', type=float, default=1.0, help='Escala de los datos sintéticos (por defecto: 1)')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla del generador (por defecto: 42)')
+    parser.add_argument('--only', default='', help='Etapas a medir separadas por comas (por defecto todas)')
+    parser.add_argument('--workdir', default='.benchmarks',
+                        help='Directorio de datos sintéticos y checkpoints (por defecto: .benchmarks)')
+    parser.add_argument('--budgets', help='JSON con los presupuestos en MB por etapa')
+    parser.add_argument('--budget', action='append', default=[], metavar='ETAPA=MB',
+                        help='Presupuesto de una etapa; tiene prioridad sobre --budgets (se puede repetir)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Líneas con más memoria asignada por etapa; 0 omite tracemalloc (por defecto: 10)')
+    parser.add_argument('--trace-all', action='store_true',
+                        help=f"Usa tracemalloc también en {', '.join(UNTRACED_STAGES)} (mucho más lento)")
+    parser.add_argument('--report', help='Escribe el resultado completo, con las asignaciones, en este JSON')
+    parser.add_argument('--save-budgets', help='Escribe presupuestos a partir de esta medición en este JSON')
+    parser.add_argument('--headroom', type=float, default=0.25,
+                        help='Margen sobre lo medido al usar --save-budgets (por defecto: 0.25)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [s.name for s in OLIST_STAGES]
+    stages = [s.strip() for s in args.only.split(',') if s.strip()] or names
+    unknown = [s for s in stages if s not in names]
+    if unknown:
+        print(f"error: etapas desconocidas: {unknown}; disponibles: {names}", file=sys.stderr)
+        return 2
+    budgets = {}
+    if args.budgets:
+        config = read_budgets(args.budgets)
+        if config.get('scale') != args.scale:
+            print(f"error: los presupuestos de {args.budgets} son para la escala {config.get('scale')}, "
+                  f"no {args.scale:g}", file=sys.stderr)
+            return 2
+        budgets.update(config['stages'])
+    for item in args.budget:
+        stage, _, value = item.partition('=')
+        budgets[stage.strip()] = float(value)
+
+    checkpoint_dir, params = prepare_checkpoints(args.workdir, args.scale, args.seed)
+    results = measure_stages(checkpoint_dir, params, stages=stages, top=args.top,
+                             untraced=() if args.trace_all else UNTRACED_STAGES)
+    table = check_budgets(results, budgets)
+    print(table.round(1).to_string(index=False))
+    for result in results:
+        if result['top_allocations']:
+            print(f"\n{result['stage']}: mayores asignaciones cerca del pico")
+            for allocation in result['top_allocations'][:5]:
+                print(f"  {allocation['size_mb']:8.1f} MB  {allocation['location']}  {allocation['code']}")
+
+    if args.report:
+        payload = {
+            'scale': args.scale,
+            'seed': args.seed,
+            'stages': [{**row, 'top_allocations': result['top_allocations']}
+                       for row, result in zip(json.loads(table.to_json(orient='records')), results)]
+        }
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+        print(f"-> {args.report}")
+    if args.save_budgets:
+        write_budgets(results, args.save_budgets, args.scale, args.headroom)
+        print(f"-> {args.save_budgets}")
+
+    exceeded = table[table['status'] == 'excedido']
+    if len(exceeded):
+        print(f"\n⚠️ {len(exceeded)} etapa(s) superan su presupuesto de memoria: {', '.join(exceeded['stage'])}",
+              file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
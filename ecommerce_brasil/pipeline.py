@@ -0,0 +1,311 @@
+"""Flujo del análisis como etapas con entradas y salidas declaradas y checkpoints en disco
+
+Cada etapa es una función que recibe sus entradas (salidas de otras etapas o
+parámetros del flujo) como argumentos con nombre y devuelve un diccionario con
+sus salidas. La clave de una etapa es un hash de su código (incluido el de
+las funciones y módulos del paquete que usa), de sus parámetros y de las
+claves de las etapas de las que depende, así que se puede saber qué
+etapas cambiaron sin leer sus datos: si la clave ya está en el
+`CheckpointStore`, la etapa no se ejecuta y sus salidas se leen de disco solo
+si otra etapa las necesita.
+"""
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import pandas as pd
+
+from .profiling import section
+
+
+def _source(obj):
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        code = getattr(obj, '__code__', None)
+        return code.co_code.hex() if code is not None else repr(obj)
+
+
+def _referenced_names(obj):
+    """Nombres globales que usa una función o los métodos de una clase"""
+    if inspect.isclass(obj):
+        names = set()
+        for member in vars(obj).values():
+            member = getattr(member, 'fget', None) or getattr(member, '__func__', None) or member
+            if inspect.isfunction(member):
+                names |= _referenced_names(member)
+        return names
+    codes = [obj.__code__] if hasattr(obj, '__code__') else []
+    names = set()
+    while codes:
+        code = codes.pop()
+        names.update(code.co_names)
+        codes.extend(c for c in code.co_consts if inspect.iscode(c))
+    return names
+
+
+def _module_closure(module, package, seen):
+    """Agrega a `seen` el módulo y, de forma transitiva, los módulos del paquete que importa"""
+    if module.__name__ in seen:
+        return
+    seen.add(module.__name__)
+    for value in list(vars(module).values()):
+        owner = value if inspect.ismodule(value) else sys.modules.get(getattr(value, '__module__', None) or '')
+        if owner is not None and owner.__name__.startswith(package + '.'):
+            _module_closure(owner, package, seen)
+
+
+def _is_literal(value):
+    """Constante cuyo repr es estable entre procesos (sin objetos con dirección de memoria)"""
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return True
+    if isinstance(value, (tuple, list)):
+        return all(_is_literal(v) for v in value)
+    if isinstance(value, dict):
+        return all(_is_literal(k) and _is_literal(v) for k, v in value.items())
+    return False
+
+
+def code_fingerprint(func):
+    """Hash del código de `func` y de todo el código del paquete que puede ejecutar
+
+    Las funciones, clases y constantes del mismo módulo que usa (directa o
+    indirectamente) entran por su código o valor; los demás módulos del paquete
+    de los que depende entran completos junto con los que ellos importan. Así,
+    cambiar una función auxiliar en otro módulo también cambia el hash.
+    """
+    home = func.__module__
+    package = home.rpartition('.')[0]
+    namespace = vars(sys.modules[home]) if home in sys.modules else getattr(func, '__globals__', {})
+    digest = hashlib.sha256()
+    visited, modules = set(), set()
+    pending = [func]
+    while pending:
+        obj = pending.pop()
+        digest.update(_source(obj).encode())
+        for name in sorted(_referenced_names(obj)):
+            if name not in namespace:
+                continue
+            value = namespace[name]
+            owner = value if inspect.ismodule(value) else sys.modules.get(getattr(value, '__module__', None) or '')
+            if owner is not None and owner.__name__ == home and (inspect.isfunction(value) or inspect.isclass(value)):
+                if name not in visited:
+                    visited.add(name)
+                    pending.append(value)
+            elif package and owner is not None and owner.__name__.startswith(package + '.'):
+                _module_closure(owner, package, modules)
+            elif _is_literal(value) and name not in visited:
+                visited.add(name)
+                digest.update(f'{name}={value!r}'.encode())
+    for name in sorted(modules):
+        digest.update(_source(sys.modules[name]).encode())
+    return digest.hexdigest()
+
+
+class Stage:
+    """Etapa del flujo: `func(**inputs, **params)` devuelve {salida: valor}
+
+    Los parámetros en `untracked` (p. ej. el número de procesos) no cambian el
+    resultado y no forman parte de la clave del checkpoint; los de `data_params`
+    son rutas a datos de entrada y su clave depende de los archivos. Las etapas
+    que además escriben archivos declaran `check(salidas)`, que dice si lo
+    escrito sigue en disco; si no, la etapa se ejecuta aunque tenga checkpoint.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=(), untracked=(), data_params=(),
+                 check=None):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.params = tuple(params)
+        self.untracked = tuple(untracked)
+        self.data_params = tuple(data_params)
+        self.check = check
+
+    def code_hash(self):
+        return code_fingerprint(self.func)
+
+
+def param_fingerprint(value, data=False):
+    """Representación estable de un parámetro para la clave de las etapas
+
+    Con `data=True` las rutas existentes se representan por nombre, tamaño y
+    fecha de modificación de sus archivos, de modo que cambiar los datos
+    invalida las etapas que los leen.
+    """
+    if data and value is not None and os.path.exists(value):
+        path = Path(value)
+        files = sorted(path.iterdir()) if path.is_dir() else [path]
+        return repr([(f.name, f.stat().st_size, f.stat().st_mtime_ns) for f in files if f.is_file()])
+    return repr(value)
+
+
+class CheckpointStore:
+    """Salidas de cada etapa guardadas con pickle como `<etapa>-<clave>.pkl`"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, stage, key):
+        return self.directory / f'{stage}-{key}.pkl'
+
+    def has(self, stage, key):
+        return self._path(stage, key).exists()
+
+    def load(self, stage, key):
+        with open(self._path(stage, key), 'rb') as f:
+            return pickle.load(f)
+
+    def save(self, stage, key, outputs):
+        """Escribe a un archivo temporal y lo renombra, para no dejar checkpoints a medias"""
+        path = self._path(stage, key)
+        tmp = path.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def prune(self, keys):
+        """Elimina los checkpoints anteriores de las etapas de `keys` ({etapa: clave vigente})"""
+        for path in self.directory.glob('*.pkl'):
+            stage, _, key = path.stem.rpartition('-')
+            if stage in keys and key != keys[stage]:
+                path.unlink()
+
+
+class Pipeline:
+    """Grafo de etapas que ejecuta solo lo necesario para las salidas pedidas
+
+    Las etapas sin dependencias pendientes entre sí se ejecutan a la vez en
+    un pool de hilos (`workers`). `last_run` guarda, por etapa, si se ejecutó o
+    se tomó del checkpoint y cuánto tardó. Al terminar se borran los checkpoints
+    anteriores de las etapas usadas, así el directorio no crece sin límite.
+    """
+
+    def __init__(self, stages, store=None, workers=None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(f"La salida '{output}' la producen dos etapas")
+                self.producers[output] = stage.name
+        self.store = store
+        self.workers = workers
+        self.last_run = None
+
+    def upstream(self, name):
+        """Etapas de las que depende directamente `name`"""
+        return sorted({self.producers[i] for i in self.stages[name].inputs if i in self.producers})
+
+    def required_stages(self, targets):
+        """Etapas necesarias para producir las salidas `targets`, en orden topológico"""
+        order = []
+        visiting = set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo en el flujo en la etapa '{name}'")
+            visiting.add(name)
+            for dependency in self.upstream(name):
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+
+        for target in targets:
+            if target not in self.producers:
+                raise KeyError(f"Ninguna etapa produce '{target}'")
+            visit(self.producers[target])
+        return order
+
+    def keys(self, params, stages=None):
+        """Clave de cada etapa a partir de su código, parámetros y claves de sus dependencias"""
+        keys = {}
+        for name in stages or self.required_stages(self.producers):
+            stage = self.stages[name]
+            digest = hashlib.sha256(name.encode())
+            digest.update(stage.code_hash().encode())
+            for param in (p for p in stage.params if p not in stage.untracked):
+                fingerprint = param_fingerprint(params.get(param), data=param in stage.data_params)
+                digest.update(f'{param}={fingerprint}'.encode())
+            for dependency in self.upstream(name):
+                digest.update(keys[dependency].encode())
+            keys[name] = digest.hexdigest()[:20]
+        return keys
+
+    def _execute(self, stage, values, params):
+        kwargs = {i: values[i] for i in stage.inputs}
+        kwargs.update({p: params.get(p) for p in stage.params})
+        start = time.perf_counter()
+        with section(f'stage:{stage.name}', 'stage'):
+            outputs = stage.func(**kwargs)
+        missing = set(stage.outputs) - set(outputs)
+        if missing:
+            raise ValueError(f"La etapa '{stage.name}' no devolvió {sorted(missing)}")
+        return outputs, time.perf_counter() - start
+
+    def run(self, targets=None, params=None, force=()):
+        """Produce las salidas `targets` (todas por defecto) y devuelve {salida: valor}
+
+        Las etapas en `force` se ejecutan aunque tengan checkpoint.
+        """
+        params = params or {}
+        targets = list(targets or self.producers)
+        order = self.required_stages(targets)
+        keys = self.keys(params, order)
+        cached = {n for n in order
+                  if self.store is not None and n not in force and self.store.has(n, keys[n])}
+        # Un checkpoint de una etapa con archivos solo vale si esos archivos siguen existiendo
+        for name in order:
+            check = self.stages[name].check
+            if name in cached and check is not None and not check(self.store.load(name, keys[name])):
+                cached.discard(name)
+        # Solo se ejecutan las etapas sin checkpoint; las cacheadas se leen si alguien las usa
+        pending = [n for n in order if n not in cached]
+        needed = {n for n in cached if n in {self.producers[t] for t in targets}}
+        for name in pending:
+            needed.update(d for d in self.upstream(name) if d in cached)
+
+        values = {}
+        report = {}
+        for name in order:
+            if name in needed:
+                start = time.perf_counter()
+                values.update(self.store.load(name, keys[name]))
+                report[name] = ('checkpoint', time.perf_counter() - start)
+            elif name in cached:
+                report[name] = ('checkpoint', 0.0)
+
+        done = set(cached)
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.workers or os.cpu_count() or 1) as pool:
+            while pending or running:
+                ready = [n for n in pending if set(self.upstream(n)) <= done]
+                for name in ready:
+                    pending.remove(name)
+                    running[pool.submit(self._execute, self.stages[name], values, params)] = name
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    outputs, seconds = future.result()
+                    values.update(outputs)
+                    if self.store is not None:
+                        self.store.save(name, keys[name], outputs)
+                    report[name] = ('ejecutada', seconds)
+                    done.add(name)
+        if self.store is not None:
+            self.store.prune(keys)
+
+        self.last_run = pd.DataFrame(
+            [(name, keys[name], *report[name]) for name in order],
+            columns=['stage', 'key', 'status', 'seconds']
+        ).set_index('stage')
+        return {t: values[t] for t in targets}
@@ -0,0 +1,204 @@
+"""Medición de tiempo y memoria por sección del análisis (carga, fechas, reglas, etapas, figuras)
+
+Las funciones del paquete marcan sus secciones con `section(nombre, categoría)`,
+que no hace nada si no hay un `Profiler` activo. Con un perfilador activo cada
+sección registra tiempo de reloj, tiempo de CPU del hilo, pico de memoria de
+Python (tracemalloc, opcional), RSS del proceso al cerrar y pico de RSS durante
+la sección (en Linux, reiniciando `VmHWM` al abrir cada sección). Con etapas en
+paralelo los picos incluyen lo asignado por otros hilos al mismo tiempo; para
+atribuir memoria con exactitud conviene ejecutar con un solo hilo.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_ACTIVE = None
+_LOCK = threading.Lock()
+
+PROFILE_COLUMNS = ['name', 'category', 'thread', 'depth', 'start', 'wall_s', 'cpu_s',
+                   'py_peak_mb', 'rss_mb', 'peak_rss_mb']
+
+
+def current_rss_mb():
+    """RSS actual del proceso en MB (None si el sistema no lo expone)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024**2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def reset_peak_rss():
+    """Reinicia el máximo RSS del proceso (VmHWM, solo Linux); False si no se puede"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Máximo RSS desde el último `reset_peak_rss` en MB (None fuera de Linux)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def max_rss_mb():
+    """Máximo RSS alcanzado por el proceso en MB (None si no hay `resource`)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+class Profiler:
+    """Registro de las secciones medidas mientras está activo (`with Profiler() as p:`)"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self._stack = []
+        self._origin = None
+        self._started_tracing = False
+        self._track_rss = False
+
+    def __enter__(self):
+        global _ACTIVE
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._track_rss = reset_peak_rss()
+        self._origin = time.perf_counter()
+        _ACTIVE = self
+        return self
+
+    def __exit__(self, *exc):
+        global _ACTIVE
+        _ACTIVE = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+
+    def _open(self):
+        """Estado inicial de una sección; pliega el pico actual en las secciones abiertas"""
+        thread = threading.get_ident()
+        frame = {'wall': time.perf_counter(), 'cpu': time.thread_time(), 'thread': thread, 'base': 0, 'peak': 0,
+                 'rss_peak': 0.0}
+        with _LOCK:
+            frame['depth'] = sum(1 for f in self._stack if f['thread'] == thread)
+            if self._track_rss:
+                # El pico de RSS es del proceso: se pliega en las secciones abiertas antes de reiniciarlo
+                hwm = peak_rss_mb() or 0.0
+                for parent in self._stack:
+                    parent['rss_peak'] = max(parent['rss_peak'], hwm)
+                reset_peak_rss()
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                for parent in self._stack:
+                    parent['peak'] = max(parent['peak'], peak)
+                tracemalloc.reset_peak()
+                frame['base'] = frame['peak'] = current
+            self._stack.append(frame)
+        return frame
+
+    def _close(self, frame, name, category):
+        wall = time.perf_counter() - frame['wall']
+        cpu = time.thread_time() - frame['cpu']
+        py_peak = rss_peak = None
+        with _LOCK:
+            self._stack.remove(frame)
+            if self._track_rss:
+                rss_peak = max(frame['rss_peak'], peak_rss_mb() or 0.0)
+                for parent in self._stack:
+                    parent['rss_peak'] = max(parent['rss_peak'], rss_peak)
+            if self.trace_memory:
+                _, peak = tracemalloc.get_traced_memory()
+                frame['peak'] = max(frame['peak'], peak)
+                for parent in self._stack:
+                    parent['peak'] = max(parent['peak'], frame['peak'])
+                py_peak = (frame['peak'] - frame['base']) / 1024**2
+            self.records.append({
+                'name': name, 'category': category, 'thread': frame['thread'], 'depth': frame['depth'],
+                'start': frame['wall'] - self._origin, 'wall_s': wall, 'cpu_s': cpu,
+                'py_peak_mb': py_peak, 'rss_mb': current_rss_mb(), 'peak_rss_mb': rss_peak
+            })
+
+    def record(self, name, category, wall_s, cpu_s=None):
+        """Registra una sección medida fuera del proceso (p. ej. una figura en otro proceso)"""
+        with _LOCK:
+            self.records.append({
+                'name': name, 'category': category, 'thread': None, 'depth': 0,
+                'start': None, 'wall_s': wall_s, 'cpu_s': cpu_s,
+                'py_peak_mb': None, 'rss_mb': None, 'peak_rss_mb': None
+            })
+
+    def table(self):
+        """Una fila por sección medida, en orden de inicio"""
+        table = pd.DataFrame(self.records, columns=PROFILE_COLUMNS)
+        return table.sort_values('start', kind='stable', na_position='last', ignore_index=True)
+
+    def summary(self):
+        """Por categoría: secciones, tiempo total y máximo, CPU y picos de memoria"""
+        return self.table().groupby('category', sort=False).agg(
+            sections=('name', 'size'),
+            wall_s=('wall_s', 'sum'),
+            max_wall_s=('wall_s', 'max'),
+            cpu_s=('cpu_s', 'sum'),
+            py_peak_mb=('py_peak_mb', 'max'),
+            peak_rss_mb=('peak_rss_mb', 'max')
+        ).sort_values('wall_s', ascending=False)
+
+    def to_json(self, path):
+        """Perfil completo en JSON (metadatos de la ejecución y secciones)"""
+        table = self.table()
+        payload = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'trace_memory': self.trace_memory,
+            'max_rss_mb': max_rss_mb(),
+            'sections': json.loads(table.to_json(orient='records'))
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, indent=2)
+
+    def to_csv(self, path):
+        self.table().to_csv(path, index=False)
+
+
+@contextmanager
+def section(name, category):
+    """Mide el bloque si hay un `Profiler` activo; si no, no hace nada"""
+    profiler = _ACTIVE
+    if profiler is None:
+        yield
+        return
+    frame = profiler._open()
+    try:
+        yield
+    finally:
+        profiler._close(frame, name, category)
+
+
+def record(name, category, wall_s, cpu_s=None):
+    """Registra una medición externa en el `Profiler` activo, si lo hay"""
+    if _ACTIVE is not None:
+        _ACTIVE.record(name, category, wall_s, cpu_s)
@@ -0,0 +1,169 @@
+"""Carga, corrección de tipos, validación y perfil de calidad de las tablas de Olist"""
+from pathlib import Path
+
+import pandas as pd
+
+from .facts import parse_order_dates
+from .profiling import section
+
+OLIST_FILES = {
+    'customers': 'olist_customers_dataset.csv',
+    'orders': 'olist_orders_dataset.csv',
+    'order_items': 'olist_order_items_dataset.csv',
+    'products': 'olist_products_dataset.csv',
+    'sellers': 'olist_sellers_dataset.csv',
+    'order_payments': 'olist_order_payments_dataset.csv',
+    'order_reviews': 'olist_order_reviews_dataset.csv',
+    'geolocation': 'olist_geolocation_dataset.csv'
+}
+
+VALIDATION_RULES = {}
+
+
+def load_tables(data_path, tables=None):
+    """Lee los CSV de Olist presentes en `data_path` (todas las tablas o solo `tables`)"""
+    data_path = Path(data_path)
+    datasets = {}
+    for name in (tables or OLIST_FILES):
+        path = data_path / OLIST_FILES[name]
+        if path.exists():
+            with section(f'load:{name}', 'load'):
+                datasets[name] = pd.read_csv(path)
+    return datasets
+
+
+def fix_types(datasets):
+    """Copia de las tablas con las fechas de las órdenes convertidas a datetime"""
+    datasets = dict(datasets)
+    if 'orders' in datasets:
+        datasets['orders'] = parse_order_dates(datasets['orders'])
+    return datasets
+
+
+def register_rule(kind, problem, tables):
+    """Registra `check(datasets)` como regla de validación
+
+    La regla devuelve `(casos, total)` o `(casos, total, detalle)` y solo se
+    evalúa si están todas las `tables`.
+    """
+    def decorator(check):
+        VALIDATION_RULES[check.__name__.lstrip('_')] = {
+            'kind': kind, 'problem': problem, 'tables': tuple(tables), 'check': check
+        }
+        return check
+    return decorator
+
+
+def _orphans(child, parent, key):
+    return int((~child[key].isin(parent[key])).sum()), len(child)
+
+
+@register_rule('Integridad Referencial', 'order_items con order_id huérfanos', ['order_items', 'orders'])
+def _orphan_items(datasets):
+    return _orphans(datasets['order_items'], datasets['orders'], 'order_id')
+
+
+@register_rule('Integridad Referencial', 'order_payments con order_id huérfanos', ['order_payments', 'orders'])
+def _orphan_payments(datasets):
+    return _orphans(datasets['order_payments'], datasets['orders'], 'order_id')
+
+
+@register_rule('Integridad Referencial', 'order_reviews con order_id huérfanos', ['order_reviews', 'orders'])
+def _orphan_reviews(datasets):
+    return _orphans(datasets['order_reviews'], datasets['orders'], 'order_id')
+
+
+@register_rule('Integridad Referencial', 'order_items con product_id huérfanos', ['order_items', 'products'])
+def _orphan_products(datasets):
+    return _orphans(datasets['order_items'], datasets['products'], 'product_id')
+
+
+@register_rule('Inconsistencia Temporal', 'Entregas antes de la fecha de compra', ['orders'])
+def _delivered_before_purchase(datasets):
+    orders = parse_order_dates(datasets['orders'])
+    invalid = orders['order_delivered_customer_date'] < orders['order_purchase_timestamp']
+    return int(invalid.sum()), len(orders)
+
+
+@register_rule('Inconsistencia Temporal', 'Aprobaciones después de entrega', ['orders'])
+def _approved_after_delivery(datasets):
+    orders = parse_order_dates(datasets['orders'])
+    invalid = orders['order_approved_at'] > orders['order_delivered_customer_date']
+    return int(invalid.sum()), len(orders)
+
+
+@register_rule('Consistencia de Valores', 'payment_value no coincide con price + freight_value',
+               ['order_items', 'order_payments'])
+def _payment_mismatch(datasets):
+    items = datasets['order_items']
+    expected = (items['price'] + items['freight_value']).groupby(items['order_id']).sum()
+    paid = datasets['order_payments'].groupby('order_id')['payment_value'].sum()
+    expected, paid = expected.align(paid, join='inner')
+    difference = (paid - expected).abs()
+    # Tolerancia de 0.01 para diferencias de redondeo
+    inconsistent = difference[difference > 0.01]
+    detail = (f"Diferencia promedio: R$ {inconsistent.mean():.2f}; máxima: R$ {inconsistent.max():.2f}"
+              if len(inconsistent) else '')
+    return len(inconsistent), len(difference), detail
+
+
+@register_rule('Rango Inválido', 'review_score fuera del rango 1-5', ['order_reviews'])
+def _review_score_range(datasets):
+    scores = datasets['order_reviews']['review_score']
+    return int(((scores < 1) | (scores > 5)).sum()), len(scores)
+
+
+@register_rule('Valor Inválido', 'Precios negativos o cero', ['order_items'])
+def _non_positive_prices(datasets):
+    prices = datasets['order_items']['price']
+    return int((prices <= 0).sum()), len(prices)
+
+
+@register_rule('Completitud', 'Órdenes sin items', ['orders', 'order_items'])
+def _orders_without_items(datasets):
+    return _orphans(datasets['orders'], datasets['order_items'], 'order_id')
+
+
+@register_rule('Completitud', 'Órdenes sin pagos', ['orders', 'order_payments'])
+def _orders_without_payments(datasets):
+    return _orphans(datasets['orders'], datasets['order_payments'], 'order_id')
+
+
+def run_rule(name, datasets):
+    """Resultado de una regla como fila de la tabla de validación"""
+    rule = VALIDATION_RULES[name]
+    with section(f'rule:{name}', 'validation'):
+        count, total, *detail = rule['check'](datasets)
+    return {
+        'Regla': name,
+        'Tipo': rule['kind'],
+        'Problema': rule['problem'],
+        'Cantidad': count,
+        'Porcentaje': count / total * 100 if total else 0.0,
+        'Detalle': detail[0] if detail else ''
+    }
+
+
+def validate(datasets, rules=None):
+    """Evalúa las reglas de validación aplicables; una fila por regla (con o sin casos)"""
+    names = [n for n in (rules or VALIDATION_RULES)
+             if all(t in datasets for t in VALIDATION_RULES[n]['tables'])]
+    rows = [run_rule(name, datasets) for name in names]
+    return pd.DataFrame(rows, columns=['Regla', 'Tipo', 'Problema', 'Cantidad', 'Porcentaje', 'Detalle'])
+
+
+def profile_table(df):
+    """Filas, columnas, faltantes, duplicados y memoria de una tabla"""
+    return {
+        'Filas': len(df),
+        'Columnas': len(df.columns),
+        'Valores Faltantes': int(df.isnull().sum().sum()),
+        'Duplicados': int(df.duplicated().sum()),
+        'Memoria (MB)': df.memory_usage(deep=True).sum() / 1024**2
+    }
+
+
+def profile(datasets):
+    """Resumen de calidad con una fila por tabla"""
+    rows = [{'Tabla': name, **profile_table(df)} for name, df in datasets.items()]
+    return pd.DataFrame(rows, columns=['Tabla', 'Filas', 'Columnas', 'Valores Faltantes', 'Duplicados', 'Memoria (MB)'])
@@ -0,0 +1,103 @@
+"""Selección top-k por selección parcial en lugar de ordenar todo el agregado"""
+import heapq
+
+import numpy as np
+import pandas as pd
+
+
+def top_k_indices(values, k, largest=True, keep='first'):
+    """Posiciones de los k valores mayores (o menores), ya ordenadas
+
+    Usa `argpartition` para encontrar el k-ésimo valor y solo ordena los
+    candidatos que lo alcanzan. Con `keep='first'` los empates se resuelven
+    por posición; con `keep='all'` se incluyen todos los empatados con el
+    k-ésimo valor. Los NaN nunca se seleccionan.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(values))
+    if k <= 0 or len(valid) == 0:
+        return np.array([], dtype=np.int64)
+    scores = values[valid] if largest else -values[valid]
+    if k < len(valid):
+        kth = scores[np.argpartition(-scores, k - 1)[k - 1]]
+        candidates = np.flatnonzero(scores >= kth)
+    else:
+        candidates = np.arange(len(valid))
+    # Orden descendente por puntaje y ascendente por posición ante empates
+    candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+    if keep == 'first':
+        candidates = candidates[:k]
+    elif keep != 'all':
+        raise ValueError(f"keep no soportado: {keep}")
+    return valid[candidates]
+
+
+def top_k(series, k, largest=True, keep='first'):
+    """Equivalente a `series.sort_values(ascending=not largest).head(k)`"""
+    return series.iloc[top_k_indices(series.to_numpy(), k, largest=largest, keep=keep)]
+
+
+def top_k_frame(df, by, k, largest=True, keep='first'):
+    """Equivalente a `df.sort_values(by, ascending=not largest).head(k)`"""
+    return df.iloc[top_k_indices(df[by].to_numpy(), k, largest=largest, keep=keep)]
+
+
+def top_counts(values, k):
+    """Equivalente a `values.value_counts().head(k)` sin ordenar todos los conteos"""
+    counts = pd.Series(values).value_counts(sort=False)
+    return top_k(counts, k)
+
+
+def top_k_per_group(df, group, by, k, largest=True):
+    """Top-k filas de `df` por `by` dentro de cada valor de `group`
+
+    Ordena una sola vez por (grupo, valor) y toma las primeras k posiciones de
+    cada bloque; las filas con grupo o valor nulo se descartan.
+    """
+    codes, uniques = pd.factorize(df[group], sort=True)
+    values = df[by].to_numpy(dtype=np.float64)
+    scores = -values if largest else values
+    valid = np.flatnonzero((codes >= 0) & ~np.isnan(values))
+    order = valid[np.lexsort((valid, scores[valid], codes[valid]))]
+    sorted_codes = codes[order]
+    starts = np.searchsorted(sorted_codes, np.arange(len(uniques)))
+    rank = np.arange(len(order)) - starts[sorted_codes]
+    return df.iloc[order[rank < k]]
+
+
+class StreamingTopK:
+    """Top-k sobre un flujo de lotes con un heap acotado a k elementos
+
+    Para agregados que no caben en memoria o que llegan por partes: cada
+    `push` cuesta O(log k) y el resultado final se ordena al pedirlo.
+    """
+
+    def __init__(self, k, largest=True):
+        self.k = k
+        self.largest = largest
+        self._heap = []
+        self._seen = 0
+
+    def push(self, key, value):
+        """Agrega un elemento (clave, valor); conserva solo los k mejores"""
+        if value is None or value != value:
+            return
+        score = value if self.largest else -value
+        # El contador desempata a favor del primero visto
+        entry = (score, -self._seen, key, value)
+        self._seen += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def update(self, series):
+        """Agrega un lote (Series índice → valor) prefiltrando con argpartition"""
+        series = top_k(series, self.k, largest=self.largest, keep='all')
+        for key, value in series.items():
+            self.push(key, value)
+
+    def result(self):
+        """Series ordenada con los k mejores elementos vistos"""
+        entries = sorted(self._heap, reverse=True)
+        return pd.Series([e[3] for e in entries], index=[e[2] for e in entries], dtype=np.float64)
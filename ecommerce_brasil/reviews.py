@@ -0,0 +1,96 @@
+"""Ciclo de vida de las reviews: entrega → review → respuesta"""
+import numpy as np
+import pandas as pd
+
+from .delivery import MISSING, duration_hours, stage_table
+from .facts import parse_order_dates
+
+REVIEW_DATE_COLUMNS = ['review_creation_date', 'review_answer_timestamp']
+
+# Etapa -> (fecha de inicio, fecha de fin)
+REVIEW_STAGES = {
+    'purchase_to_review': ('order_purchase_timestamp', 'review_creation_date'),
+    'delivery_to_review': ('order_delivered_customer_date', 'review_creation_date'),
+    'review_to_answer': ('review_creation_date', 'review_answer_timestamp')
+}
+
+REVIEW_STAGE_LABELS = {
+    'purchase_to_review': 'Compra → Review',
+    'delivery_to_review': 'Entrega → Review',
+    'review_to_answer': 'Review → Respuesta'
+}
+
+
+class ReviewLifecycle:
+    """Tiempos entre compra, entrega, creación y respuesta de cada review
+
+    Las fechas de reviews se parsean una sola vez y se unen por `order_id` con
+    las fechas de la orden; cada etapa queda como arreglo int64 en horas.
+    """
+
+    def __init__(self, reviews):
+        self.reviews = reviews.reset_index(drop=True)
+        self.hours = {stage: duration_hours(self.reviews[start], self.reviews[end])
+                      for stage, (start, end) in REVIEW_STAGES.items()}
+
+    @classmethod
+    def from_datasets(cls, datasets):
+        """Reviews con fechas de la orden y estado del cliente"""
+        reviews = datasets['order_reviews'].copy()
+        for col in REVIEW_DATE_COLUMNS:
+            if not pd.api.types.is_datetime64_any_dtype(reviews[col]):
+                reviews[col] = pd.to_datetime(reviews[col], errors='coerce')
+
+        orders = parse_order_dates(datasets['orders'])
+        lookup = orders.set_index('order_id')
+        for col in ['order_purchase_timestamp', 'order_delivered_customer_date', 'order_estimated_delivery_date']:
+            reviews[col] = reviews['order_id'].map(lookup[col])
+        customers = datasets.get('customers')
+        if customers is not None:
+            customer_state = customers.set_index('customer_id')['customer_state']
+            reviews['customer_state'] = reviews['order_id'].map(lookup['customer_id'].map(customer_state))
+
+        delivered = reviews['order_delivered_customer_date']
+        reviews['undelivered'] = delivered.isna()
+        # Solo entre órdenes entregadas; NaT compara como False
+        reviews['before_delivery'] = reviews['review_creation_date'] < delivered.dt.normalize()
+        reviews['answered'] = reviews['review_answer_timestamp'].notna()
+        return cls(reviews)
+
+    def stage_days(self, stage):
+        """Duración de una etapa en días (float, NaN si falta alguna fecha)"""
+        hours = self.hours[stage]
+        days = np.where(hours == MISSING, np.nan, hours / 24.0)
+        return pd.Series(days, index=self.reviews['review_id'], name=stage)
+
+    def summary(self, by=None, stages=tuple(REVIEW_STAGES), quantiles=(50, 90), min_count=1):
+        """Reviews, proporción respondida, sin entrega o previa a la entrega, y tiempos por grupo
+
+        Devuelve una fila por grupo con `reviews`, `answered_rate`,
+        `undelivered_rate` (sobre todas las reviews), `before_delivery_rate`
+        (solo sobre las de órdenes entregadas) y, por etapa, `<etapa>_n`,
+        `<etapa>_mean` y `<etapa>_p<q>` en días.
+        """
+        if by is None:
+            codes = np.zeros(len(self.reviews), dtype=np.int64)
+            labels = pd.Index(['total'])
+        else:
+            codes, labels = pd.factorize(self.reviews[by], sort=True)
+        n_groups = len(labels)
+        valid = codes >= 0
+
+        table = stage_table(codes, labels, {stage: self.hours[stage] for stage in stages}, quantiles, by)
+        counts = np.bincount(codes[valid], minlength=n_groups)
+
+        def flag_count(flag):
+            return np.bincount(codes[valid], weights=self.reviews[flag].to_numpy()[valid], minlength=n_groups)
+
+        delivered = counts - flag_count('undelivered')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table.insert(0, 'before_delivery_rate', flag_count('before_delivery') / delivered)
+            table.insert(0, 'undelivered_rate', flag_count('undelivered') / counts)
+            table.insert(0, 'answered_rate', flag_count('answered') / counts)
+        table.insert(0, 'reviews', counts)
+        if min_count > 1:
+            table = table[table['reviews'] >= min_count]
+        return table
@@ -0,0 +1,122 @@
+"""Scorecard de vendedores: ventas, entregas, cancelaciones y reviews"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .facts import build_order_facts
+
+PARTIAL_COLUMNS = [
+    'items',
+    'revenue',
+    'freight',
+    'orders',
+    'canceled_orders',
+    'delivered_orders',
+    'delivery_days_sum',
+    'delay_days_sum',
+    'late_orders',
+    'reviewed_orders',
+    'review_score_sum'
+]
+
+
+def scorecard_inputs(datasets, order_facts=None):
+    """Items con los atributos de su orden necesarios para el scorecard"""
+    if order_facts is None:
+        order_facts = build_order_facts(datasets)
+    order_attrs = order_facts.set_index('order_id')[
+        ['order_status', 'delivery_days', 'delay_days', 'review_score']
+    ]
+    items = datasets['order_items'][['order_id', 'seller_id', 'price', 'freight_value']]
+    return items.join(order_attrs, on='order_id')
+
+
+def partial_scorecard(items):
+    """Sumas y conteos por vendedor de un lote de items (resultado acumulable)
+
+    Las métricas por orden se calculan sobre los pares (vendedor, orden)
+    únicos, así una orden con varios items del mismo vendedor cuenta una vez.
+    """
+    seller_codes, sellers = pd.factorize(items['seller_id'])
+    order_codes, _ = pd.factorize(items['order_id'])
+    n = len(sellers)
+
+    partial = pd.DataFrame(index=pd.Index(sellers, name='seller_id'))
+    partial['items'] = np.bincount(seller_codes, minlength=n)
+    partial['revenue'] = np.bincount(seller_codes, weights=items['price'].to_numpy(dtype=np.float64), minlength=n)
+    partial['freight'] = np.bincount(seller_codes, weights=items['freight_value'].to_numpy(dtype=np.float64), minlength=n)
+
+    # Un representante por par (vendedor, orden)
+    pair = seller_codes.astype(np.int64) * (int(order_codes.max()) + 1 if len(order_codes) else 1) + order_codes
+    _, first = np.unique(pair, return_index=True)
+    seller = seller_codes[first]
+    status = items['order_status'].to_numpy()[first]
+    delivery = items['delivery_days'].to_numpy(dtype=np.float64)[first]
+    delay = items['delay_days'].to_numpy(dtype=np.float64)[first]
+    score = items['review_score'].to_numpy(dtype=np.float64, na_value=np.nan)[first]
+    delivered = ~np.isnan(delay) & ~np.isnan(delivery)
+    reviewed = ~np.isnan(score)
+
+    partial['orders'] = np.bincount(seller, minlength=n)
+    partial['canceled_orders'] = np.bincount(seller, weights=(status == 'canceled'), minlength=n)
+    partial['delivered_orders'] = np.bincount(seller, weights=delivered, minlength=n)
+    partial['delivery_days_sum'] = np.bincount(seller, weights=np.where(delivered, delivery, 0.0), minlength=n)
+    partial['delay_days_sum'] = np.bincount(seller, weights=np.where(delivered, delay, 0.0), minlength=n)
+    partial['late_orders'] = np.bincount(seller, weights=delivered & (delay > 0), minlength=n)
+    partial['reviewed_orders'] = np.bincount(seller, weights=reviewed, minlength=n)
+    partial['review_score_sum'] = np.bincount(seller, weights=np.where(reviewed, score, 0.0), minlength=n)
+    return partial[PARTIAL_COLUMNS]
+
+
+def merge_partials(partials):
+    """Combina resultados parciales sumando por vendedor"""
+    partials = [p for p in partials if len(p) > 0]
+    if not partials:
+        return pd.DataFrame(columns=PARTIAL_COLUMNS, index=pd.Index([], name='seller_id'))
+    return pd.concat(partials).groupby(level=0).sum()
+
+
+def finalize_scorecard(totals):
+    """Convierte las sumas acumuladas en métricas por vendedor"""
+    scorecard = totals.copy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scorecard['cancellation_rate'] = totals['canceled_orders'] / totals['orders']
+        scorecard['late_rate'] = totals['late_orders'] / totals['delivered_orders']
+        scorecard['avg_delivery_days'] = totals['delivery_days_sum'] / totals['delivered_orders']
+        scorecard['avg_delay_days'] = totals['delay_days_sum'] / totals['delivered_orders']
+        scorecard['avg_review_score'] = totals['review_score_sum'] / totals['reviewed_orders']
+    return scorecard.drop(columns=['delivery_days_sum', 'delay_days_sum', 'review_score_sum'])
+
+
+def seller_partitions(items, n_partitions):
+    """Divide los items por hash de seller_id (cada vendedor en una sola partición)"""
+    bucket = pd.util.hash_array(items['seller_id'].to_numpy(dtype=object)) % n_partitions
+    return [items[bucket == p] for p in range(n_partitions)]
+
+
+def seller_scorecard(datasets, workers=None, n_partitions=None, order_facts=None):
+    """Scorecard completo por vendedor, calculado en paralelo por particiones
+
+    Con `workers=1` todo se calcula en el proceso actual. El resultado incluye
+    `seller_state` si la tabla de vendedores está disponible.
+    """
+    items = scorecard_inputs(datasets, order_facts=order_facts)
+    workers = workers or os.cpu_count() or 1
+    n_partitions = n_partitions or workers
+    partitions = seller_partitions(items, n_partitions)
+
+    if workers == 1 or n_partitions == 1:
+        partials = [partial_scorecard(p) for p in partitions]
+    else:
+        # spawn: el flujo ejecuta etapas en hilos y un fork con otros hilos activos puede bloquearse
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            partials = list(pool.map(partial_scorecard, partitions))
+
+    scorecard = finalize_scorecard(merge_partials(partials))
+    sellers = datasets.get('sellers')
+    if sellers is not None:
+        scorecard = scorecard.join(sellers.set_index('seller_id')['seller_state'])
+    return scorecard
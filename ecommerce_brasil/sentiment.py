@@ -0,0 +1,136 @@
+"""Puntaje de sentimiento por léxico para comentarios de reviews en portugués"""
+import numpy as np
+import pandas as pd
+
+from .text import fold_text
+
+# Pesos por palabra ya sin acentos (positivo > 0, negativo < 0)
+PORTUGUESE_LEXICON = {
+    # Positivas
+    'otimo': 2.0, 'otima': 2.0, 'excelente': 2.0, 'perfeito': 2.0, 'perfeita': 2.0,
+    'maravilhoso': 2.0, 'maravilhosa': 2.0, 'adorei': 2.0, 'amei': 2.0, 'recomendo': 1.5,
+    'bom': 1.0, 'boa': 1.0, 'bons': 1.0, 'boas': 1.0, 'gostei': 1.5, 'satisfeito': 1.5,
+    'satisfeita': 1.5, 'rapido': 1.0, 'rapida': 1.0, 'rapidez': 1.0, 'lindo': 1.5, 'linda': 1.5,
+    'bonito': 1.0, 'bonita': 1.0, 'qualidade': 0.5, 'correto': 0.5, 'certinho': 1.0,
+    'antes': 0.5, 'parabens': 2.0, 'obrigado': 1.0, 'obrigada': 1.0, 'eficiente': 1.5,
+    'confiavel': 1.5, 'top': 1.5, 'show': 1.5, 'super': 1.0, 'feliz': 1.5, 'conforme': 0.5,
+    # Negativas
+    'pessimo': -2.0, 'pessima': -2.0, 'horrivel': -2.0, 'ruim': -1.5, 'defeito': -1.5,
+    'defeituoso': -1.5, 'quebrado': -2.0, 'quebrada': -2.0, 'danificado': -2.0, 'atraso': -1.5,
+    'atrasado': -1.5, 'atrasou': -1.5, 'demora': -1.0, 'demorou': -1.0, 'errado': -1.5,
+    'errada': -1.5, 'faltando': -1.5, 'falta': -1.0, 'diferente': -1.0, 'problema': -1.5,
+    'reclamacao': -1.5, 'decepcionado': -2.0, 'decepcionada': -2.0, 'decepcao': -2.0,
+    'insatisfeito': -2.0, 'insatisfeita': -2.0, 'lamentavel': -2.0, 'enganosa': -2.0,
+    'devolver': -1.5, 'devolucao': -1.5, 'reembolso': -1.5, 'cancelar': -1.0, 'cancelamento': -1.0,
+    'fraco': -1.0, 'fragil': -1.0, 'nunca': -1.0, 'absurdo': -2.0, 'descaso': -2.0,
+    # Neutras, pero negativas cuando se niegan (ver NEGATED_NEUTRAL_WEIGHT)
+    'recebi': 0.0, 'chegou': 0.0, 'entregue': 0.0
+}
+
+# Invierten el signo de las dos palabras siguientes ("nao recebi", "nao gostei")
+NEGATORS = frozenset(['nao', 'nem', 'jamais', 'sem'])
+NEGATION_WINDOW = 2
+
+# "nao recebi" / "nao chegou" son quejas aunque las palabras sean neutras
+NEGATED_NEUTRAL_WEIGHT = -1.5
+
+# Normalización estilo VADER: s / sqrt(s² + alpha) queda en (-1, 1)
+ALPHA = 15.0
+
+SENTIMENT_LABELS = ['negativo', 'neutro', 'positivo']
+
+
+def comment_hashes(texts):
+    """Hash uint64 del texto de cada comentario (clave de la caché)"""
+    return pd.util.hash_array(pd.Series(texts, dtype=object).fillna('').to_numpy(dtype=object))
+
+
+def lexicon_scores(texts, lexicon=PORTUGUESE_LEXICON):
+    """Puntaje en (-1, 1) de cada texto con búsquedas vectorizadas en el léxico
+
+    Los textos se pliegan, se separan en palabras y se expanden a una fila por
+    palabra; el peso se obtiene con un `map` sobre el léxico y la negación se
+    resuelve desplazando la columna de negadores dentro de cada texto.
+    """
+    texts = pd.Series(texts, dtype=object).reset_index(drop=True)
+    tokens = fold_text(texts.fillna('')).str.findall(r'[a-z]+').explode().dropna()
+    if len(tokens) == 0:
+        return np.zeros(len(texts))
+    doc = tokens.index.to_numpy()
+    words = tokens.to_numpy(dtype=object)
+    weights = pd.Series(words).map(lexicon).to_numpy(dtype=np.float64)
+
+    is_negator = pd.Series(words).isin(NEGATORS).to_numpy()
+    negated = np.zeros(len(words), dtype=bool)
+    for lag in range(1, NEGATION_WINDOW + 1):
+        previous = np.r_[np.zeros(lag, dtype=bool), is_negator[:-lag]]
+        same_doc = np.r_[np.zeros(lag, dtype=bool), doc[lag:] == doc[:-lag]]
+        negated |= previous & same_doc
+
+    weights = np.where(negated, -weights, weights)
+    weights = np.where(negated & (weights == 0), NEGATED_NEUTRAL_WEIGHT, weights)
+    weights = np.nan_to_num(weights)
+    total = np.bincount(doc, weights=weights, minlength=len(texts))
+    return total / np.sqrt(total ** 2 + ALPHA)
+
+
+class SentimentCache:
+    """Puntajes ya calculados indexados por hash del comentario
+
+    Solo se puntúan los comentarios cuyo hash no está en la caché; la caché se
+    puede guardar entre ejecuciones con `save` / `load`.
+    """
+
+    def __init__(self):
+        self.scores = pd.Series(dtype=np.float64, index=pd.Index([], dtype=np.uint64))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def score(self, texts, batch_size=100_000):
+        """Puntaje de cada texto, calculando solo los comentarios nuevos por lotes"""
+        texts = pd.Series(texts, dtype=object).reset_index(drop=True)
+        hashes = comment_hashes(texts)
+        missing = ~pd.Index(hashes).isin(self.scores.index)
+        if missing.any():
+            new_hashes, first = np.unique(hashes[missing], return_index=True)
+            new_texts = texts[missing].iloc[first]
+            new_scores = np.concatenate([
+                lexicon_scores(new_texts.iloc[i:i + batch_size])
+                for i in range(0, len(new_texts), batch_size)
+            ])
+            self.scores = pd.concat([self.scores, pd.Series(new_scores, index=new_hashes)])
+        return self.scores.reindex(hashes).to_numpy()
+
+    def save(self, path):
+        """Guarda la caché en un archivo .npz"""
+        np.savez_compressed(path, hashes=self.scores.index.to_numpy(dtype=np.uint64),
+                            scores=self.scores.to_numpy())
+
+    @classmethod
+    def load(cls, path):
+        """Carga una caché guardada con `save`"""
+        data = np.load(path)
+        cache = cls()
+        cache.scores = pd.Series(data['scores'], index=pd.Index(data['hashes']))
+        return cache
+
+
+def attach_sentiment(order_reviews, cache=None, column='review_comment_message', neutral=0.2):
+    """Copia de order_reviews con `sentiment` (-1 a 1) y `sentiment_label`
+
+    Título y comentario se puntúan juntos; las reviews sin texto quedan con
+    NaN y sin etiqueta. `|sentiment| < neutral` se etiqueta como neutro.
+    """
+    cache = cache if cache is not None else SentimentCache()
+    text_columns = [c for c in ['review_comment_title', column] if c in order_reviews.columns]
+    texts = order_reviews[text_columns].fillna('').agg(' '.join, axis=1).str.strip()
+    has_text = (texts.str.len() > 0).to_numpy()
+
+    sentiment = np.full(len(order_reviews), np.nan)
+    sentiment[has_text] = cache.score(texts[has_text])
+    labels = np.select([sentiment <= -neutral, sentiment >= neutral], SENTIMENT_LABELS[::2], default='neutro')
+    return order_reviews.assign(
+        sentiment=sentiment,
+        sentiment_label=pd.Series(np.where(has_text, labels, None), index=order_reviews.index)
+    )
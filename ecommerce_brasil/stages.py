@@ -0,0 +1,147 @@
+"""Etapas del análisis de Olist: carga, tipos, validación, perfil, hechos, agregados y figuras
+
+Las etapas de agregados están separadas por sección (KPIs, vendedores,
+clientes, cohortes, entregas) para que pedir una sola tabla no calcule las
+demás. Las que necesitan tablas ausentes devuelven None.
+"""
+import os
+
+from .cohorts import CohortMatrix
+from .customers import CustomerBase
+from .delivery import DeliveryTimes
+from .facts import build_order_facts
+from .figures import FigureCache, build_figure_inputs, render_figures
+from .kpis import KPIStore
+from .pipeline import CheckpointStore, Pipeline, Stage
+from .quality import OLIST_FILES, fix_types, load_tables, profile, validate
+from .sellers import seller_scorecard
+
+
+def _has(datasets, *tables):
+    return all(t in datasets for t in tables)
+
+
+def load_stage(data_path, tables):
+    return {'raw': load_tables(data_path, tables=tables)}
+
+
+def type_fix_stage(raw):
+    return {'datasets': fix_types(raw)}
+
+
+def validate_stage(datasets):
+    return {'validation': validate(datasets)}
+
+
+def profile_stage(datasets):
+    return {'profile': profile(datasets)}
+
+
+def facts_stage(datasets):
+    if not _has(datasets, 'orders'):
+        return {'order_facts': None}
+    return {'order_facts': build_order_facts(datasets)}
+
+
+def kpis_stage(datasets):
+    store = KPIStore(datasets)
+    return {'kpis': store.table(), 'kpi_versions': dict(store.versions)}
+
+
+def sellers_stage(datasets, order_facts, workers):
+    if order_facts is None or not _has(datasets, 'order_items'):
+        return {'seller_scorecard': None}
+    return {'seller_scorecard': seller_scorecard(datasets, workers=workers, order_facts=order_facts)}
+
+
+def customers_stage(datasets):
+    if not _has(datasets, 'orders', 'customers'):
+        return {'customer_segments': None, 'customer_rfm': None}
+    base = CustomerBase.from_datasets(datasets)
+    return {'customer_segments': base.segment_summary(), 'customer_rfm': base.rfm()}
+
+
+def cohorts_stage(datasets):
+    if not _has(datasets, 'orders', 'customers'):
+        return {'cohort_retention': None}
+    return {'cohort_retention': CohortMatrix.from_datasets(datasets).retention()}
+
+
+def deliveries_stage(datasets):
+    if not _has(datasets, 'orders'):
+        return {'delivery_stages': None, 'delivery_by_state': None}
+    times = DeliveryTimes.from_datasets(datasets)
+    by_state = times.percentiles(by='customer_state', quantiles=(50, 90, 99)) if _has(datasets, 'customers') else None
+    return {'delivery_stages': times.stage_summary(), 'delivery_by_state': by_state}
+
+
+def figure_inputs_stage(datasets, order_facts):
+    if order_facts is None:
+        return {'figure_inputs': {}}
+    return {'figure_inputs': build_figure_inputs(datasets, order_facts=order_facts)}
+
+
+def figures_stage(figure_inputs, output_dir, workers, figure_cache_dir):
+    cache = FigureCache(figure_cache_dir) if figure_cache_dir else None
+    return {'figures': render_figures(figure_inputs, output_dir or 'figuras', workers=workers, cache=cache)}
+
+
+def missing_figure_files(table):
+    """Archivos listados en una tabla de `render_figures` que no están en disco"""
+    return [path for files in table['files'] for path in files if not os.path.exists(path)]
+
+
+def figures_exist(outputs):
+    """Si los archivos de figuras registrados en un checkpoint siguen en disco"""
+    return not missing_figure_files(outputs['figures'])
+
+
+OLIST_STAGES = [
+    Stage('load', load_stage, params=['data_path', 'tables'], data_params=['data_path'], outputs=['raw']),
+    Stage('type_fix', type_fix_stage, inputs=['raw'], outputs=['datasets']),
+    Stage('validate', validate_stage, inputs=['datasets'], outputs=['validation']),
+    Stage('profile', profile_stage, inputs=['datasets'], outputs=['profile']),
+    Stage('facts', facts_stage, inputs=['datasets'], outputs=['order_facts']),
+    Stage('kpis', kpis_stage, inputs=['datasets'], outputs=['kpis', 'kpi_versions']),
+    Stage('sellers', sellers_stage, inputs=['datasets', 'order_facts'], params=['workers'],
+          untracked=['workers'], outputs=['seller_scorecard']),
+    Stage('customers', customers_stage, inputs=['datasets'], outputs=['customer_segments', 'customer_rfm']),
+    Stage('cohorts', cohorts_stage, inputs=['datasets'], outputs=['cohort_retention']),
+    Stage('deliveries', deliveries_stage, inputs=['datasets'], outputs=['delivery_stages', 'delivery_by_state']),
+    Stage('figure_inputs', figure_inputs_stage, inputs=['datasets', 'order_facts'], outputs=['figure_inputs']),
+    Stage('figures', figures_stage, inputs=['figure_inputs'],
+          params=['output_dir', 'workers', 'figure_cache_dir'], untracked=['workers', 'figure_cache_dir'],
+          outputs=['figures'], check=figures_exist)
+]
+
+ORDER_TABLES = ['orders', 'customers', 'order_items', 'order_payments', 'order_reviews']
+
+# Secciones seleccionables: salidas que producen y tablas que necesitan leer
+SECTIONS = {
+    'quality': (['validation', 'profile'], list(OLIST_FILES)),
+    'kpis': (['kpis', 'kpi_versions'], ['orders', 'customers', 'sellers', 'products', 'order_items', 'order_reviews']),
+    'sellers': (['seller_scorecard'], ORDER_TABLES + ['sellers']),
+    'customers': (['customer_segments', 'customer_rfm'], ['orders', 'customers', 'order_items']),
+    'cohorts': (['cohort_retention'], ['orders', 'customers', 'order_items']),
+    'deliveries': (['delivery_stages', 'delivery_by_state'], ['orders', 'customers', 'order_items', 'products']),
+    'figures': (['figures'], ORDER_TABLES + ['sellers', 'products'])
+}
+
+
+def section_plan(sections):
+    """Salidas a producir y tablas a leer para un conjunto de secciones"""
+    unknown = [s for s in sections if s not in SECTIONS]
+    if unknown:
+        raise KeyError(f"Secciones desconocidas: {unknown}; disponibles: {list(SECTIONS)}")
+    targets, tables = [], []
+    for section in sections:
+        section_targets, section_tables = SECTIONS[section]
+        targets += [t for t in section_targets if t not in targets]
+        tables += [t for t in section_tables if t not in tables]
+    return targets, [t for t in OLIST_FILES if t in tables]
+
+
+def olist_pipeline(checkpoint_dir=None, workers=None):
+    """Flujo completo del análisis, con checkpoints en `checkpoint_dir` si se indica"""
+    store = CheckpointStore(checkpoint_dir) if checkpoint_dir else None
+    return Pipeline(OLIST_STAGES, store=store, workers=workers)
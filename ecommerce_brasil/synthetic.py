@@ -0,0 +1,331 @@
+"""Generador de tablas sintéticas con la forma del dataset de Olist a distintas escalas
+
+Con `scale=1` los tamaños son los del dataset público (~99 mil órdenes); con
+`scale=10` o `scale=100` todo crece en proporción salvo la geolocalización,
+que depende de los prefijos de CEP y no del volumen de órdenes. Se conservan
+las relaciones entre tablas (cada item apunta a una orden, producto y vendedor
+existentes; pagos y reviews a órdenes existentes), el orden de las fechas
+(compra ≤ aprobación ≤ despacho ≤ entrega ≤ review ≤ respuesta), la
+concentración de vendedores, categorías y estados, y la relación entre
+retrasos y review scores. Las fechas se devuelven como texto, igual que al
+leer los CSV.
+"""
+import binascii
+import os
+
+import numpy as np
+import pandas as pd
+
+from .flows import BRAZIL_STATES
+from .quality import OLIST_FILES
+
+BASE_SIZES = {
+    'orders': 99_441,
+    'unique_customers': 96_096,
+    'products': 32_951,
+    'sellers': 3_095,
+    'geolocation': 1_000_163
+}
+
+# Participación aproximada de cada estado en clientes y vendedores
+CUSTOMER_STATE_SHARE = {
+    'SP': 41.9, 'RJ': 12.9, 'MG': 11.7, 'RS': 5.5, 'PR': 5.1, 'SC': 3.7, 'BA': 3.4, 'DF': 2.2,
+    'ES': 2.0, 'GO': 2.0, 'PE': 1.7, 'CE': 1.3, 'PA': 1.0, 'MT': 0.9, 'MA': 0.75, 'MS': 0.72,
+    'PB': 0.54, 'PI': 0.5, 'RN': 0.49, 'AL': 0.42, 'SE': 0.34, 'TO': 0.28, 'RO': 0.25,
+    'AM': 0.15, 'AC': 0.08, 'AP': 0.07, 'RR': 0.05
+}
+SELLER_STATE_SHARE = {
+    'SP': 59.7, 'PR': 11.3, 'MG': 7.9, 'SC': 6.1, 'RJ': 5.5, 'RS': 4.2, 'GO': 1.3, 'DF': 1.0,
+    'ES': 0.7, 'BA': 0.6, 'CE': 0.4, 'PE': 0.3, 'MT': 0.2, 'MS': 0.2, 'RN': 0.2, 'PB': 0.2,
+    'RO': 0.1, 'PI': 0.05, 'SE': 0.05, 'MA': 0.05, 'AM': 0.03, 'PA': 0.03, 'AC': 0.01,
+    'AL': 0.01, 'AP': 0.01, 'RR': 0.01, 'TO': 0.01
+}
+
+# Rango de prefijos de CEP, centro (lat, lng) y capital de cada estado
+STATE_GEO = {
+    'SP': ((1000, 19999), (-23.0, -47.5), 'sao paulo'), 'RJ': ((20000, 28999), (-22.5, -43.2), 'rio de janeiro'),
+    'ES': ((29000, 29999), (-19.8, -40.5), 'vitoria'), 'MG': ((30000, 39999), (-19.5, -44.5), 'belo horizonte'),
+    'BA': ((40000, 48999), (-12.9, -41.0), 'salvador'), 'SE': ((49000, 49999), (-10.7, -37.4), 'aracaju'),
+    'PE': ((50000, 56999), (-8.4, -37.0), 'recife'), 'AL': ((57000, 57999), (-9.6, -36.5), 'maceio'),
+    'PB': ((58000, 58999), (-7.2, -36.6), 'joao pessoa'), 'RN': ((59000, 59999), (-5.8, -36.5), 'natal'),
+    'CE': ((60000, 63999), (-5.0, -39.5), 'fortaleza'), 'PI': ((64000, 64999), (-7.0, -42.5), 'teresina'),
+    'MA': ((65000, 65999), (-4.5, -44.8), 'sao luis'), 'PA': ((66000, 68899), (-3.5, -51.0), 'belem'),
+    'AP': ((68900, 68999), (0.9, -51.5), 'macapa'), 'AM': ((69000, 69299), (-3.5, -62.0), 'manaus'),
+    'RR': ((69300, 69399), (2.5, -61.0), 'boa vista'), 'AC': ((69900, 69999), (-9.5, -69.5), 'rio branco'),
+    'DF': ((70000, 72799), (-15.8, -47.9), 'brasilia'), 'GO': ((72800, 76799), (-16.2, -49.5), 'goiania'),
+    'RO': ((76800, 76999), (-10.5, -63.0), 'porto velho'), 'TO': ((77000, 77999), (-10.0, -48.3), 'palmas'),
+    'MT': ((78000, 78899), (-13.0, -55.5), 'cuiaba'), 'MS': ((79000, 79999), (-20.5, -54.6), 'campo grande'),
+    'PR': ((80000, 87999), (-24.7, -51.5), 'curitiba'), 'SC': ((88000, 89999), (-27.2, -50.2), 'florianopolis'),
+    'RS': ((90000, 99999), (-29.8, -52.5), 'porto alegre')
+}
+
+# Días extra de transporte para estados lejos del sudeste
+REMOTE_STATES = {'AM': 12, 'RR': 14, 'AP': 12, 'AC': 10, 'PA': 8, 'RO': 7, 'MA': 7, 'AL': 6, 'SE': 6,
+                 'CE': 6, 'PI': 6, 'PB': 6, 'RN': 6, 'PE': 5, 'BA': 5, 'TO': 5, 'MT': 4, 'MS': 3}
+
+CATEGORIES = [
+    'cama_mesa_banho', 'beleza_saude', 'esporte_lazer', 'moveis_decoracao', 'informatica_acessorios',
+    'utilidades_domesticas', 'relogios_presentes', 'telefonia', 'ferramentas_jardim', 'automotivo',
+    'brinquedos', 'cool_stuff', 'perfumaria', 'bebes', 'eletronicos', 'papelaria', 'fashion_bolsas_e_acessorios',
+    'pet_shop', 'moveis_escritorio', 'consoles_games', 'malas_acessorios', 'construcao_ferramentas_construcao',
+    'eletrodomesticos', 'instrumentos_musicais', 'eletroportateis', 'casa_construcao', 'livros_interesse_geral',
+    'alimentos', 'moveis_sala', 'casa_conforto', 'bebidas', 'audio', 'market_place', 'climatizacao',
+    'construcao_ferramentas_seguranca', 'moveis_cozinha_area_de_servico_jantar_e_jardim', 'industria_comercio_e_negocios',
+    'livros_tecnicos', 'telefonia_fixa', 'fashion_calcados', 'eletrodomesticos_2', 'agro_industria_e_comercio',
+    'artes', 'pcs', 'sinalizacao_e_seguranca', 'artigos_de_festas', 'fashion_roupa_masculina', 'flores'
+]
+
+ORDER_STATUS_SHARE = {
+    'delivered': 97.02, 'shipped': 1.11, 'canceled': 0.63, 'unavailable': 0.61, 'invoiced': 0.32,
+    'processing': 0.30, 'created': 0.005, 'approved': 0.002
+}
+PAYMENT_TYPE_SHARE = {'credit_card': 73.9, 'boleto': 19.0, 'voucher': 5.56, 'debit_card': 1.47}
+
+# Distribución de review score (1..5) según la entrega
+SCORE_ON_TIME = [0.07, 0.025, 0.075, 0.20, 0.63]
+SCORE_LATE = [0.46, 0.10, 0.13, 0.12, 0.19]
+SCORE_UNDELIVERED = [0.62, 0.08, 0.10, 0.08, 0.12]
+
+COMMENTS_BY_SCORE = {
+    1: ['Não recebi o produto até agora', 'Produto veio quebrado, péssimo', 'Comprei e não chegou, quero meu dinheiro de volta',
+        'Produto diferente do anunciado', 'Péssimo atendimento, nunca mais compro'],
+    2: ['Produto de qualidade ruim', 'Demorou muito para chegar', 'Veio faltando peças'],
+    3: ['Produto razoável', 'Chegou com atraso mas o produto é bom', 'Esperava mais pelo preço'],
+    4: ['Produto bom, recomendo', 'Chegou no prazo', 'Gostei do produto'],
+    5: ['Produto ótimo, chegou antes do prazo', 'Excelente, recomendo!', 'Muito bom, entrega rápida',
+        'Tudo certo, parabéns à loja', 'Adorei o produto, superou as expectativas']
+}
+TITLES_BY_SCORE = {1: 'Péssimo', 2: 'Ruim', 3: 'Regular', 4: 'Bom', 5: 'Excelente'}
+
+START = pd.Timestamp('2016-09-04')
+END = pd.Timestamp('2018-10-17')
+
+
+def _shares(shares, keys):
+    weights = np.array([shares[k] for k in keys], dtype=np.float64)
+    return weights / weights.sum()
+
+
+def _zipf_weights(n, exponent):
+    """Pesos ∝ 1/rango**exponente (pocos elementos concentran la mayor parte)"""
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return weights / weights.sum()
+
+
+def hex_ids(rng, n):
+    """`n` identificadores hexadecimales de 32 caracteres (como los md5 de Olist)"""
+    raw = binascii.hexlify(rng.bytes(16 * n))
+    return np.frombuffer(raw, dtype='S32').astype(str).astype(object)
+
+
+def _timestamps(values):
+    """datetime64 → texto 'AAAA-MM-DD hh:mm:ss' (None para NaT)"""
+    text = pd.Series(np.datetime_as_string(values.astype('datetime64[s]'), unit='s'))
+    text = text.str.replace('T', ' ', regex=False)
+    return text.where(~np.isnat(values), None).to_numpy(dtype=object)
+
+
+def _hours(rng, mean_hours, n):
+    return (rng.gamma(2.0, mean_hours / 2.0, n) * 3600).astype('timedelta64[s]')
+
+
+def generate_olist(scale=1.0, seed=42, geolocation_rows=None):
+    """Tablas sintéticas de Olist (diccionario nombre → DataFrame) a la escala indicada
+
+    `geolocation_rows` fija el tamaño de la tabla de geolocalización; por
+    defecto es el del dataset público (menos si `scale < 1`).
+    """
+    rng = np.random.default_rng(seed)
+    n_orders = max(int(BASE_SIZES['orders'] * scale), 10)
+    n_unique = max(int(BASE_SIZES['unique_customers'] * scale), 1)
+    n_products = max(int(BASE_SIZES['products'] * scale), 10)
+    n_sellers = max(int(BASE_SIZES['sellers'] * scale), 5)
+    if geolocation_rows is None:
+        geolocation_rows = int(BASE_SIZES['geolocation'] * min(scale, 1.0))
+    states = np.array(BRAZIL_STATES, dtype=object)
+
+    def zip_codes(state_values):
+        ranges = np.array([STATE_GEO[s][0] for s in BRAZIL_STATES])
+        codes = pd.Index(BRAZIL_STATES).get_indexer(state_values)
+        low, high = ranges[codes, 0], ranges[codes, 1]
+        return (low + rng.random(len(codes)) * (high - low + 1)).astype(np.int64)
+
+    capitals = np.array([STATE_GEO[s][2] for s in BRAZIL_STATES], dtype=object)
+
+    # Vendedores
+    seller_state = rng.choice(states, n_sellers, p=_shares(SELLER_STATE_SHARE, BRAZIL_STATES))
+    sellers = pd.DataFrame({
+        'seller_id': hex_ids(rng, n_sellers),
+        'seller_zip_code_prefix': zip_codes(seller_state),
+        'seller_city': capitals[pd.Index(BRAZIL_STATES).get_indexer(seller_state)],
+        'seller_state': seller_state
+    })
+
+    # Productos: categoría y vendedor con concentración tipo Zipf
+    category = rng.choice(len(CATEGORIES), n_products, p=_zipf_weights(len(CATEGORIES), 0.8))
+    category_names = np.array(CATEGORIES, dtype=object)[category]
+    category_names[rng.random(n_products) < 0.0185] = None
+    weight = np.round(np.exp(rng.normal(6.6, 1.2, n_products))).clip(50, 40_000)
+    products = pd.DataFrame({
+        'product_id': hex_ids(rng, n_products),
+        'product_category_name': category_names,
+        'product_name_lenght': rng.integers(20, 64, n_products).astype(float),
+        'product_description_lenght': np.round(rng.gamma(2.0, 400, n_products)).clip(4, 3992),
+        'product_photos_qty': (rng.geometric(0.5, n_products)).clip(1, 20).astype(float),
+        'product_weight_g': weight,
+        'product_length_cm': rng.integers(16, 105, n_products).astype(float),
+        'product_height_cm': rng.integers(2, 105, n_products).astype(float),
+        'product_width_cm': rng.integers(6, 118, n_products).astype(float)
+    })
+    product_seller = rng.choice(n_sellers, n_products, p=_zipf_weights(n_sellers, 0.75))
+    category_price = np.exp(rng.normal(4.4, 0.6, len(CATEGORIES)))
+
+    # Clientes: una fila por orden; algunos clientes únicos repiten compra
+    unique_ids = hex_ids(rng, n_unique)
+    unique_state = rng.choice(states, n_unique, p=_shares(CUSTOMER_STATE_SHARE, BRAZIL_STATES))
+    unique_zip = zip_codes(unique_state)
+    owner = np.concatenate([np.arange(n_unique), rng.integers(0, n_unique, max(n_orders - n_unique, 0))])[:n_orders]
+    owner = rng.permutation(owner)
+    customers = pd.DataFrame({
+        'customer_id': hex_ids(rng, n_orders),
+        'customer_unique_id': unique_ids[owner],
+        'customer_zip_code_prefix': unique_zip[owner],
+        'customer_city': capitals[pd.Index(BRAZIL_STATES).get_indexer(unique_state[owner])],
+        'customer_state': unique_state[owner]
+    })
+
+    # Órdenes: volumen creciente en el tiempo y fechas en orden
+    span = (END - START).to_numpy().astype('timedelta64[s]').astype(np.int64)
+    purchase = START.to_datetime64().astype('datetime64[s]') + (np.sqrt(rng.random(n_orders)) * span).astype('timedelta64[s]')
+    status_names = list(ORDER_STATUS_SHARE)
+    status = rng.choice(np.array(status_names, dtype=object), n_orders, p=_shares(ORDER_STATUS_SHARE, status_names))
+    approved = purchase + _hours(rng, 10, n_orders)
+    carrier = approved + _hours(rng, 67, n_orders)
+    remote = pd.Series(customers['customer_state']).map(REMOTE_STATES).fillna(0).to_numpy()
+    transit_days = rng.gamma(2.2, 3.5, n_orders) + remote
+    delivered = carrier + (transit_days * 86400).astype('timedelta64[s]')
+    estimated = (purchase + ((rng.normal(23, 6, n_orders).clip(3, 60) + remote) * 86400).astype('timedelta64[s]')
+                 ).astype('datetime64[D]').astype('datetime64[s]')
+    nat = np.datetime64('NaT', 's')
+    approved = np.where(np.isin(status, ['created']) | ((status == 'canceled') & (rng.random(n_orders) < 0.2)), nat, approved)
+    carrier = np.where(np.isin(status, ['delivered', 'shipped']), carrier, nat)
+    delivered = np.where(status == 'delivered', delivered, nat)
+    order_ids = hex_ids(rng, n_orders)
+    orders = pd.DataFrame({
+        'order_id': order_ids,
+        'customer_id': customers['customer_id'].to_numpy(),
+        'order_status': status,
+        'order_purchase_timestamp': _timestamps(purchase),
+        'order_approved_at': _timestamps(approved),
+        'order_delivered_carrier_date': _timestamps(carrier),
+        'order_delivered_customer_date': _timestamps(delivered),
+        'order_estimated_delivery_date': _timestamps(estimated)
+    })
+
+    # Items: 1 por orden en su mayoría; órdenes no disponibles sin items
+    n_items = rng.geometric(0.89, n_orders).clip(1, 21)
+    n_items[status == 'unavailable'] = 0
+    n_items[(status == 'canceled') & (rng.random(n_orders) < 0.5)] = 0
+    item_order = np.repeat(np.arange(n_orders), n_items)
+    item_number = np.arange(len(item_order)) - np.repeat(np.cumsum(n_items) - n_items, n_items) + 1
+    item_product = rng.choice(n_products, len(item_order), p=_zipf_weights(n_products, 0.6))
+    # Las órdenes con varios items suelen repetir el mismo producto
+    repeat_first = (item_number > 1) & (rng.random(len(item_order)) < 0.6)
+    first_of_order = np.repeat(np.cumsum(n_items) - n_items, n_items)
+    item_product = np.where(repeat_first, item_product[first_of_order], item_product)
+    price = np.round(category_price[category[item_product]] * np.exp(rng.normal(0, 0.7, len(item_order))), 2).clip(0.85, 6735)
+    freight = np.round(8 + np.sqrt(weight[item_product]) * 0.25 + remote[item_order] * 1.5
+                       + rng.gamma(2.0, 2.0, len(item_order)), 2)
+    order_items = pd.DataFrame({
+        'order_id': order_ids[item_order],
+        'order_item_id': item_number,
+        'product_id': products['product_id'].to_numpy()[item_product],
+        'seller_id': sellers['seller_id'].to_numpy()[product_seller[item_product]],
+        'shipping_limit_date': _timestamps(purchase[item_order] + np.timedelta64(6, 'D')),
+        'price': price,
+        'freight_value': freight
+    })
+
+    # Pagos: el total de cada orden (precio + flete), a veces dividido con vouchers
+    order_total = np.bincount(item_order, weights=price + freight, minlength=n_orders)
+    no_items = n_items == 0
+    order_total[no_items] = np.round(np.exp(rng.normal(4.7, 0.7, no_items.sum())), 2)
+    types = list(PAYMENT_TYPE_SHARE)
+    main_type = rng.choice(np.array(types, dtype=object), n_orders, p=_shares(PAYMENT_TYPE_SHARE, types))
+    split = (rng.random(n_orders) < 0.03) & (main_type != 'voucher')
+    voucher_value = np.round(np.where(split, order_total * rng.uniform(0.1, 0.5, n_orders), 0.0), 2)
+    installments = np.where(main_type == 'credit_card', rng.geometric(0.35, n_orders).clip(1, 24), 1)
+    payment_order = np.concatenate([np.arange(n_orders), np.flatnonzero(split)])
+    order_payments = pd.DataFrame({
+        'order_id': order_ids[payment_order],
+        'payment_sequential': np.concatenate([np.ones(n_orders, dtype=np.int64), np.full(split.sum(), 2)]),
+        'payment_type': np.concatenate([main_type, np.full(split.sum(), 'voucher', dtype=object)]),
+        'payment_installments': np.concatenate([installments, np.ones(split.sum(), dtype=np.int64)]),
+        'payment_value': np.concatenate([np.round(order_total - voucher_value, 2), voucher_value[split]])
+    })
+
+    # Reviews: el score depende de si la entrega llegó a tiempo
+    has_review = rng.random(n_orders) < 0.992
+    duplicated = has_review & (rng.random(n_orders) < 0.005)
+    review_order = np.concatenate([np.flatnonzero(has_review), np.flatnonzero(duplicated)])
+    late = delivered[review_order] > estimated[review_order]
+    undelivered = np.isnat(delivered[review_order])
+    probabilities = np.where(undelivered[:, None], SCORE_UNDELIVERED,
+                             np.where(late[:, None], SCORE_LATE, SCORE_ON_TIME))
+    score = (rng.random(len(review_order))[:, None] > np.cumsum(probabilities, axis=1)).sum(axis=1) + 1
+    reference = np.where(undelivered, estimated[review_order], delivered[review_order])
+    created = (reference + np.timedelta64(1, 'D')).astype('datetime64[D]').astype('datetime64[s]')
+    answered = created + _hours(rng, 72, len(review_order))
+
+    has_comment = rng.random(len(review_order)) < np.where(score <= 2, 0.75, 0.35)
+    pick = rng.random(len(review_order))
+    message = np.empty(len(review_order), dtype=object)
+    title = np.empty(len(review_order), dtype=object)
+    for value, options in COMMENTS_BY_SCORE.items():
+        rows = has_comment & (score == value)
+        message[rows] = np.array(options, dtype=object)[(pick[rows] * len(options)).astype(int)]
+        title[rows & (pick < 0.3)] = TITLES_BY_SCORE[value]
+    order_reviews = pd.DataFrame({
+        'review_id': hex_ids(rng, len(review_order)),
+        'order_id': order_ids[review_order],
+        'review_score': score,
+        'review_comment_title': title,
+        'review_comment_message': message,
+        'review_creation_date': _timestamps(created),
+        'review_answer_timestamp': _timestamps(answered)
+    }).sample(frac=1.0, random_state=seed, ignore_index=True)
+
+    # Geolocalización: varias filas por prefijo de CEP alrededor del centro del estado
+    prefixes, first = np.unique(np.concatenate([customers['customer_zip_code_prefix'].to_numpy(),
+                                                sellers['seller_zip_code_prefix'].to_numpy()]), return_index=True)
+    prefix_state = np.concatenate([customers['customer_state'].to_numpy(), seller_state])[first]
+    rows_per_prefix = rng.poisson(max(geolocation_rows / max(len(prefixes), 1), 1e-9), len(prefixes))
+    geo_prefix = np.repeat(np.arange(len(prefixes)), rows_per_prefix)
+    state_index = pd.Index(BRAZIL_STATES).get_indexer(prefix_state)
+    centers = np.array([STATE_GEO[s][1] for s in BRAZIL_STATES])[state_index]
+    centers = centers + rng.normal(0, 1.2, centers.shape)
+    geolocation = pd.DataFrame({
+        'geolocation_zip_code_prefix': prefixes[geo_prefix],
+        'geolocation_lat': centers[geo_prefix, 0] + rng.normal(0, 0.03, len(geo_prefix)),
+        'geolocation_lng': centers[geo_prefix, 1] + rng.normal(0, 0.03, len(geo_prefix)),
+        'geolocation_city': capitals[state_index][geo_prefix],
+        'geolocation_state': prefix_state[geo_prefix]
+    })
+
+    return {
+        'customers': customers,
+        'orders': orders,
+        'order_items': order_items,
+        'products': products,
+        'sellers': sellers,
+        'order_payments': order_payments,
+        'order_reviews': order_reviews,
+        'geolocation': geolocation
+    }
+
+
+def write_olist(datasets, directory):
+    """Escribe las tablas como los CSV de Olist en `directory`"""
+    os.makedirs(directory, exist_ok=True)
+    for name, df in datasets.items():
+        df.to_csv(os.path.join(directory, OLIST_FILES[name]), index=False)
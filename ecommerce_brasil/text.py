@@ -0,0 +1,128 @@
+"""Conteo de términos de los comentarios de reviews (portugués) por lotes en paralelo"""
+import multiprocessing
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+TEXT_COLUMNS = ['review_comment_title', 'review_comment_message']
+
+# Stopwords del portugués ya sin acentos (se comparan contra el texto normalizado).
+# 'nao' se conserva a propósito: distingue "nao recebi" y similares en reviews negativas.
+PORTUGUESE_STOPWORDS = frozenset('''
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles
+depois do dos e ela elas ele eles em entre era eram essa essas esse esses esta estao estas
+estava estavam este esteja estes esteve estive estou eu foi fomos for foram fosse fossem fui
+ha isso isto ja la lhe lhes mais mas me mesmo meu meus minha minhas muito na nas nem no
+nos nossa nossas nosso nossos num numa o os ou para pela pelas pelo pelos por qual quando que
+quem se seja sem ser sera seu seus so sua suas tambem te tem tendo tenho ter teu teve tinha
+tive todo todos tu tua tuas um uma umas uns vai voce voces vos pra pro q ai ainda
+'''.split())
+
+_TOKEN = re.compile(r'[a-z]{2,}')
+
+
+def fold_text(texts):
+    """Minúsculas y sin acentos (ç → c, ã → a), vectorizado sobre una Series"""
+    return (texts.str.lower()
+            .str.normalize('NFKD')
+            .str.encode('ascii', errors='ignore')
+            .str.decode('ascii'))
+
+
+def tokenize(text, stopwords=PORTUGUESE_STOPWORDS):
+    """Tokens alfabéticos de al menos 2 letras, sin stopwords"""
+    return [t for t in _TOKEN.findall(text) if t not in stopwords]
+
+
+def ngrams(tokens, n):
+    """N-gramas consecutivos unidos por espacio"""
+    if n == 1:
+        return tokens
+    return [' '.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+
+
+def count_batch(batch, ngram_range=(1, 1)):
+    """Conteos {grupo: Counter} de un lote de pares (texto, grupo)
+
+    Cada término se cuenta a lo sumo una vez por comentario, así un texto que
+    repite una palabra no domina el resultado.
+    """
+    texts, groups = batch
+    folded = fold_text(pd.Series(texts, dtype=object))
+    counts = {}
+    for text, group in zip(folded, groups):
+        tokens = tokenize(text)
+        terms = set()
+        for n in range(ngram_range[0], ngram_range[1] + 1):
+            terms.update(ngrams(tokens, n))
+        counter = counts.get(group)
+        if counter is None:
+            counter = counts[group] = Counter()
+        counter.update(terms)
+    return counts
+
+
+def merge_counts(partials):
+    """Suma los conteos parciales por grupo"""
+    merged = {}
+    for partial in partials:
+        for group, counter in partial.items():
+            merged.setdefault(group, Counter()).update(counter)
+    return merged
+
+
+def review_texts(reviews, text_columns=TEXT_COLUMNS, by='review_score'):
+    """Textos no vacíos (título y comentario unidos) con el grupo de cada review"""
+    columns = [c for c in text_columns if c in reviews.columns]
+    texts = reviews[columns].fillna('').agg(' '.join, axis=1).str.strip()
+    keep = texts.str.len() > 0
+    if by is None:
+        groups = np.zeros(int(keep.sum()), dtype=np.int64)
+    else:
+        keep &= reviews[by].notna()
+        groups = reviews.loc[keep, by].to_numpy()
+    return texts[keep].to_numpy(dtype=object), groups
+
+
+def term_counts(reviews, by='review_score', ngram_range=(1, 1), text_columns=TEXT_COLUMNS,
+                workers=None, batch_size=50_000, min_count=2):
+    """Tabla compacta (grupo, término, n, conteo) de los comentarios de reviews
+
+    Los comentarios se procesan en lotes de `batch_size`, repartidos entre
+    `workers` procesos (con `workers=1`, en el proceso actual). `conteo` es el
+    número de reviews del grupo que mencionan el término.
+    """
+    texts, groups = review_texts(reviews, text_columns=text_columns, by=by)
+    batches = [(texts[i:i + batch_size], groups[i:i + batch_size])
+               for i in range(0, len(texts), batch_size)]
+    workers = min(workers or os.cpu_count() or 1, max(len(batches), 1))
+
+    if workers == 1:
+        partials = [count_batch(b, ngram_range) for b in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            partials = list(pool.map(count_batch, batches, [ngram_range] * len(batches)))
+
+    rows = [(group, term, count)
+            for group, counter in merge_counts(partials).items()
+            for term, count in counter.items() if count >= min_count]
+    table = pd.DataFrame(rows, columns=['group', 'term', 'count'])
+    table['n'] = table['term'].str.count(' ') + 1
+    table = table.rename(columns={'group': by or 'group'})
+    return table[[by or 'group', 'term', 'n', 'count']].sort_values(
+        [by or 'group', 'count'], ascending=[True, False], ignore_index=True)
+
+
+def frequencies(table, group=None, by='review_score', n=None, top=200):
+    """Diccionario término → conteo listo para `WordCloud.generate_from_frequencies`"""
+    if group is not None:
+        table = table[table[by] == group]
+    if n is not None:
+        table = table[table['n'] == n]
+    totals = table.groupby('term')['count'].sum()
+    totals = totals.nlargest(top) if top else totals
+    return totals.astype(float).to_dict()
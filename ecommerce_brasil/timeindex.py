@@ -0,0 +1,94 @@
+"""Consultas por rango de tiempo sobre tablas ordenadas por fecha de compra"""
+import numpy as np
+import pandas as pd
+
+_NAT_KEY = np.iinfo(np.int64).max
+
+
+class TimeSortedFrame:
+    """Tabla ordenada físicamente por `time_column` con selección por búsqueda binaria
+
+    Las ventanas se resuelven con `searchsorted` sobre los timestamps en int64
+    y se devuelven como cortes contiguos (`iloc[lo:hi]`), sin recorrer ni
+    copiar la tabla. Las filas sin fecha quedan al final y nunca se
+    seleccionan.
+    """
+
+    def __init__(self, df, time_column='order_purchase_timestamp', presorted=False):
+        self.time_column = time_column
+        times = df[time_column]
+        if not pd.api.types.is_datetime64_any_dtype(times):
+            df = df.assign(**{time_column: pd.to_datetime(times, errors='coerce')})
+            times = df[time_column]
+        keys = times.to_numpy(dtype='datetime64[ns]').view(np.int64).copy()
+        keys[times.isna().to_numpy()] = _NAT_KEY
+        if not presorted:
+            order = np.argsort(keys, kind='stable')
+            df = df.iloc[order]
+            keys = keys[order]
+        self.frame = df.reset_index(drop=True)
+        self._keys = keys
+
+    def __len__(self):
+        return len(self.frame)
+
+    @staticmethod
+    def _key(value):
+        """Timestamp como entero en nanosegundos, comparable con las claves"""
+        return pd.Timestamp(value).value
+
+    def bounds(self, start=None, end=None):
+        """Posiciones [lo, hi) de las filas con start <= t < end"""
+        lo = 0 if start is None else int(np.searchsorted(self._keys, self._key(start), side='left'))
+        if end is None:
+            hi = int(np.searchsorted(self._keys, _NAT_KEY, side='left'))
+        else:
+            hi = int(np.searchsorted(self._keys, self._key(end), side='left'))
+        return lo, max(lo, hi)
+
+    def between(self, start=None, end=None):
+        """Filas con start <= t < end como corte contiguo de la tabla ordenada"""
+        lo, hi = self.bounds(start, end)
+        return self.frame.iloc[lo:hi]
+
+    def count(self, start=None, end=None):
+        """Número de filas en la ventana sin materializarla"""
+        lo, hi = self.bounds(start, end)
+        return hi - lo
+
+    def period(self, period, freq=None):
+        """Filas de un período completo (p. ej. '2017-11', '2018', freq='Q')"""
+        period = pd.Period(period, freq=freq)
+        return self.between(period.start_time, period.end_time + pd.Timedelta(1, 'ns'))
+
+    def _window_bounds(self, window, step=None, start=None, end=None):
+        """Inicios de ventana y sus posiciones [lo, hi) en la tabla ordenada"""
+        window = pd.Timedelta(window)
+        step = pd.Timedelta(step) if step is not None else window
+        n_valid = int(np.searchsorted(self._keys, _NAT_KEY, side='left'))
+        if n_valid == 0:
+            empty = np.array([], dtype=np.int64)
+            return pd.DatetimeIndex([]), empty, empty
+        first = pd.Timestamp(start) if start is not None else pd.Timestamp(self._keys[0]).normalize()
+        last = pd.Timestamp(end) if end is not None else pd.Timestamp(self._keys[n_valid - 1])
+        starts = pd.date_range(first, last, freq=step).as_unit('ns')
+        lows = np.searchsorted(self._keys, starts.asi8, side='left')
+        highs = np.searchsorted(self._keys, (starts + window).asi8, side='left')
+        return starts, lows, highs
+
+    def windows(self, window, step=None, start=None, end=None):
+        """Itera ventanas móviles (inicio, filas) de tamaño `window` cada `step`"""
+        starts, lows, highs = self._window_bounds(window, step, start, end)
+        for window_start, lo, hi in zip(starts, lows, highs):
+            yield window_start, self.frame.iloc[lo:hi]
+
+    def window_counts(self, window, step=None, start=None, end=None):
+        """Conteo de filas por ventana móvil, solo con búsquedas binarias"""
+        starts, lows, highs = self._window_bounds(window, step, start, end)
+        return pd.Series(highs - lows, index=starts, dtype=np.int64)
+
+    def join(self, other, on='order_id', how='left'):
+        """Une `other` conservando el orden temporal (sin reordenar)"""
+        joined = self.frame.merge(other, on=on, how=how)
+        # merge(how='left') conserva el orden de las filas de la izquierda
+        return TimeSortedFrame(joined, self.time_column, presorted=(how == 'left'))